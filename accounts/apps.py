@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        # Register the signal handlers
+        from accounts import signals  # noqa: F401
+        # Registers the job handlers
+        from accounts import tasks  # noqa: F401
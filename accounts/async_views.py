@@ -0,0 +1,181 @@
+import asyncio
+import json
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.authentication import AsyncJWTAuthentication, arevoke_token
+from accounts.login import LoginBusy, aauthenticate_login
+from accounts.serializers import UserLoginSerializer
+from accounts.throttling import LoginEmailRateThrottle, LoginIPRateThrottle
+from accounts.tokens import RefreshToken
+from accounts.views import get_tokens_for_user
+
+
+# Semaphores bounding the requests in flight per event loop, see `AsyncAPIView.dispatch`
+_request_slots = weakref.WeakKeyDictionary()
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, encoder=JSONEncoder, safe=False)
+
+
+def close_request_connections():
+    """
+        Close the database connections of the current request thread, except the ones inside a transaction
+        (e.g. in tests). Under ASGI the thread is not reused by later requests, so its connections are closed
+        (or handed back to the pool) whatever their `CONN_MAX_AGE`.
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def get_request_slots():
+    loop = asyncio.get_running_loop()
+    slots = _request_slots.get(loop)
+    if slots is None:
+        slots = _request_slots[loop] = asyncio.Semaphore(settings.ASYNC_MAX_DB_CONNECTIONS)
+    return slots
+
+
+class AsyncAPIView(View):
+    """
+        Base view for the async (ASGI native) endpoints.
+
+        Plain Django view with `async def` handlers, so under ASGI an idle request costs a coroutine instead
+        of a worker thread. Database access goes through the async ORM and Redis through `redis.asyncio`.
+        It authenticates the JWT of the request with `AsyncJWTAuthentication` and checks the DRF
+        `permission_classes`, then the `throttle_classes` (with an `aallow_request` method, like
+        `LoginRateThrottle`), before handling it, and is exempt from CSRF checks like DRF views.
+    """
+    permission_classes = []
+    throttle_classes = []
+    authentication = AsyncJWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Under ASGI the async ORM runs the queries of every request in a thread of its own, with its own
+        # database connection, held until the request ends. Queue the requests over the limit in the event
+        # loop (where waiting is cheap) instead of running PostgreSQL out of connections.
+        async with get_request_slots():
+            try:
+                return await self.handle(request, *args, **kwargs)
+            finally:
+                # Give the connection back before the slot, not when the request is finished
+                await sync_to_async(close_request_connections)()
+
+    async def handle(self, request, *args, **kwargs):
+        """
+            Authenticate the request and check its permissions, then dispatch it to the handler of its method.
+        """
+        try:
+            user_auth_tuple = await self.authentication.aauthenticate(request)
+        except APIException as e:
+            return json_response({'detail': e.detail}, status_code=status.HTTP_401_UNAUTHORIZED)
+        request.user, request.auth = user_auth_tuple if user_auth_tuple is not None else (AnonymousUser(), None)
+
+        for permission in self.permission_classes:
+            if not permission().has_permission(request, self):
+                if not request.user.is_authenticated:
+                    return json_response({'detail': 'Authentication credentials were not provided.'},
+                                         status_code=status.HTTP_401_UNAUTHORIZED)
+                return json_response({'detail': 'You do not have permission to perform this action.'},
+                                     status_code=status.HTTP_403_FORBIDDEN)
+
+        # Like DRF, every throttle counts the request and the longest wait is reported
+        waits = []
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not await throttle.aallow_request(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            return self.error_response(Throttled(max(waits)))
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def error_response(exc):
+        """
+            Return the response of an API exception, with its Retry-After header if it has a wait.
+        """
+        response = json_response({'detail': exc.detail}, status_code=exc.status_code)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+        return response
+
+    def get_data(self, request):
+        """
+            Return the decoded JSON body of the request.
+
+            Raises:
+                ValueError: If the body is not a JSON object.
+        """
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError('Expected a JSON object.')
+        return data
+
+
+class AsyncUserLoginView(AsyncAPIView):
+    """
+        Async API view for user login, with the same request and responses as `UserLoginView`.
+
+        The user is fetched with the async ORM and the password is hashed off the event loop, in the bounded
+        `login_pool`. Login attempts are rate limited like `UserLoginView`.
+    """
+    throttle_classes = (LoginIPRateThrottle, LoginEmailRateThrottle)
+
+    async def post(self, request):
+        try:
+            data = self.get_data(request)
+        except ValueError:
+            return json_response({'error': 'Invalid JSON body'}, status_code=status.HTTP_400_BAD_REQUEST)
+
+        serializer = UserLoginSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status_code=status.HTTP_400_BAD_REQUEST)
+        email = serializer.validated_data['email']
+        password = serializer.validated_data['password']
+
+        try:
+            user = await aauthenticate_login(email, password)
+        except LoginBusy as e:
+            return self.error_response(e)
+        if user is not None:
+            token = get_tokens_for_user(user)
+            return json_response({'token': token, 'msg': 'Login Success'})
+
+        return json_response({'errors': {'non_field_errors': ['Email or Password is not Valid']}},
+                             status_code=status.HTTP_404_NOT_FOUND)
+
+
+class AsyncUserLogoutView(AsyncAPIView):
+    """
+        Async API view for user logout: blacklists the given refresh token and revokes the access token of the
+        request, like `UserLogoutView`.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    async def post(self, request):
+        try:
+            refresh_token = self.get_data(request)['refresh_token']
+            await sync_to_async(lambda: RefreshToken(refresh_token).blacklist())()
+            await arevoke_token(request.auth)
+
+            return json_response({'msg': 'Logout successful.'}, status_code=status.HTTP_205_RESET_CONTENT)
+        except Exception:
+            return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
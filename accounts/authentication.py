@@ -0,0 +1,230 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from django_redis import get_redis_connection
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from item_management.tiered_cache import AsyncRedisCache
+
+# Authentication record of a user, see `StatelessJWTAuthentication`
+AUTH_USER_CACHE_KEY = 'auth_user:{}'
+
+# Time a user was last saved, checked against the `CLAIMS_AT_CLAIM` of their tokens, see `StatelessJWTAuthentication`
+AUTH_USER_CHANGED_CACHE_KEY = 'auth_user_changed:{}'
+
+# Time the user claims of a token were read, more precise than its `iat`
+CLAIMS_AT_CLAIM = 'claims_at'
+
+# Tokens revoked before they expire, by `jti`
+REVOKED_TOKEN_CACHE_KEY = 'auth_revoked:{}'
+
+# Cache alias of every key above. Unlike the item cache, it must never lose a key before it expires: evicting or
+# clearing a revocation would accept its token again, see `CACHES`.
+AUTH_CACHE_ALIAS = 'auth'
+
+# User fields carried by the token claims and the authentication records
+USER_CLAIM_FIELDS = ('email', 'is_active', 'is_admin', 'is_item_adder')
+
+auth_cache = caches[AUTH_CACHE_ALIAS]
+async_auth_cache = AsyncRedisCache(auth_cache, alias=AUTH_CACHE_ALIAS)
+
+# The default cache, for the login throttles
+async_cache = AsyncRedisCache(caches['default'])
+
+
+def get_user_claims(user):
+    return {**{field: getattr(user, field) for field in USER_CLAIM_FIELDS}, CLAIMS_AT_CLAIM: time.time()}
+
+
+def invalidate_auth_users(user_ids):
+    """
+        Drop the cached authentication records of users, e.g. when their flags change, and mark the claims of their
+        tokens issued until now as stale.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    auth_cache.delete_many([AUTH_USER_CACHE_KEY.format(user_id) for user_id in user_ids])
+    # Access tokens refreshed later copy the claims of their refresh token, keep the mark until the last of them
+    # expires
+    timeout = (api_settings.REFRESH_TOKEN_LIFETIME + api_settings.ACCESS_TOKEN_LIFETIME).total_seconds()
+    now = time.time()
+    auth_cache.set_many({AUTH_USER_CHANGED_CACHE_KEY.format(user_id): now for user_id in user_ids},
+                        timeout=int(timeout))
+
+
+def invalidate_auth_user(user_id):
+    invalidate_auth_users([user_id])
+
+
+def revoke_tokens(expirations):
+    """
+        Reject tokens from now on, until they expire, in one round trip.
+
+        Args:
+            expirations (iterable): Pairs of token `jti` and expiration time (seconds since the epoch).
+    """
+    now = time.time()
+    pipeline = get_redis_connection(AUTH_CACHE_ALIAS).pipeline(transaction=False)
+    for jti, expires_at in expirations:
+        remaining = int(expires_at - now) + 1
+        if remaining > 0:
+            pipeline.set(auth_cache.make_key(REVOKED_TOKEN_CACHE_KEY.format(jti)), auth_cache.client.encode(1),
+                         ex=remaining)
+    pipeline.execute()
+
+
+def revoke_token(token):
+    revoke_tokens([(token[api_settings.JTI_CLAIM], token['exp'])])
+
+
+async def arevoke_token(token):
+    remaining = int(token['exp'] - time.time()) + 1
+    if remaining > 0:
+        await async_auth_cache.set(REVOKED_TOKEN_CACHE_KEY.format(token[api_settings.JTI_CLAIM]), 1,
+                                   timeout=remaining)
+
+
+def is_token_revoked(token):
+    return auth_cache.get(REVOKED_TOKEN_CACHE_KEY.format(token[api_settings.JTI_CLAIM])) is not None
+
+
+class ClaimsTokenUser(TokenUser):
+    """
+    Lightweight user built from token claims instead of a database row, with the attributes the views and
+    permissions read off `accounts.User`.
+    """
+
+    def __str__(self):
+        return self.token.get('email') or super().__str__()
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', False)
+
+    @cached_property
+    def is_admin(self):
+        return self.token.get('is_admin', False)
+
+    @cached_property
+    def is_item_adder(self):
+        return self.token.get('is_item_adder', False)
+
+    @cached_property
+    def is_staff(self):
+        # All admins are staff, like `accounts.User`
+        return self.is_admin
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a database query per request.
+
+    The user is a `ClaimsTokenUser` made of the `USER_CLAIM_FIELDS` of the user, read from:
+        - a cached authentication record, loaded from the database at most every `AUTH_USER_CACHE_TIMEOUT`
+          seconds and dropped whenever the user is saved, so changed flags apply at once;
+        - the token claims if `AUTH_USER_CACHE_TIMEOUT` is 0. Saving a user marks the claims of their tokens issued
+          until then as stale, those tokens fall back to the database until they expire, so changed flags apply at
+          once too. Tokens without the claims fall back to the database as well.
+    Tokens revoked with `revoke_token` (e.g. on logout) are rejected either way. All the keys are read in one cache
+    round trip.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_token_user_id(validated_token)
+        cached = auth_cache.get_many(self.get_cache_keys(validated_token, user_id))
+        claims = self.get_cached_claims(validated_token, user_id, cached)
+        if claims is None:
+            claims = self.load_claims(user_id)
+        return self.make_user(validated_token, claims)
+
+    def get_token_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def get_cache_keys(validated_token, user_id):
+        keys = [REVOKED_TOKEN_CACHE_KEY.format(validated_token.get(api_settings.JTI_CLAIM))]
+        if settings.AUTH_USER_CACHE_TIMEOUT:
+            keys.append(AUTH_USER_CACHE_KEY.format(user_id))
+        else:
+            keys.append(AUTH_USER_CHANGED_CACHE_KEY.format(user_id))
+        return keys
+
+    @staticmethod
+    def get_cached_claims(validated_token, user_id, cached):
+        """
+            Return the claims of the user from the cached entries or the token, or None if they have to be loaded.
+
+            Raises:
+                AuthenticationFailed: If the token was revoked.
+        """
+        if cached.get(REVOKED_TOKEN_CACHE_KEY.format(validated_token.get(api_settings.JTI_CLAIM))):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        if settings.AUTH_USER_CACHE_TIMEOUT:
+            return cached.get(AUTH_USER_CACHE_KEY.format(user_id))
+        changed_at = cached.get(AUTH_USER_CHANGED_CACHE_KEY.format(user_id))
+        if changed_at is not None and validated_token.get(CLAIMS_AT_CLAIM, 0) <= changed_at:
+            return None
+        if all(field in validated_token for field in USER_CLAIM_FIELDS):
+            return {field: validated_token[field] for field in USER_CLAIM_FIELDS}
+        return None
+
+    def load_claims(self, user_id):
+        claims = self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}) \
+            .values(*USER_CLAIM_FIELDS).first()
+        if claims is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if settings.AUTH_USER_CACHE_TIMEOUT:
+            auth_cache.set(AUTH_USER_CACHE_KEY.format(user_id), claims, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return claims
+
+    @staticmethod
+    def make_user(validated_token, claims):
+        if not claims['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return ClaimsTokenUser({**validated_token.payload, **claims})
+
+
+class AsyncJWTAuthentication(StatelessJWTAuthentication):
+    """
+    `StatelessJWTAuthentication` for async views: the token is validated in the event loop (it is pure CPU work),
+    the cache is read with `redis.asyncio` and authentication records are loaded with the async ORM.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """
+            Async counterpart of `StatelessJWTAuthentication.get_user`, with the same checks.
+        """
+        user_id = self.get_token_user_id(validated_token)
+        cached = await async_auth_cache.get_many(self.get_cache_keys(validated_token, user_id))
+        claims = self.get_cached_claims(validated_token, user_id, cached)
+        if claims is None:
+            claims = await self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}) \
+                .values(*USER_CLAIM_FIELDS).afirst()
+            if claims is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if settings.AUTH_USER_CACHE_TIMEOUT:
+                await async_auth_cache.set(AUTH_USER_CACHE_KEY.format(user_id), claims,
+                                           timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return self.make_user(validated_token, claims)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2 with the cost parameters of the `ARGON2_*` settings.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """
+    bcrypt (on the SHA-256 of the password) with the `BCRYPT_ROUNDS` setting.
+    """
+
+    @property
+    def rounds(self):
+        return settings.BCRYPT_ROUNDS
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the `PBKDF2_ITERATIONS` setting.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PBKDF2_ITERATIONS
@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.authentication import invalidate_auth_users
+from accounts.models import User
+from accounts.serializers import UserImportSerializer
+from item_management.importer import MAX_REPORTED_ERRORS, ImportStats
+
+ON_CONFLICT_CHOICES = ('skip', 'update')
+
+# Job importing the users posted to the bulk user endpoint, see `accounts.tasks`
+IMPORT_USERS_JOB = 'import_users'
+
+# Fields written for an existing user by an `update` import
+UPDATE_FIELDS = ['name', 'password', 'is_active', 'is_admin', 'is_item_adder', 'updated_at']
+
+
+def get_hasher_pool(processes):
+    """
+        Return a pool of `processes` worker processes hashing passwords, or None to hash in this process.
+    """
+    if processes <= 1:
+        return None
+    # Workers start from a fresh process (forkserver, or spawn where it is unavailable) instead of a fork of this
+    # one, which may be a multi-threaded web worker, and set Django up to read the hasher settings
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context(start_method),
+                               initializer=django.setup)
+
+
+def hash_passwords(passwords, pool, processes):
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    # A few tasks per worker, so the workers finish together without a round trip per password
+    chunksize = max(1, len(passwords) // (processes * 4))
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def import_users(rows, chunk_size=1000, on_conflict='skip', processes=None, progress=None):
+    """
+        Validate and load users from an iterable of row dicts, one chunk at a time.
+
+        The passwords of every chunk are hashed in parallel across a pool of `processes` worker processes, then
+        the chunk is written in its own transaction with a single `bulk_create` (and a single `bulk_update` when
+        updating). Rows whose email already exists are skipped without hashing their password, or update the
+        existing user, depending on `on_conflict`.
+
+        Args:
+            rows (iterable): User payloads (`email`, `name`, `password` and optional flags), e.g. from `iter_rows()`.
+            chunk_size (int): Number of rows validated, hashed and written at a time.
+            on_conflict (str): `skip` or `update` users whose email already exists.
+            processes (int): Number of hashing processes, all the CPUs by default.
+            progress (callable): Called with the `ImportStats` after every chunk.
+
+        Returns:
+            ImportStats: The counters of the import.
+    """
+    stats = ImportStats()
+    rows = iter(rows)
+    processes = processes or os.cpu_count() or 1
+    pool = get_hasher_pool(processes)
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            _import_chunk(chunk, stats, on_conflict, pool, processes)
+            if progress is not None:
+                progress(stats)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return stats
+
+
+def _import_chunk(chunk, stats, on_conflict, pool, processes):
+    first_row_number = stats.rows + 1
+    stats.rows += len(chunk)
+
+    serializer = UserImportSerializer(data=chunk, many=True)
+    if serializer.is_valid():
+        valid_rows = serializer.validated_data
+    else:
+        valid_rows = []
+        for index, errors in enumerate(serializer.errors):
+            if errors:
+                stats.failed += 1
+                if len(stats.errors) < MAX_REPORTED_ERRORS:
+                    stats.errors.append({'row': first_row_number + index, 'errors': errors})
+            else:
+                valid_rows.append(UserImportSerializer().to_internal_value(chunk[index]))
+
+    # The last row wins when an email appears more than once in the chunk
+    rows_by_email = {User.objects.normalize_email(row['email']): row for row in valid_rows}
+    stats.skipped += len(valid_rows) - len(rows_by_email)
+
+    existing = {user.email: user for user in User.objects.filter(email__in=list(rows_by_email))}
+    if on_conflict != 'update':
+        stats.skipped += len(existing)
+        rows_by_email = {email: row for email, row in rows_by_email.items() if email not in existing}
+
+    # Hashing is the slow part, done before the transaction is opened
+    emails = list(rows_by_email)
+    passwords = hash_passwords([rows_by_email[email]['password'] for email in emails], pool, processes)
+    encoded_passwords = dict(zip(emails, passwords))
+
+    now = timezone.now()
+    to_update = []
+    to_create = []
+    for email, row in rows_by_email.items():
+        user = existing.get(email)
+        if user is None:
+            user = User(**row)
+            user.email = email
+            to_create.append(user)
+        else:
+            for field, value in row.items():
+                setattr(user, field, value)
+            user.email = email
+            user.updated_at = now
+            to_update.append(user)
+        user.password = encoded_passwords[email]
+
+    with transaction.atomic():
+        User.objects.bulk_update(to_update, fields=UPDATE_FIELDS)
+        # Emails inserted concurrently since the lookup above are skipped by the unique index
+        User.objects.bulk_create(to_create, ignore_conflicts=True)
+        # `ignore_conflicts` does not tell which rows were inserted. Ours are the ones with the password we hashed,
+        # salted at random.
+        created = sum(1 for email, password in User.objects.filter(email__in=[user.email for user in to_create])
+                      .values_list('email', 'password') if encoded_passwords[email] == password)
+    # `bulk_update` sends no `post_save`, invalidate the authentication of the updated users here
+    invalidate_auth_users(user.pk for user in to_update)
+    stats.updated += len(to_update)
+    stats.created += created
+    # Inserted concurrently, so skipped by the unique index
+    stats.skipped += len(to_create) - created
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from accounts.models import User
+
+
+class LoginBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, try again shortly.'
+    default_code = 'login_busy'
+    # Seconds, sent as the Retry-After header
+    wait = 1
+
+
+class LoginPool:
+    """
+    Bounded pool of threads hashing the login passwords of this process.
+
+    At most `LOGIN_HASHER_WORKERS` passwords are hashed at a time and at most `LOGIN_MAX_PENDING` logins wait for
+    the pool or run in it. Logins over the limit fail at once with `LoginBusy` instead of holding more request
+    threads, so a burst of logins can't take every worker away from the Item requests. The hashers release the
+    GIL, the request threads keep serving while the pool hashes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._slots = None
+
+    def get_executor(self):
+        # Threads do not survive a fork, every (worker) process gets a pool of its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=settings.LOGIN_HASHER_WORKERS,
+                                                        thread_name_prefix='login-hasher')
+                    self._slots = threading.BoundedSemaphore(settings.LOGIN_MAX_PENDING)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, fn, *args):
+        """
+            Run a function in the pool.
+
+            Returns:
+                Future: The result of the function.
+
+            Raises:
+                LoginBusy: If `LOGIN_MAX_PENDING` logins are in progress already.
+        """
+        executor = self.get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def run(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+login_pool = LoginPool()
+
+
+def check_user_password(user, raw_password):
+    """
+        Check a login password, like `ModelBackend`. Runs in the `login_pool`, without database access.
+
+        A valid password whose hash was made by another hasher, or with other cost parameters, is hashed again
+        with the current ones: `user.password` changes, and has to be saved by the caller.
+
+        Args:
+            user (User): The user of the login email, or None if there is none.
+            raw_password (str): The login password.
+
+        Returns:
+            bool: Whether the password is valid and the user active.
+    """
+    if user is None:
+        # Hash the password anyway, so unknown emails take as long as wrong passwords
+        make_password(raw_password)
+        return False
+
+    def setter(raw):
+        user.set_password(raw)
+        # Not a password change, the password validators need not be told
+        user._password = None
+
+    return check_password(raw_password, user.password, setter) and user.is_active
+
+
+def authenticate_login(email, password):
+    """
+        Return the user of a login, or None if the email or password is not valid.
+
+        Raises:
+            LoginBusy: If the `login_pool` is full.
+    """
+    user = User.objects.filter(email=email).first()
+    encoded = user.password if user is not None else None
+    if not login_pool.run(check_user_password, user, password):
+        return None
+    if user.password != encoded:
+        user.save(update_fields=['password'])
+    return user
+
+
+async def aauthenticate_login(email, password):
+    """
+        Async counterpart of `authenticate_login`.
+    """
+    user = await User.objects.filter(email=email).afirst()
+    encoded = user.password if user is not None else None
+    if not await login_pool.arun(check_user_password, user, password):
+        return None
+    if user.password != encoded:
+        await user.asave(update_fields=['password'])
+    return user
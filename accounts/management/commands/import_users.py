@@ -0,0 +1,53 @@
+import io
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importer import ON_CONFLICT_CHOICES, import_users
+from item_management.importer import IMPORT_FORMATS, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Import users from a CSV or NDJSON file, hashing their passwords across a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - to read from stdin.')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='File format, guessed from the file extension when left out.')
+        parser.add_argument('--chunk-size', type=int, default=settings.USER_IMPORT_CHUNK_SIZE,
+                            help='Rows validated, hashed and written at a time.')
+        parser.add_argument('--processes', type=int, default=settings.USER_IMPORT_PROCESSES,
+                            help='Password hashing processes, 0 for one per CPU.')
+        parser.add_argument('--on-conflict', choices=ON_CONFLICT_CHOICES, default='skip',
+                            help='What to do with rows whose email already exists.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format']
+        if file_format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            file_format = 'ndjson' if extension in ('ndjson', 'jsonl') else extension
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError('Could not guess the file format, pass --format.')
+
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        else:
+            try:
+                stream = open(path, encoding='utf-8', newline='')
+            except OSError as e:
+                raise CommandError(f'Could not open {path}: {e}')
+
+        def progress(stats):
+            self.stdout.write(f'Imported {stats}')
+
+        with stream:
+            stats = import_users(iter_rows(stream, file_format), chunk_size=options['chunk_size'],
+                                 on_conflict=options['on_conflict'], processes=options['processes'],
+                                 progress=progress)
+
+        for error in stats.errors:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(f'Import finished: {stats}'))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from accounts.authentication import revoke_tokens
+
+
+class Command(BaseCommand):
+    help = ('Move the unexpired entries of the SQL token blacklist to the cache blacklist, then empty the '
+            'token_blacklist tables, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows read or deleted at a time.')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to wait between two batches, to spread the load on the database.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+
+        # Expired tokens are rejected anyway, only the unexpired blacklist entries have to move
+        moved = 0
+        last_id = 0
+        while True:
+            batch = list(
+                BlacklistedToken.objects.filter(id__gt=last_id, token__expires_at__gt=now).order_by('id')
+                .values_list('id', 'token__jti', 'token__expires_at')[:batch_size]
+            )
+            if not batch:
+                break
+            revoke_tokens((jti, expires_at.timestamp()) for _, jti, expires_at in batch)
+            last_id = batch[-1][0]
+            moved += len(batch)
+            self.stdout.write(f'Moved {moved} blacklisted tokens to the cache.')
+            time.sleep(options['pause'])
+
+        deleted = 0
+        while True:
+            token_ids = list(OutstandingToken.objects.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not token_ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=token_ids).delete()
+                deleted += OutstandingToken.objects.filter(id__in=token_ids).delete()[0]
+            self.stdout.write(f'Deleted {deleted} outstanding tokens.')
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Token blacklist pruned: {moved} blacklisted tokens moved to the cache, {deleted} outstanding tokens '
+            f'deleted.'
+        ))
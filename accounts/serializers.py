@@ -63,3 +63,24 @@ class UserLoginSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['email', 'password']
+
+
+class UserImportSerializer(serializers.ModelSerializer):
+    """
+           This Serializer validates the users of a bulk import, see `import_users`.
+
+           Attributes:
+               email: Email of user
+               name: Full name of user
+               password: user's password
+               is_active, is_admin, is_item_adder: Flags of the user, optional
+
+       """
+
+    class Meta:
+        model = User
+        fields = ['email', 'name', 'password', 'is_active', 'is_admin', 'is_item_adder']
+        extra_kwargs = {
+            # Existing emails are looked up once per chunk by the importer, not once per row
+            'email': {'validators': []},
+        }
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.authentication import invalidate_auth_user
+from accounts.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_auth_user_on_change(sender, instance, **kwargs):
+    """
+        Drop the cached authentication record of a saved or deleted user, so changed flags (or a deactivation)
+        apply to the next request of their tokens.
+    """
+    invalidate_auth_user(instance.pk)
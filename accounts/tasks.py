@@ -0,0 +1,21 @@
+import logging
+
+from django.conf import settings
+
+from accounts.importer import IMPORT_USERS_JOB, import_users
+from item_management.jobs import job
+
+logger = logging.getLogger('accounts')
+
+
+@job(IMPORT_USERS_JOB)
+def import_posted_users(rows, on_conflict):
+    """
+        Import the users posted to the bulk user endpoint. Passwords are hashed in the worker itself: the workers
+        are the parallelism, and a daemonic worker process can not start a pool of its own. A retried import finds
+        the users of its committed chunks and skips or updates them again.
+    """
+    stats = import_users(rows, chunk_size=settings.USER_IMPORT_CHUNK_SIZE, on_conflict=on_conflict, processes=1)
+    for error in stats.errors:
+        logger.warning(f'User import row {error["row"]}: {error["errors"]}')
+    logger.info(f'User import finished: {stats}')
@@ -1,7 +1,32 @@
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts import tokens
+from accounts.authentication import auth_cache
+from accounts.importer import import_users
+from accounts.login import LoginBusy, LoginPool, login_pool
 from accounts.models import User
+from accounts.views import get_tokens_for_user
+from item_management.cache import clear_local_item_cache
+from item_management import jobs
+from item_management.models import Item, Job
 
 
 class UserRegistrationTests(APITestCase):
@@ -61,6 +86,7 @@ class UserLoginTests(APITestCase):
         }
         # Create a user for login tests
         self.user = User.objects.create_user(**self.user_data)
+        cache.delete_pattern('throttle_login_*')
 
     def test_user_login_success(self):
         """
@@ -103,3 +129,318 @@ class UserLoginTests(APITestCase):
 
         self.assertIn('This field may not be blank.', response.data['email'])
         self.assertIn('This field may not be blank.', response.data['password'])
+
+
+class AsyncUserLoginTests(APITestCase):
+    """
+    Test case for the async user login and logout.
+    """
+
+    def setUp(self):
+        self.login_url = reverse('user-login-async')
+        self.logout_url = reverse('user-logout-async')
+        self.user = User.objects.create_user(email='testuser@yopmail.com', password='testpass123',
+                                             name='Test User')
+        cache.delete_pattern('throttle_login_*')
+
+    def test_async_login_and_logout(self):
+        response = self.client.post(self.login_url, {'email': 'testuser@yopmail.com', 'password': 'testpass123'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['msg'], 'Login Success')
+        token = response.json()['token']
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token["access"]}')
+        response = self.client.post(self.logout_url, {'refresh_token': token['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_205_RESET_CONTENT)
+
+        # The access token is revoked and the refresh token blacklisted now
+        response = self.client.post(self.logout_url, {'refresh_token': token['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        response = self.client.post(self.login_url, {'email': 'testuser@yopmail.com', 'password': 'testpass123'},
+                                    format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]["access"]}')
+        response = self.client.post(self.logout_url, {'refresh_token': token['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_login_failure(self):
+        response = self.client.post(self.login_url, {'email': 'testuser@yopmail.com', 'password': 'wrong'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json()['errors']['non_field_errors'], ['Email or Password is not Valid'])
+
+        response = self.client.post(self.login_url, {'email': '', 'password': ''}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('This field may not be blank.', response.json()['email'])
+
+    def test_async_logout_requires_authentication(self):
+        response = self.client.post(self.logout_url, {'refresh_token': 'token'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+def login_throttle_rates(ip=None, email=None):
+    return override_settings(REST_FRAMEWORK={
+        'DEFAULT_AUTHENTICATION_CLASSES': ('accounts.authentication.StatelessJWTAuthentication',),
+        'DEFAULT_THROTTLE_RATES': {'login_ip': ip, 'login_email': email},
+    })
+
+
+class LoginProtectionTests(APITestCase):
+    """
+    Test case for the password rehashing, rate limiting and bounded hashing of the logins.
+    """
+
+    def setUp(self):
+        self.login_url = reverse('user-login')
+        self.user = User.objects.create_user(email='testuser@yopmail.com', password='testpass123',
+                                             name='Test User')
+        cache.delete_pattern('throttle_login_*')
+
+    def login(self, email='testuser@yopmail.com', password='testpass123', url=None):
+        return self.client.post(url or self.login_url, {'email': email, 'password': password}, format='json')
+
+    def test_login_rehashes_password_with_current_hasher(self):
+        with override_settings(PBKDF2_ITERATIONS=1000):
+            self.user.password = make_password('testpass123', hasher='pbkdf2_sha256')
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$argon2id$'))
+        self.assertTrue(self.user.check_password('testpass123'))
+
+        # Hashes made with other cost parameters are upgraded too, by both login views
+        with override_settings(ARGON2_TIME_COST=3):
+            self.assertEqual(self.login(url=reverse('user-login-async')).status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertIn('t=3', self.user.password)
+
+    @login_throttle_rates(email='2/min')
+    def test_login_attempts_are_throttled_per_email(self):
+        self.assertEqual(self.login(password='wrong').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.login(password='wrong', url=reverse('user-login-async')).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        response = self.login(url=reverse('user-login-async'))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+        self.assertEqual(self.login(email='other@yopmail.com').status_code, status.HTTP_404_NOT_FOUND)
+
+    @login_throttle_rates(ip='1/min')
+    def test_login_attempts_are_throttled_per_ip(self):
+        self.assertEqual(self.login(email='other@yopmail.com').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(LOGIN_HASHER_WORKERS=1, LOGIN_MAX_PENDING=1)
+    def test_login_pool_refuses_logins_over_the_limit(self):
+        pool = LoginPool()
+        hashing = threading.Event()
+        future = pool.submit(hashing.wait)
+        with self.assertRaises(LoginBusy):
+            pool.submit(hashing.wait)
+        hashing.set()
+        future.result()
+        self.assertTrue(pool.run(lambda: True))
+
+        with mock.patch.object(login_pool, 'submit', side_effect=LoginBusy):
+            response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class UserImportTests(APITestCase):
+    """
+    Test case for the bulk user provisioning command and endpoint.
+    """
+
+    def setUp(self):
+        self.existing = User.objects.create_user(email='existing@yopmail.com', password='testpass123',
+                                                 name='Existing User')
+        self.rows = [
+            {'email': 'first@yopmail.com', 'name': 'First', 'password': 'firstpass123', 'is_item_adder': True},
+            {'email': 'existing@yopmail.com', 'name': 'Renamed', 'password': 'newpass123'},
+            {'email': 'not-an-email', 'name': 'Invalid', 'password': 'pass123'},
+        ]
+
+    def test_import_users_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as file:
+            file.write('\n'.join(json.dumps(row) for row in self.rows))
+        self.addCleanup(os.remove, file.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_users', file.name, '--processes', '2', stdout=out, stderr=err)
+        self.assertIn('created 1, updated 0, skipped 1, failed 1', out.getvalue())
+        self.assertIn('Row 3', err.getvalue())
+
+        user = User.objects.get(email='first@yopmail.com')
+        self.assertTrue(user.check_password('firstpass123'))
+        self.assertTrue(user.is_item_adder)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Existing User')
+
+    def test_import_users_counts_rows_inserted_concurrently_as_skipped(self):
+        bulk_create = User.objects.bulk_create
+
+        def insert_concurrently(users, **kwargs):
+            # Another import commits the same email between the lookup and the insert
+            User.objects.create_user(email='first@yopmail.com', password='otherpass123', name='Raced User')
+            return bulk_create(users, **kwargs)
+
+        rows = [*self.rows[:2], {'email': 'second@yopmail.com', 'name': 'Second', 'password': 'secondpass123'}]
+        with mock.patch.object(User.objects, 'bulk_create', side_effect=insert_concurrently):
+            stats = import_users(rows, processes=1)
+        self.assertEqual((stats.rows, stats.created, stats.skipped), (3, 1, 2))
+        self.assertEqual(User.objects.get(email='first@yopmail.com').name, 'Raced User')
+        self.assertTrue(User.objects.filter(email='second@yopmail.com').exists())
+
+    def test_bulk_endpoint_queues_the_import(self):
+        url = reverse('user-bulk-import')
+        self.client.force_authenticate(self.existing)
+        response = self.client.post(url, self.rows[:2], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create_superuser(email='admin@yopmail.com', password='testpass123', name='Admin')
+        self.client.force_authenticate(admin)
+        response = self.client.post(f'{url}?on_conflict=update', self.rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        queued_job = Job.objects.get(pk=response.data['data']['job_id'])
+        self.assertEqual(queued_job.payload, {'rows': self.rows, 'on_conflict': 'update'})
+        # Nothing is imported until a worker runs the job
+        self.assertFalse(User.objects.filter(email='first@yopmail.com').exists())
+
+        with self.assertLogs('accounts', 'INFO') as logs:
+            self.assertEqual(jobs.run_due_jobs(limit=10), 1)
+        self.assertIn('created 1, updated 1, skipped 0, failed 1', logs.output[-1])
+        self.assertIn('row 3', logs.output[0])
+        self.assertTrue(User.objects.get(email='first@yopmail.com').check_password('firstpass123'))
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Renamed')
+        self.assertTrue(self.existing.check_password('newpass123'))
+
+        response = self.client.post(url, {'email': 'first@yopmail.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StatelessJWTAuthenticationTests(APITestCase):
+    """
+    Test case for the authentication of requests without loading the user.
+    """
+
+    def setUp(self):
+        cache.clear()
+        clear_local_item_cache()
+        self.user = User.objects.create_user(email='testuser@yopmail.com', password='testpass123',
+                                             name='Test User')
+        self.user.is_item_adder = True
+        self.user.save()
+        self.tokens = get_tokens_for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens["access"]}')
+        self.item_url = reverse('item-retrieve-update-delete',
+                                args=[Item.objects.create(name='Item', description='', quantity=1, price=1).pk])
+
+    def test_cached_item_read_makes_no_queries(self):
+        self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.item_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_flag_changes_apply_immediately(self):
+        self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_200_OK)
+        self.user.is_item_adder = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_access_token(self):
+        response = self.client.post(reverse('user-logout'), {'refresh_token': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_205_RESET_CONTENT)
+        self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_token_claims_without_user_cache(self):
+        self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_200_OK)
+
+        # Tokens without the claims are authenticated from the database
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_token_claims_apply_user_changes_at_once(self):
+        self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_200_OK)
+        self.user.is_item_adder = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Tokens issued after the change carry the new claims
+        self.user.is_active = True
+        self.user.is_item_adder = True
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {get_tokens_for_user(self.user)["access"]}')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.item_url).status_code, status.HTTP_200_OK)
+
+
+class TokenBlacklistTests(APITestCase):
+    """
+    Test case for the token blacklist kept in the cache.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='testuser@yopmail.com', password='testpass123',
+                                             name='Test User')
+
+    def test_logout_blacklists_refresh_token_in_cache(self):
+        issued = get_tokens_for_user(self.user)
+        self.assertFalse(OutstandingToken.objects.exists())
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {issued["access"]}')
+        response = self.client.post(reverse('user-logout'), {'refresh_token': issued['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_205_RESET_CONTENT)
+        self.assertFalse(BlacklistedToken.objects.exists())
+        with self.assertRaises(TokenError):
+            tokens.RefreshToken(issued['refresh'])
+
+    def test_prune_command_moves_blacklist_to_cache(self):
+        # Tokens blacklisted in the SQL tables, one of them expired already
+        blacklisted = RefreshToken.for_user(self.user)
+        blacklisted.blacklist()
+        expired = RefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(minutes=1))
+        RefreshToken.for_user(self.user)
+
+        call_command('prune_token_blacklist', batch_size=1, stdout=io.StringIO())
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertFalse(BlacklistedToken.objects.exists())
+        with self.assertRaises(TokenError):
+            tokens.RefreshToken(str(blacklisted))
+        self.assertIsNone(auth_cache.get(f'auth_revoked:{expired["jti"]}'))
+
+    def test_revocations_survive_a_cache_clear(self):
+        issued = get_tokens_for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {issued["access"]}')
+        self.client.post(reverse('user-logout'), {'refresh_token': issued['refresh']}, format='json')
+
+        # e.g. a flush of the item cache, which is kept apart from the revocations
+        cache.clear()
+        with self.assertRaises(TokenError):
+            tokens.RefreshToken(issued['refresh'])
+        response = self.client.post(reverse('user-logout'), {'refresh_token': issued['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from accounts.authentication import async_cache
+
+
+def count_attempt(key, duration):
+    """
+        Count an attempt in the fixed window of a key, opening a window of `duration` seconds if there is none.
+
+        Returns:
+            tuple: The number of attempts in the window, and the seconds left before it closes.
+    """
+    redis_key = cache.make_key(key)
+    pipeline = get_redis_connection('default').pipeline()
+    pipeline.set(redis_key, 0, ex=duration, nx=True).incr(redis_key).ttl(redis_key)
+    _, count, remaining = pipeline.execute()
+    return count, remaining
+
+
+async def acount_attempt(key, duration):
+    redis_key = async_cache.backend.make_key(key)
+    client = await async_cache.get_client()
+    async with client.pipeline() as pipeline:
+        pipeline.set(redis_key, 0, ex=duration, nx=True).incr(redis_key).ttl(redis_key)
+        _, count, remaining = await pipeline.execute()
+    return count, remaining
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """
+    Fixed-window throttle of the login attempts, counted in the Redis cache.
+
+    Every attempt is counted with an atomic increment before the password is hashed, so throttled attempts cost
+    no hashing and concurrent attempts can't slip past the limit (DRF throttles read, then rewrite, a history
+    list). The rate of the `scope` is read from `DEFAULT_THROTTLE_RATES`, None disables the throttle.
+    Usable by `AsyncAPIView` through `aallow_request`.
+    """
+
+    def get_rate(self):
+        # Read on every request instead of once at import, so the rates follow the settings
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        count, self.remaining = count_attempt(self.key, self.duration)
+        return count <= self.num_requests
+
+    async def aallow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        count, self.remaining = await acount_attempt(self.key, self.duration)
+        return count <= self.num_requests
+
+    def wait(self):
+        return max(self.remaining, 1)
+
+
+class LoginIPRateThrottle(LoginRateThrottle):
+    """
+    Login attempts per client IP address (see the `NUM_PROXIES` DRF setting behind a reverse proxy).
+    """
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginEmailRateThrottle(LoginRateThrottle):
+    """
+    Login attempts per email, whatever the IP address they come from.
+    """
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        try:
+            data = request.data if isinstance(request, Request) else view.get_data(request)
+        except ValueError:
+            return None
+        email = data.get('email') if isinstance(data, dict) else None
+        if not email or not isinstance(email, str):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': email.strip().lower()}
@@ -0,0 +1,26 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+
+from accounts.authentication import is_token_revoked, revoke_token
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    Refresh token blacklisted in the cache (Redis) by `jti` instead of the `token_blacklist` SQL tables.
+
+    A blacklisted token is an O(1) key lookup, and the key expires with the token. Issued tokens are no longer
+    recorded as outstanding tokens, so a login does not insert a row either.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        # Skip `BlacklistMixin.for_user`, which records the outstanding token
+        return super(tokens.BlacklistMixin, cls).for_user(user)
+
+    def check_blacklist(self):
+        if is_token_revoked(self):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        revoke_token(self)
@@ -1,10 +1,14 @@
 from django.urls import path
 
-from accounts.views import UserRegistrations, UserLoginView, UserLogoutView
+from accounts.async_views import AsyncUserLoginView, AsyncUserLogoutView
+from accounts.views import UserBulkImportView, UserRegistrations, UserLoginView, UserLogoutView
 
 urlpatterns = [
     path('registration/', UserRegistrations.as_view(), name='user-registration'),
     path('login/', UserLoginView.as_view(), name='user-login'),
     path('logout/', UserLogoutView.as_view(), name='user-logout'),
+    path('bulk/', UserBulkImportView.as_view(), name='user-bulk-import'),
+    path('async/login/', AsyncUserLoginView.as_view(), name='user-login-async'),
+    path('async/logout/', AsyncUserLogoutView.as_view(), name='user-logout-async'),
 
 ]
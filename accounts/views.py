@@ -1,20 +1,29 @@
-from django.contrib.auth import authenticate
+from django.conf import settings
 from django.shortcuts import render
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from accounts.serializers import UserCreateSerializer, UserLoginSerializer
+from accounts.authentication import get_user_claims, revoke_token
+from accounts.importer import IMPORT_USERS_JOB, ON_CONFLICT_CHOICES
+from accounts.login import authenticate_login
+from accounts.serializers import UserCreateSerializer, UserImportSerializer, UserLoginSerializer
+from accounts.throttling import LoginEmailRateThrottle, LoginIPRateThrottle
+from accounts.tokens import RefreshToken
+from item_management.jobs import enqueue_job
+from item_management.parsers import NDJSONParser
 
 
 # Create your views here.
 # Generate Token Manually
 def get_tokens_for_user(user):
     refresh = RefreshToken.for_user(user)
+    # Copied into the access token, so requests can be authenticated without loading the user
+    for claim, value in get_user_claims(user).items():
+        refresh[claim] = value
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -37,14 +46,57 @@ class UserRegistrations(APIView):
         return Response({'msg': 'Registration Successful'}, status=status.HTTP_201_CREATED)
 
 
+class UserBulkImportView(APIView):
+    """
+        API view for provisioning users in bulk.
+
+        This view handles POST requests with a JSON array (or NDJSON stream) of users and queues their import:
+        hashing the passwords takes far longer than a request should, so a job worker loads them with `import_users`
+        and logs the counters and row errors. Large imports are left to the `import_users` command.
+        Admin permission required to access this view.
+    """
+    permission_classes = (IsAuthenticated, IsAdminUser)
+    parser_classes = (JSONParser, NDJSONParser)
+
+    @swagger_auto_schema(request_body=UserImportSerializer(many=True))
+    def post(self, request):
+        """
+            Args:
+                request (Request): The request object containing the list of users. `?on_conflict=update`
+                    updates the users whose email already exists instead of skipping them.
+
+            Returns:
+                Response: A response containing the id of the import job with status code 202, or an error
+                message with status code 400 if the request is not valid.
+        """
+        on_conflict = request.query_params.get('on_conflict', 'skip')
+        if on_conflict not in ON_CONFLICT_CHOICES:
+            return Response({'error': f'on_conflict must be one of {", ".join(ON_CONFLICT_CHOICES)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({'error': 'Expected a list of users.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.USER_BULK_MAX_ROWS:
+            return Response({'error': f'A batch can contain at most {settings.USER_BULK_MAX_ROWS} users.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queued_job = enqueue_job(IMPORT_USERS_JOB, rows=rows, on_conflict=on_conflict)
+        # With `JOBS_EAGER`, the import runs once the request is done and has no job
+        return Response({'data': {'job_id': queued_job.id if queued_job else None}, 'msg': 'Users import queued'},
+                        status=status.HTTP_202_ACCEPTED)
+
+
 class UserLoginView(APIView):
     """
         API view for user login.
 
         This view handles the user login by processing a POST request with email and password,
         authenticating the user, and returning a token if authentication is successful.
+        Login attempts are rate limited per IP address and per email, and passwords are checked in the bounded
+        `login_pool`.
 
     """
+    throttle_classes = (LoginIPRateThrottle, LoginEmailRateThrottle)
 
     @swagger_auto_schema(request_body=UserLoginSerializer)
     def post(self, request):
@@ -59,12 +111,14 @@ class UserLoginView(APIView):
 
             Raises:
                 ValidationError: If the data provided is invalid.
+                Throttled: If the IP address or email made too many login attempts (status code 429).
+                LoginBusy: If too many logins are in progress (status code 503).
         """
         serializer = UserLoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         email = serializer.data.get('email')
         password = serializer.data.get('password')
-        user = authenticate(email=email, password=password)
+        user = authenticate_login(email, password)
         if user is not None:
             token = get_tokens_for_user(user)
             return Response({'token': token, 'msg': 'Login Success'}, status=status.HTTP_200_OK)
@@ -81,6 +135,8 @@ class UserLogoutView(APIView):
             refresh_token = request.data["refresh_token"]
             token = RefreshToken(refresh_token)
             token.blacklist()
+            # The access token stays valid until it expires otherwise
+            revoke_token(request.auth)
 
             return Response({'msg': 'Logout successful.'}, status=status.HTTP_205_RESET_CONTENT)
         except Exception as e:
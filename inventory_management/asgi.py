@@ -11,6 +11,9 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from inventory_management.middleware import CancelOnDisconnectMiddleware
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_management.settings')
 
-application = get_asgi_application()
+# The item event streams never end on their own
+application = CancelOnDisconnectMiddleware(get_asgi_application(), url_names=['item-events'])
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.urls import reverse
+
+from inventory_management.routers import RequestRouting, reset_request_routing, set_request_routing
+
+logger = logging.getLogger('inventory_management')
+
+# Database connection acquisition of the current request, see `DBConnectionTimingMiddleware`
+_connection_timing = ContextVar('db_connection_timing', default=None)
+
+
+class ConnectionTiming:
+    """
+    Time spent acquiring database connections (connecting, waiting for the pool, health checks) in one request.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.connections = 0
+        self.health_checks = 0
+
+
+def record_connection_time(seconds, health_check=False):
+    """
+        Add the acquisition time of a database connection to the timing of the current request, if any.
+    """
+    timing = _connection_timing.get()
+    if timing is not None:
+        timing.seconds += seconds
+        if health_check:
+            timing.health_checks += 1
+        else:
+            timing.connections += 1
+
+
+class DBConnectionTimingMiddleware:
+    """
+        Report the time every request spent acquiring database connections.
+
+        The time is sent in a `Server-Timing: db-connect;dur=<ms>` response header, so it shows up in the
+        browser dev tools and load test reports, and requests slower than `DB_CONNECT_SLOW_MS` are logged.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = ConnectionTiming()
+        token = _connection_timing.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _connection_timing.reset(token)
+        return self.report(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = ConnectionTiming()
+        token = _connection_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _connection_timing.reset(token)
+        return self.report(request, response, timing)
+
+    def report(self, request, response, timing):
+        milliseconds = timing.seconds * 1000
+        response['Server-Timing'] = (f'db-connect;dur={milliseconds:.2f};'
+                                     f'desc="{timing.connections} connect, {timing.health_checks} check"')
+        if milliseconds >= settings.DB_CONNECT_SLOW_MS:
+            logger.warning(f'{request.method} {request.path} spent {milliseconds:.1f} ms acquiring '
+                           f'{timing.connections} database connection(s).')
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+        Track the database reads and writes of every request for `ReplicaRouter`.
+
+        After a request that wrote, the reads of its user are kept on the primary for a while (see
+        `RequestRouting.pin`).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = RequestRouting(request)
+        token = set_request_routing(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_request_routing(token)
+        if routing.written_apps:
+            routing.pin()
+        return response
+
+    async def __acall__(self, request):
+        routing = RequestRouting(request)
+        token = set_request_routing(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_request_routing(token)
+        if routing.written_apps:
+            await sync_to_async(routing.pin)()
+        return response
+
+
+class CancelOnDisconnectMiddleware:
+    """
+        ASGI middleware cancelling the requests to the streaming endpoints (`url_names`) when their client
+        disconnects.
+
+        Django 4.2 only reads the ASGI messages of a request until its body is read, and ASGI servers ignore the
+        messages sent after a disconnect, so an endless stream would go on after its client left. Once the body is
+        read, this listens for the disconnect and cancels the request, which ends the stream.
+    """
+
+    def __init__(self, app, url_names):
+        self.app = app
+        self.url_names = url_names
+        self._paths = None
+
+    async def __call__(self, scope, receive, send):
+        if self._paths is None:
+            # The URLconf is loaded by the first request
+            self._paths = {reverse(url_name) for url_name in self.url_names}
+        if scope['type'] != 'http' or scope['path'] not in self._paths:
+            return await self.app(scope, receive, send)
+
+        body_read = asyncio.Event()
+        disconnected = False
+
+        async def receive_body():
+            message = await receive()
+            if message['type'] != 'http.request' or not message.get('more_body'):
+                body_read.set()
+            return message
+
+        request = asyncio.ensure_future(self.app(scope, receive_body, send))
+
+        async def cancel_on_disconnect():
+            nonlocal disconnected
+            await body_read.wait()
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected = True
+            request.cancel()
+
+        watcher = asyncio.ensure_future(cancel_on_disconnect())
+        try:
+            await request
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+        finally:
+            watcher.cancel()
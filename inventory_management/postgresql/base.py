@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+from django.db.backends.postgresql import base, creation
+
+from inventory_management.middleware import record_connection_time
+from inventory_management.postgresql.pool import ConnectionPool
+
+# Connection pools, by process, database alias and connection parameters
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options):
+    """
+        Return the connection pool of a database alias and connection parameters in this process, creating it
+        on first use.
+    """
+    # Connections must not be shared with forked (worker) processes, every process gets pools of its own.
+    # The parameters are part of the key, e.g. the test runner switches the database name of an alias.
+    key = (os.getpid(), alias, repr(sorted(conn_params.items())))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    max_size=options['max_size'],
+                    timeout=options.get('timeout', 10),
+                    max_idle=options.get('max_idle', 300),
+                )
+    return pool
+
+
+def close_pools(alias):
+    """
+        Close the idle pooled connections of a database alias in this process.
+    """
+    with _pools_lock:
+        pools = [pool for (pid, pool_alias, _), pool in _pools.items() if pid == os.getpid() and pool_alias == alias]
+    for pool in pools:
+        pool.closeall()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections to the test database would keep it from being dropped
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that reports connection acquisition times and can take connections from an in-process pool.
+
+    The pool is enabled with `OPTIONS['pool'] = {'max_size': ..., 'timeout': ..., 'max_idle': ...}`. Closing a
+    connection (at the end of a request, when `CONN_MAX_AGE` is reached or after an error) then hands it back to
+    the pool instead of disconnecting, so a new request only pays for a pool checkout.
+    """
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Pool of the current connection
+        self.pool = None
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def connect(self):
+        started_at = time.perf_counter()
+        super().connect()
+        record_connection_time(time.perf_counter() - started_at)
+
+    def get_new_connection(self, conn_params):
+        pool_options = self.settings_dict['OPTIONS'].get('pool')
+        if not pool_options:
+            self.pool = None
+            return super().get_new_connection(conn_params)
+        self.pool = get_pool(self.alias, conn_params, pool_options)
+        check = self.is_connection_usable if self.settings_dict['CONN_HEALTH_CHECKS'] else None
+        return self.pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params), check)
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection)
+
+    def close_if_health_check_failed(self):
+        if self.connection is None or not self.health_check_enabled or self.health_check_done:
+            return
+        started_at = time.perf_counter()
+        super().close_if_health_check_failed()
+        record_connection_time(time.perf_counter() - started_at, health_check=True)
+
+    @staticmethod
+    def is_connection_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except Exception:
+            return False
+        return True
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+
+from psycopg2 import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of open psycopg2 connections, shared by all the threads of a process.
+
+    At most `max_size` connections are open at a time; when all of them are in use, `getconn` waits up to
+    `timeout` seconds for one to be handed back. Connections idle for more than `max_idle` seconds are closed
+    instead of reused, so the server or a firewall never drops them under our feet.
+    """
+
+    def __init__(self, max_size, timeout, max_idle):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        # (connection, time it was handed back), the most recently used last
+        self._idle = deque()
+        # Open connections, idle or in use
+        self._size = 0
+        self._condition = threading.Condition()
+        self.waits = 0
+
+    def getconn(self, connect, check=None):
+        """
+            Return an idle connection, or a new one made with `connect()` if the pool is not full yet.
+
+            Args:
+                connect (callable): Opens a new connection.
+                check (callable): Called with an idle connection before it is reused, returns whether it works.
+
+            Raises:
+                OperationalError: If no connection was handed back within `timeout` seconds.
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._condition:
+            while True:
+                connection = self._pop_idle()
+                if connection is not None:
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot, the connection is opened outside of the lock
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise OperationalError(f'No database connection available within {self.timeout}s '
+                                           f'({self.max_size} in use).')
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                self._condition.wait(remaining)
+
+        if connection is not None:
+            if check is None or check(connection):
+                return connection
+            self._discard(connection)
+            return self.getconn(connect, check)
+
+        try:
+            return connect()
+        except Exception:
+            self._discard(None)
+            raise
+
+    def putconn(self, connection):
+        """
+            Hand a connection back. Open transactions are rolled back, broken connections are closed.
+        """
+        if not connection.closed:
+            status = connection.info.transaction_status
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                connection.close()
+            elif status != TRANSACTION_STATUS_IDLE:
+                try:
+                    connection.rollback()
+                except Exception:
+                    connection.close()
+
+        if connection.closed:
+            self._discard(None)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def closeall(self):
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                connection.close()
+                self._size -= 1
+
+    def stats(self):
+        with self._condition:
+            return {'size': self._size, 'idle': len(self._idle), 'max_size': self.max_size, 'waits': self.waits}
+
+    def _pop_idle(self):
+        # Called with the lock held
+        while self._idle:
+            connection, returned_at = self._idle.pop()
+            if not connection.closed and time.monotonic() - returned_at < self.max_idle:
+                return connection
+            connection.close()
+            self._size -= 1
+        return None
+
+    def _discard(self, connection):
+        if connection is not None:
+            connection.close()
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
@@ -0,0 +1,201 @@
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger('inventory_management')
+
+# Routing state of the current request, see `ReplicaRoutingMiddleware`
+_request_routing = ContextVar('db_request_routing', default=None)
+
+# Apps whose reads may be served by a replica; everything else (users, tokens, sessions) stays on the primary
+REPLICA_APP_LABELS = {'item_management'}
+
+# Cache keys keeping reads on the primary after a write, until the replicas have caught up
+USER_PIN_KEY = 'replica_pin:user:{}'
+ITEMS_PIN_KEY = 'replica_pin:items'
+
+# Replication lag of a standby in seconds: 0 if it replayed everything it received, NULL if it never replayed
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class ReplicaMonitor:
+    """
+    Replication lag of the read replicas, as seen by this process.
+
+    The lag of a replica is checked at most every `REPLICA_LAG_CHECK_INTERVAL` seconds, by whichever request
+    needs it first; the other requests go on with the last known lag meanwhile. A replica lagging more than
+    `REPLICA_MAX_LAG_SECONDS`, or failing the check, is out of rotation until a later check passes.
+    """
+
+    def __init__(self):
+        # alias -> (lag in seconds or None if unknown, time of the check)
+        self._lags = {}
+        self._lock = threading.Lock()
+
+    def healthy_replicas(self):
+        return [alias for alias in settings.DATABASE_REPLICAS if self.is_healthy(self.get_lag(alias))]
+
+    def get_lag(self, alias):
+        state = self._lags.get(alias)
+        if state is not None and time.monotonic() - state[1] < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return state[0]
+        if not self._lock.acquire(blocking=False):
+            return state[0] if state is not None else None
+        try:
+            lag = self.check_lag(alias)
+            self._lags[alias] = (lag, time.monotonic())
+        finally:
+            self._lock.release()
+
+        was_healthy = state is None or self.is_healthy(state[0])
+        lag_text = f'{lag:.1f}s' if lag is not None else 'unknown'
+        if was_healthy and not self.is_healthy(lag):
+            logger.warning(f'Database replica {alias} taken out of rotation, replication lag: {lag_text}.')
+        elif not was_healthy and self.is_healthy(lag):
+            logger.info(f'Database replica {alias} back in rotation, replication lag: {lag_text}.')
+        return lag
+
+    def check_lag(self, alias):
+        """
+            Query the replication lag of a replica, returning None if it is unknown.
+        """
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = cursor.fetchone()[0]
+        except DatabaseError as e:
+            logger.warning(f'Replication lag check of database replica {alias} failed: {str(e)}')
+            return None
+        return float(lag) if lag is not None else None
+
+    @staticmethod
+    def is_healthy(lag):
+        return lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+    def reset(self):
+        self._lags.clear()
+
+
+replica_monitor = ReplicaMonitor()
+
+
+class RequestRouting:
+    """
+    Where the reads of one request go.
+
+    Only the reads of a GET (or HEAD) request may go to a replica, and only until it writes. The replica is
+    picked on the first routed read and kept for the whole request, so its queries see one snapshot.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.read_only = request.method in ('GET', 'HEAD')
+        self.written_apps = set()
+        self._read_alias = None
+
+    def db_for_read(self):
+        if not self.read_only or self.written_apps:
+            return DEFAULT_DB_ALIAS
+        if self._read_alias is None:
+            self._read_alias = self.choose_read_alias()
+        return self._read_alias
+
+    def choose_read_alias(self):
+        replicas = replica_monitor.healthy_replicas()
+        if not replicas or self.is_pinned():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def get_user_id(self):
+        # Read lazily: DRF authenticates the request inside the view, after the middleware
+        user = getattr(self.request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+    def is_pinned(self):
+        """
+            Return whether the reads must stay on the primary because the user, or anyone for the Items, wrote
+            too recently for the replicas to have caught up.
+        """
+        keys = [ITEMS_PIN_KEY]
+        user_id = self.get_user_id()
+        if user_id is not None:
+            keys.append(USER_PIN_KEY.format(user_id))
+        return bool(cache.get_many(keys))
+
+    def pin(self):
+        """
+            Keep the reads of the user on the primary for `REPLICA_STICKY_SECONDS` after a write, so they read
+            their own writes. Item reads of everyone are pinned by the writes of the Items themselves, see
+            `pin_item_reads`.
+        """
+        if not settings.DATABASE_REPLICAS:
+            return
+        user_id = self.get_user_id()
+        if user_id is not None:
+            cache.set(USER_PIN_KEY.format(user_id), 1, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+def pin_item_reads():
+    """
+        Keep every Item read on the primary for `REPLICA_MAX_LAG_SECONDS`: Item pages are cached and shared, a page
+        rebuilt from a replica that missed a write would be served stale until the next write. Called by every
+        invalidation of the cached Items before it drops them, from requests, job workers and commands alike, so
+        no rebuild can start from a replica in between.
+    """
+    if settings.DATABASE_REPLICAS:
+        cache.set(ITEMS_PIN_KEY, 1, timeout=settings.REPLICA_MAX_LAG_SECONDS)
+
+
+async def apin_item_reads():
+    if settings.DATABASE_REPLICAS:
+        await cache.aset(ITEMS_PIN_KEY, 1, timeout=settings.REPLICA_MAX_LAG_SECONDS)
+
+
+def get_request_routing():
+    return _request_routing.get()
+
+
+def set_request_routing(routing):
+    return _request_routing.set(routing)
+
+
+def reset_request_routing(token):
+    _request_routing.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router sending the Item reads of GET requests to the read replicas (`DATABASE_REPLICAS`).
+
+    Writes, and reads outside of requests (management commands, the shell), always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = get_request_routing()
+        if routing is None or model._meta.app_label not in REPLICA_APP_LABELS:
+            return DEFAULT_DB_ALIAS
+        return routing.db_for_read()
+
+    def db_for_write(self, model, **hints):
+        routing = get_request_routing()
+        if routing is not None:
+            routing.written_apps.add(model._meta.app_label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
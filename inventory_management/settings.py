@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
@@ -50,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory_management.middleware.DBConnectionTimingMiddleware',
+    'inventory_management.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,16 +85,64 @@ WSGI_APPLICATION = 'inventory_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Maximum number of connections of the in-process pool of every worker process, 0 disables the pool
+POSTGRES_POOL_SIZE = env.int('POSTGRES_POOL_SIZE', default=0)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # The Django PostgreSQL backend, plus connection timing and the optional in-process pool
+        'ENGINE': 'inventory_management.postgresql',
         'NAME': env('POSTGRES_DB_NAME'),
         'USER': env('POSTGRES_DB_USER'),
         'PASSWORD': env('POSTGRES_DB_PASSWORD'),
         'HOST': env('POSTGRES_DB_HOST'),
+        'PORT': env('POSTGRES_DB_PORT', default=''),
+        # Keep connections open across requests; with the pool they go back to it after every request instead
+        'CONN_MAX_AGE': env.int('POSTGRES_CONN_MAX_AGE', default=0 if POSTGRES_POOL_SIZE else 60),
+        # Check a reused connection before its first query, so a dropped connection is not an error
+        'CONN_HEALTH_CHECKS': env.bool('POSTGRES_CONN_HEALTH_CHECKS', default=True),
+        # pgbouncer in transaction pooling mode does not support server-side cursors
+        'DISABLE_SERVER_SIDE_CURSORS': env.bool('POSTGRES_PGBOUNCER', default=False),
+        'OPTIONS': {
+            'pool': {
+                'max_size': POSTGRES_POOL_SIZE,
+                # Seconds to wait for a free connection when all of them are in use
+                'timeout': env.float('POSTGRES_POOL_TIMEOUT', default=10),
+                # Seconds after which an idle connection is closed instead of reused
+                'max_idle': env.int('POSTGRES_POOL_MAX_IDLE', default=300),
+            },
+        } if POSTGRES_POOL_SIZE else {},
     }
 }
 
+# Read replicas, e.g. `replica1.example.com,replica2.example.com:5433`, with the credentials of the primary.
+# The Item reads of GET requests go to them, see `inventory_management.routers`.
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(env.list('POSTGRES_REPLICA_HOSTS', default=[])):
+    replica_hostname, _, replica_port = replica_host.partition(':')
+    DATABASE_REPLICAS.append(f'replica_{index}')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_hostname,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        # Tests read the replicas through the connection of the test database
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['inventory_management.routers.ReplicaRouter']
+
+TEST_RUNNER = 'inventory_management.test_runner.TestRunner'
+
+# Replicas lagging behind the primary by more than this many seconds are taken out of rotation
+REPLICA_MAX_LAG_SECONDS = env.float('REPLICA_MAX_LAG_SECONDS', default=1)
+# Seconds between two replication lag checks of a replica, per process
+REPLICA_LAG_CHECK_INTERVAL = env.float('REPLICA_LAG_CHECK_INTERVAL', default=5)
+# Seconds a user reads from the primary after a write, to read their own writes
+REPLICA_STICKY_SECONDS = env.float('REPLICA_STICKY_SECONDS', default=5)
+
+# Requests spending longer than this acquiring database connections are logged
+DB_CONNECT_SLOW_MS = env.int('DB_CONNECT_SLOW_MS', default=50)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -110,12 +161,87 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing: new hashes are made with PASSWORD_HASHER (argon2, bcrypt or pbkdf2) and the cost parameters
+# below. On a successful login, hashes of another algorithm or made with other parameters are hashed again.
+PASSWORD_HASHER = env('PASSWORD_HASHER', default='argon2')
+PASSWORD_HASHER_CLASSES = {
+    'argon2': 'accounts.hashers.Argon2PasswordHasher',
+    'bcrypt': 'accounts.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'accounts.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CLASSES[PASSWORD_HASHER],
+    *(hasher for name, hasher in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER),
+    # Only to check (and upgrade) older hashes
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# Argon2id passes, memory in KiB and lanes; the defaults take ~50ms per hash on one core
+ARGON2_TIME_COST = env.int('ARGON2_TIME_COST', default=2)
+ARGON2_MEMORY_COST = env.int('ARGON2_MEMORY_COST', default=19456)
+ARGON2_PARALLELISM = env.int('ARGON2_PARALLELISM', default=1)
+# bcrypt cost factor (log2 of the rounds)
+BCRYPT_ROUNDS = env.int('BCRYPT_ROUNDS', default=10)
+PBKDF2_ITERATIONS = env.int('PBKDF2_ITERATIONS', default=600000)
+
+# Threads hashing login passwords per process, and logins in progress per process beyond which logins are
+# refused with a 503 instead of queued. Keep LOGIN_MAX_PENDING below the request threads of a worker process,
+# the logins in progress hold one each.
+LOGIN_HASHER_WORKERS = env.int('LOGIN_HASHER_WORKERS', default=1)
+LOGIN_MAX_PENDING = env.int('LOGIN_MAX_PENDING', default=2)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'accounts.authentication.StatelessJWTAuthentication',
+    ),
+    # Login attempts per client IP address and per email, e.g. `30/min`; empty disables the limit
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': env('LOGIN_THROTTLE_RATE_IP', default='30/min') or None,
+        'login_email': env('LOGIN_THROTTLE_RATE_EMAIL', default='10/min') or None,
+    },
+    # Reverse proxies in front of the app, whose X-Forwarded-For entries identify the client IP address
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
 }
 
+# Seconds the authentication record of a user is cached, 0 authenticates from the token claims alone
+AUTH_USER_CACHE_TIMEOUT = env.int('AUTH_USER_CACHE_TIMEOUT', default=60)
+
+# Number of rows the user import validates, hashes and writes at a time, and the password hashing processes of the
+# `import_users` command (0 for one per CPU, the jobs of the bulk user endpoint hash in their worker)
+USER_IMPORT_CHUNK_SIZE = env.int('USER_IMPORT_CHUNK_SIZE', default=1000)
+USER_IMPORT_PROCESSES = env.int('USER_IMPORT_PROCESSES', default=0)
+# Maximum number of users accepted by the bulk user endpoint, larger imports are left to the `import_users` command
+USER_BULK_MAX_ROWS = env.int('USER_BULK_MAX_ROWS', default=10000)
+
+# Item list pagination
+ITEM_LIST_PAGE_SIZE = env.int('ITEM_LIST_PAGE_SIZE', default=100)
+ITEM_LIST_MAX_PAGE_SIZE = env.int('ITEM_LIST_MAX_PAGE_SIZE', default=1000)
+
+# Maximum number of operations accepted by the bulk item endpoint
+ITEM_BULK_MAX_ROWS = env.int('ITEM_BULK_MAX_ROWS', default=10000)
+
+# Items at or below this quantity are low in stock. Run `rebuild_item_stats` after changing it.
+ITEM_LOW_STOCK_THRESHOLD = env.int('ITEM_LOW_STOCK_THRESHOLD', default=10)
+
+# Number of low stock Items listed by the inventory stats by default
+ITEM_STATS_LOW_STOCK_LIMIT = env.int('ITEM_STATS_LOW_STOCK_LIMIT', default=100)
+
+# Number of rows every stock band of the inventory summary is split over, so concurrent writes spread out
+ITEM_STATS_SHARDS = env.int('ITEM_STATS_SHARDS', default=8)
+
+# Days the item change log is kept; older change tokens are expired and their clients sync from scratch
+ITEM_CHANGE_RETENTION_DAYS = env.int('ITEM_CHANGE_RETENTION_DAYS', default=30)
+
+# The stock snapshots are taken this many seconds in the past, so no transaction still running wrote a movement
+# before them
+STOCK_SNAPSHOT_MARGIN_SECONDS = env.int('STOCK_SNAPSHOT_MARGIN_SECONDS', default=60)
+
+# Number of rows the item export reads per server-side cursor fetch
+ITEM_EXPORT_CHUNK_SIZE = env.int('ITEM_EXPORT_CHUNK_SIZE', default=2000)
+
+# Number of rows the item import validates and writes at a time
+ITEM_IMPORT_CHUNK_SIZE = env.int('ITEM_IMPORT_CHUNK_SIZE', default=5000)
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=120),
@@ -152,12 +278,73 @@ CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
         'LOCATION': 'redis://127.0.0.1:6379/1',
+        # Bump when the format of the cached values changes, so entries of the old format are never read
+        'VERSION': 3,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            # e.g. django_redis.compressors.zlib.ZlibCompressor or django_redis.compressors.lz4.Lz4Compressor
+            'COMPRESSOR': env('REDIS_CACHE_COMPRESSOR', default='django_redis.compressors.identity.IdentityCompressor'),
         }
-    }
+    },
+    # Authentication state: token revocations, user change marks and authentication records. Losing a revocation
+    # accepts its token again, so point it at a Redis with `maxmemory-policy noeviction`, and never clear it.
+    'auth': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': env('REDIS_AUTH_URL', default='redis://127.0.0.1:6379/2'),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        }
+    },
 }
 
+# Per-process LRU cache in front of Redis for item entries, kept coherent over Redis pub/sub
+ITEM_LOCAL_CACHE_ENABLED = env.bool('ITEM_LOCAL_CACHE_ENABLED', default=True)
+ITEM_LOCAL_CACHE_MAX_ENTRIES = env.int('ITEM_LOCAL_CACHE_MAX_ENTRIES', default=10000)
+ITEM_LOCAL_CACHE_MAX_BYTES = env.int('ITEM_LOCAL_CACHE_MAX_BYTES', default=64 * 1024 * 1024)
+ITEM_LOCAL_CACHE_TIMEOUT = env.int('ITEM_LOCAL_CACHE_TIMEOUT', default=30)
+
+# Item cache entries expire up to this fraction of their timeout early, so entries cached together expire apart
+ITEM_CACHE_TIMEOUT_JITTER = env.float('ITEM_CACHE_TIMEOUT_JITTER', default=0.1)
+
+# Reads of cached items are counted in windows of ITEM_HOT_KEYS_WINDOW seconds, keeping the ITEM_HOT_KEYS_MAX most
+# read, and flushed to Redis every ITEM_HOT_KEYS_FLUSH_INTERVAL seconds
+ITEM_HOT_KEYS_ENABLED = env.bool('ITEM_HOT_KEYS_ENABLED', default=True)
+ITEM_HOT_KEYS_WINDOW = env.int('ITEM_HOT_KEYS_WINDOW', default=3600)
+ITEM_HOT_KEYS_MAX = env.int('ITEM_HOT_KEYS_MAX', default=10000)
+ITEM_HOT_KEYS_FLUSH_INTERVAL = env.float('ITEM_HOT_KEYS_FLUSH_INTERVAL', default=10)
+
+# Number of hot items and item list pages `warm_item_cache` caches, and how many seconds before their expiry it
+# rebuilds them
+ITEM_CACHE_WARM_ITEMS = env.int('ITEM_CACHE_WARM_ITEMS', default=1000)
+ITEM_CACHE_WARM_LISTS = env.int('ITEM_CACHE_WARM_LISTS', default=100)
+ITEM_CACHE_REFRESH_AHEAD = env.int('ITEM_CACHE_REFRESH_AHEAD', default=300)
+
+# Maximum number of requests an async (ASGI) worker runs at a time, each of them may hold a database connection
+ASYNC_MAX_DB_CONNECTIONS = env.int('ASYNC_MAX_DB_CONNECTIONS', default=50)
+
+# Number of processes `run_workers` runs jobs in, and number of jobs every process runs between two checks for stopping
+JOB_WORKER_PROCESSES = env.int('JOB_WORKER_PROCESSES', default=2)
+JOB_BATCH_SIZE = env.int('JOB_BATCH_SIZE', default=100)
+
+# Seconds an idle worker waits for new jobs before looking again, when it is not woken up
+JOB_POLL_INTERVAL = env.float('JOB_POLL_INTERVAL', default=5)
+
+# Attempts of a failing job, retried after JOB_RETRY_DELAY seconds, doubled every attempt
+JOB_MAX_ATTEMPTS = env.int('JOB_MAX_ATTEMPTS', default=5)
+JOB_RETRY_DELAY = env.float('JOB_RETRY_DELAY', default=10)
+
+# Days the jobs out of attempts are kept for inspection, before `prune_jobs` deletes them
+JOB_RETENTION_DAYS = env.int('JOB_RETENTION_DAYS', default=7)
+
+# Run the jobs in the process queueing them, once its transaction commits, e.g. for development without workers
+JOBS_EAGER = env.bool('JOBS_EAGER', default=False)
+
+# Item changes are streamed to the subscribed clients in batches, at most one every this many seconds
+ITEM_EVENTS_COALESCE_SECONDS = env.float('ITEM_EVENTS_COALESCE_SECONDS', default=1)
+
+# Seconds between the keep-alive comments of an idle item event stream
+ITEM_EVENTS_HEARTBEAT_SECONDS = env.float('ITEM_EVENTS_HEARTBEAT_SECONDS', default=15)
+
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
@@ -199,5 +386,15 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'inventory_management': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'accounts': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner reading everything from the primary.
+
+    The read replicas are test mirrors of the primary, on connections of their own, so they never see the data
+    a test wrote inside its transaction.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.DATABASE_REPLICAS = []
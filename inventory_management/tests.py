@@ -0,0 +1,212 @@
+import asyncio
+from unittest import mock
+
+import psycopg2
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from inventory_management.middleware import CancelOnDisconnectMiddleware
+from inventory_management.postgresql.pool import ConnectionPool
+from inventory_management.routers import ITEMS_PIN_KEY, USER_PIN_KEY, ReplicaRouter, RequestRouting, \
+    replica_monitor, reset_request_routing, set_request_routing
+from item_management.cache import invalidate_item, invalidate_items, tiered_cache
+from item_management.models import Item
+
+User = get_user_model()
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """
+    Test case for the in-process PostgreSQL connection pool.
+    """
+
+    def setUp(self):
+        conn_params = connection.get_connection_params()
+        self.connect = lambda: psycopg2.connect(**conn_params)
+        self.pool = ConnectionPool(max_size=1, timeout=0.05, max_idle=300)
+        self.addCleanup(self.pool.closeall)
+
+    def test_connections_are_reused(self):
+        first = self.pool.getconn(self.connect)
+        self.pool.putconn(first)
+        self.assertIs(self.pool.getconn(self.connect), first)
+        self.assertEqual(self.pool.stats()['size'], 1)
+
+    def test_getconn_times_out_when_pool_is_exhausted(self):
+        in_use = self.pool.getconn(self.connect)
+        with self.assertRaises(psycopg2.OperationalError):
+            self.pool.getconn(self.connect)
+        self.assertEqual(self.pool.stats()['waits'], 1)
+        self.pool.putconn(in_use)
+
+    def test_open_transaction_is_rolled_back(self):
+        pooled = self.pool.getconn(self.connect)
+        with pooled.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.pool.putconn(pooled)
+        self.assertEqual(pooled.info.transaction_status, TRANSACTION_STATUS_IDLE)
+
+    def test_unusable_connections_are_replaced(self):
+        broken = self.pool.getconn(self.connect)
+        self.pool.putconn(broken)
+        replacement = self.pool.getconn(self.connect, check=lambda pooled: False)
+        self.assertIsNot(replacement, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(self.pool.stats()['size'], 1)
+        self.pool.putconn(replacement)
+
+
+class DBConnectionTimingMiddlewareTests(APITestCase):
+    """
+    Test case for the database connection timing reported with every response.
+    """
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('item-list-create'))
+        self.assertTrue(response['Server-Timing'].startswith('db-connect;dur='))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_MAX_LAG_SECONDS=1, REPLICA_LAG_CHECK_INTERVAL=60)
+class ReplicaRouterTests(SimpleTestCase):
+    """
+    Test case for the routing of the Item reads to the read replicas.
+    """
+
+    def setUp(self):
+        cache.delete_many([ITEMS_PIN_KEY, USER_PIN_KEY.format(1), USER_PIN_KEY.format(2)])
+        replica_monitor.reset()
+        self.addCleanup(replica_monitor.reset)
+        self.check_lag = mock.patch.object(replica_monitor, 'check_lag', return_value=0.0).start()
+        self.addCleanup(mock.patch.stopall)
+        self.router = ReplicaRouter()
+
+    def route(self, method='get', user=None):
+        """
+            Return the routing state of a request, made current until the end of the test.
+        """
+        request = getattr(RequestFactory(), method)('/api/items/')
+        request.user = user or AnonymousUser()
+        routing = RequestRouting(request)
+        self.addCleanup(reset_request_routing, set_request_routing(routing))
+        return routing
+
+    def test_get_reads_items_from_replica(self):
+        self.route()
+        self.assertEqual(self.router.db_for_read(Item), 'replica_0')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_writes_and_other_reads_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Item), 'default')
+        self.route(method='post')
+        self.assertEqual(self.router.db_for_read(Item), 'default')
+        self.assertEqual(self.router.db_for_write(Item), 'default')
+
+    def test_reads_stay_on_primary_after_write(self):
+        user = User(pk=1)
+        writer = self.route(method='post', user=user)
+        self.router.db_for_write(User)
+        writer.pin()
+
+        self.route(user=user)
+        self.assertEqual(self.router.db_for_read(Item), 'default')
+        self.route(user=User(pk=2))
+        self.assertEqual(self.router.db_for_read(Item), 'replica_0')
+
+    def test_item_invalidation_keeps_item_reads_on_primary(self):
+        # Outside of any request, like the invalidations of the job workers and commands
+        invalidate_items([1])
+
+        self.route(user=User(pk=2))
+        self.assertEqual(self.router.db_for_read(Item), 'default')
+
+    def test_item_reads_are_pinned_before_the_cached_items_are_dropped(self):
+        pinned = []
+        with mock.patch.object(tiered_cache, 'delete_many', side_effect=lambda keys: pinned.append(
+                bool(cache.get(ITEMS_PIN_KEY)))):
+            invalidate_item(1)
+        self.assertEqual(pinned, [True])
+
+    def test_lagging_replica_is_out_of_rotation(self):
+        self.check_lag.return_value = 5.0
+        self.route()
+        self.assertEqual(self.router.db_for_read(Item), 'default')
+
+        # Back in rotation once a later check passes
+        self.check_lag.return_value = 0.2
+        with override_settings(REPLICA_LAG_CHECK_INTERVAL=0):
+            self.route()
+            self.assertEqual(self.router.db_for_read(Item), 'replica_0')
+
+    def test_failed_lag_check_takes_replica_out_of_rotation(self):
+        self.check_lag.return_value = None
+        self.route()
+        self.assertEqual(self.router.db_for_read(Item), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaRoutingMiddlewareTests(APITestCase):
+    """
+    Test case for the read-your-writes stickiness set after a write request.
+    """
+
+    def test_write_pins_user_to_primary(self):
+        user = User.objects.create_user(email='writer@example.com', name='Writer', password='testpassword123')
+        user.is_item_adder = True
+        user.save()
+        cache.delete_many([ITEMS_PIN_KEY, USER_PIN_KEY.format(user.pk)])
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+        response = self.client.post(reverse('item-list-create'),
+                                    {'name': 'Pinned', 'description': 'Item', 'quantity': 1, 'price': '1.00'},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(cache.get(USER_PIN_KEY.format(user.pk)))
+        self.assertTrue(cache.get(ITEMS_PIN_KEY))
+
+
+class CancelOnDisconnectMiddlewareTests(SimpleTestCase):
+    """
+    Test case for the cancellation of the streaming requests whose client disconnected.
+    """
+
+    async def test_stream_is_cancelled_on_disconnect(self):
+        streaming = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await receive()
+            streaming.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        messages = asyncio.Queue()
+        messages.put_nowait({'type': 'http.request', 'body': b'', 'more_body': False})
+        scope = {'type': 'http', 'path': reverse('item-events')}
+        request = asyncio.ensure_future(CancelOnDisconnectMiddleware(app, ['item-events'])(scope, messages.get, None))
+        await asyncio.wait_for(streaming.wait(), 5)
+        self.assertFalse(request.done())
+
+        messages.put_nowait({'type': 'http.disconnect'})
+        await asyncio.wait_for(request, 5)
+        self.assertTrue(cancelled.is_set())
+
+    async def test_other_paths_are_passed_through(self):
+        async def app(scope, receive, send):
+            return await receive()
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        middleware = CancelOnDisconnectMiddleware(app, ['item-events'])
+        message = await middleware({'type': 'http', 'path': reverse('item-list-create')}, receive, None)
+        self.assertEqual(message['type'], 'http.request')
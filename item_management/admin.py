@@ -1,12 +1,82 @@
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
 
-from item_management.models import Item
+from item_management.cache import invalidate_item, invalidate_item_list, invalidate_items
+from item_management.changes import record_item_changes
+from item_management.models import Item, Job, StockMovement
+from item_management.stats import record_stock_changes
+from item_management.stock import record_movements
 
 
 # Register your models here.
 @admin.register(Item)
-class UserAdmin(admin.ModelAdmin):
+class ItemAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'name', 'description', 'quantity', 'price', 'created_at', 'updated_at'
     )
     search_fields = ('name', 'description')
+
+    # Writes go through the same ledger, stock summary, change log and cache invalidation as the API
+    def get_readonly_fields(self, request, obj=None):
+        # The quantity of an existing Item only changes through stock movements
+        return ('quantity',) if obj is not None else ()
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if not change:
+                super().save_model(request, obj, form, change)
+                record_movements({obj.pk: obj.quantity}, StockMovement.Reason.CREATE, user_id=request.user.pk)
+                record_stock_changes(after={obj.pk: (obj.quantity, obj.price)})
+                record_item_changes([obj.pk])
+                transaction.on_commit(invalidate_item_list)
+                return
+            # Lock the row, the quantity of the Item is the committed one and not the one the form was built with
+            before = Item.objects.select_for_update().values_list('quantity', 'price').get(pk=obj.pk)
+            obj.quantity = before[0]
+            super().save_model(request, obj, form, change)
+            record_stock_changes(before={obj.pk: before}, after={obj.pk: (obj.quantity, obj.price)})
+            record_item_changes([obj.pk])
+            item_id = obj.pk
+            transaction.on_commit(lambda: invalidate_item(item_id))
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Item.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            # Lock the rows, the summary is updated with the committed quantity and price of the Items
+            locked = queryset.select_for_update().order_by('id').values_list('id', 'quantity', 'price')
+            before = {item_id: (quantity, price) for item_id, quantity, price in locked}
+            if not before:
+                return
+            Item.objects.filter(pk__in=before).delete()
+            record_stock_changes(before=before)
+            # Kept in the change log as tombstones
+            record_item_changes(list(before))
+            transaction.on_commit(lambda: invalidate_items(list(before)))
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('id', 'item_id', 'delta', 'reason', 'user', 'created_at')
+    list_filter = ('reason',)
+
+    # The stock ledger is append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'run_at', 'attempts', 'failed_at', 'created_at')
+    list_filter = ('name', ('failed_at', admin.EmptyFieldListFilter))
+    readonly_fields = ('name', 'payload', 'attempts', 'last_error', 'failed_at', 'created_at')
+    actions = ('retry',)
+
+    @admin.action(description='Retry the selected jobs now')
+    def retry(self, request, queryset):
+        queryset.update(failed_at=None, attempts=0, run_at=timezone.now())
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ItemManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'item_management'
+
+    def ready(self):
+        # Registers the job handlers
+        from item_management import tasks  # noqa: F401
@@ -0,0 +1,176 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+
+from accounts.async_views import AsyncAPIView, json_response
+from item_management.cache import CachedPayload, ainvalidate_items, aget_or_build, aitem_list_cache_key, \
+    item_cache_key, record_item_list_read, record_item_read
+from item_management.events import ItemSubscription, get_item_event_hub
+from item_management.models import Item
+from item_management.permissions import IsItemAdder
+from item_management.serializers import ItemAdjustSerializer, ItemEventsQuerySerializer
+from item_management.stock import InsufficientStock, adjust_quantities
+from item_management.views import CustomAPIViewMixin, ItemListCreateView, item_row_serializer
+
+# Get the custom logger for item_management
+logger = logging.getLogger('item_management')
+
+
+class AsyncItemAPIView(CustomAPIViewMixin, AsyncAPIView):
+    """
+        Base view for the async Item endpoints, answering with the same JSON bodies as the DRF Item views.
+    """
+
+    def create_response(self, data=None, message="Operation successful", status_code=status.HTTP_200_OK, **extra):
+        return self.create_rendered_response(self.render_payload(data, **extra), message=message,
+                                             status_code=status_code)
+
+    def create_rendered_response(self, payload, message="Operation successful", status_code=status.HTTP_200_OK):
+        return HttpResponse(self.render_body(payload, message), status=status_code, content_type='application/json')
+
+
+class AsyncItemListView(AsyncItemAPIView):
+    """
+        Async API view for listing Items, with the same parameters and responses as `ItemListCreateView`.
+
+        Cached pages (the common case) are served without leaving the event loop. DRF pagination is
+        synchronous, so a page that has to be built is built by `ItemListCreateView` in one thread hop.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        logger.info(f'{request.user} is trying to list items.')
+        try:
+            list_view = ItemListCreateView(request=Request(request), format_kwarg=None, args=(), kwargs={})
+            cache_key = await aitem_list_cache_key(request, ItemListCreateView.list_query_params)
+            entry, from_cache = await aget_or_build(cache_key, sync_to_async(list_view.build_list_page))
+            record_item_list_read(request, ItemListCreateView.list_query_params)
+            if from_cache:
+                return self.create_cached_response(request, entry, message="Items retrieved from cache.")
+
+            logger.info('Item list retrieved successfully.')
+            return self.create_cached_response(request, entry, message="Items retrieved successfully")
+        except NotFound:
+            logger.warning(f'Invalid item list cursor: {request.GET.get("cursor")}')
+            return json_response({'error': 'Invalid cursor'}, status_code=status.HTTP_404_NOT_FOUND)
+        except ValidationError as e:
+            logger.warning(f'Invalid item list filters: {e.detail}')
+            return json_response({'error': e.detail}, status_code=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f'Error retrieving item list: {str(e)}')
+            return json_response({'error': 'Failed to retrieve items'},
+                                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncItemRetrieveView(AsyncItemAPIView):
+    """
+        Async API view for retrieving an Item, with the same responses as `ItemsRetrieveUpdateDestroyAPIView`.
+    """
+    permission_classes = [IsAuthenticated, IsItemAdder]
+
+    async def get(self, request, pk):
+        try:
+            async def build_item():
+                row = await item_row_serializer.get_rows(Item.objects.filter(pk=pk)).afirst()
+                if row is None:
+                    raise Http404
+                return CachedPayload.create(self.render_payload(data=item_row_serializer.serialize([row])[0]),
+                                            last_modified=row.updated_at)
+
+            entry, from_cache = await aget_or_build(item_cache_key(pk), build_item)
+            record_item_read(pk)
+            if from_cache:
+                return self.create_cached_response(request, entry, message="Item retrieved successfully from Cache")
+
+            logger.info(f'Item {pk} retrieved successfully.')
+            return self.create_cached_response(request, entry, message="Item retrieved successfully")
+        except Http404:
+            logger.warning(f'Item {pk} not found.')
+            return json_response({'error': 'Item not found'}, status_code=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.error(f'Error retrieving item {pk}: {str(e)}')
+            return json_response({'error': 'Failed to retrieve item'},
+                                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncItemAdjustView(AsyncItemAPIView):
+    """
+        Async API view for adjusting the stock of one Item, with the same request and responses as
+        `ItemAdjustAPIView`.
+
+        The adjustment runs in a transaction, which the async ORM does not support, so `adjust_quantities`
+        runs in one thread hop; the cache invalidation is async.
+    """
+    permission_classes = [IsAuthenticated, IsItemAdder]
+
+    async def post(self, request, pk):
+        try:
+            data = self.get_data(request)
+        except ValueError:
+            return json_response({'error': 'Invalid JSON body'}, status_code=status.HTTP_400_BAD_REQUEST)
+        serializer = ItemAdjustSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status_code=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            quantities = await sync_to_async(adjust_quantities)(
+                {pk: serializer.validated_data['delta']}, allow_negative=serializer.validated_data['allow_negative'],
+                user_id=request.user.id
+            )
+            # The quantity shows on the cached item and on the cached list pages
+            await ainvalidate_items([pk])
+            logger.info(f'Item {pk} quantity adjusted by {serializer.validated_data["delta"]}.')
+            return self.create_response(data={'id': pk, 'quantity': quantities[pk]},
+                                        message="Item quantity adjusted successfully")
+        except Item.DoesNotExist:
+            logger.warning(f'Item {pk} not found for adjustment.')
+            return json_response({'error': 'Item not found'}, status_code=status.HTTP_404_NOT_FOUND)
+        except InsufficientStock:
+            logger.warning(f'Item {pk} adjustment rejected: insufficient stock.')
+            return json_response({'error': 'Insufficient stock'}, status_code=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            logger.error(f'Error adjusting item {pk}: {str(e)}')
+            return json_response({'error': 'Failed to adjust item'},
+                                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncItemEventsView(AsyncItemAPIView):
+    """
+        Async API view streaming Item changes to the client as Server-Sent Events (`text/event-stream`).
+
+        The client subscribes to some Items (`?ids=1&ids=2`) and/or to the Items matching the filters of the Item
+        list, all the Items by default. Every process fans the changes out from one Redis subscription, see
+        `ItemEventHub`. The stream never ends, so it is only served under ASGI.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return json_response({'error': 'Item events are only served under ASGI'},
+                                 status_code=status.HTTP_501_NOT_IMPLEMENTED)
+        serializer = ItemEventsQuerySerializer(data=request.GET)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status_code=status.HTTP_400_BAD_REQUEST)
+        filters = {key: value for key, value in serializer.validated_data.items() if value not in (None, '')}
+        subscription = ItemSubscription(ids=filters.pop('ids', None), filters=filters)
+
+        hub = get_item_event_hub()
+        try:
+            await hub.subscribe(subscription)
+        except Exception as e:
+            logger.error(f'Error subscribing to item events: {str(e)}')
+            return json_response({'error': 'Item events are unavailable'},
+                                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        logger.info(f'{request.user} subscribed to item events.')
+        response = StreamingHttpResponse(subscription.stream(hub), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stops nginx from buffering the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,280 @@
+import asyncio
+import hashlib
+import random
+import time
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from inventory_management.routers import apin_item_reads, pin_item_reads
+from item_management.tiered_cache import HotKeyCounter, LocalCache, TieredCache
+
+# Cache timeout for item entries (1 hour)
+ITEM_CACHE_TIMEOUT = 3600
+
+# The list generation counter never expires; list pages of older generations simply age out
+ITEM_LIST_GENERATION_KEY = 'item_list:generation'
+
+# Single-flight rebuild lock: how long the lock is held at most, and how long other workers wait for it
+REBUILD_LOCK_TIMEOUT = 30
+REBUILD_WAIT_TIMEOUT = 5
+REBUILD_POLL_INTERVAL = 0.05
+
+# Item entries are read through a per-process LRU in front of Redis; locks and counters stay in Redis only
+tiered_cache = TieredCache(cache, LocalCache(
+    max_entries=settings.ITEM_LOCAL_CACHE_MAX_ENTRIES,
+    max_bytes=settings.ITEM_LOCAL_CACHE_MAX_BYTES,
+    timeout=settings.ITEM_LOCAL_CACHE_TIMEOUT,
+), enabled=settings.ITEM_LOCAL_CACHE_ENABLED)
+
+# Reads of Items and Item list pages, to warm and refresh the hot ones, see `item_management.warming`
+hot_item_keys = HotKeyCounter(
+    window=settings.ITEM_HOT_KEYS_WINDOW,
+    max_keys=settings.ITEM_HOT_KEYS_MAX,
+    flush_interval=settings.ITEM_HOT_KEYS_FLUSH_INTERVAL,
+    enabled=settings.ITEM_HOT_KEYS_ENABLED,
+)
+
+
+class CachedPayload(NamedTuple):
+    """
+    A response payload rendered ahead of time, with its validators for conditional requests: a strong ETag (a
+    digest of the payload) and the time it was last modified, as a timestamp.
+    """
+    payload: bytes
+    etag: str
+    last_modified: float
+
+    @classmethod
+    def create(cls, payload, last_modified=None):
+        """
+            Wrap a rendered payload, last modified at `last_modified` (now by default).
+        """
+        digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+        return cls(payload, f'"{digest}"', (last_modified or timezone.now()).timestamp())
+
+
+def item_cache_key(item_id):
+    return f'item_{item_id}'
+
+
+def jitter_timeout(timeout):
+    """
+        Shorten a cache timeout by a random fraction of up to `ITEM_CACHE_TIMEOUT_JITTER`, so entries cached
+        together, e.g. after a deploy, do not all expire together.
+    """
+    return max(1, round(timeout * (1 - random.uniform(0, settings.ITEM_CACHE_TIMEOUT_JITTER))))
+
+
+def get_item_list_generation():
+    """
+        Return the current generation of the cached Item list pages.
+    """
+    generation = tiered_cache.get(ITEM_LIST_GENERATION_KEY)
+    if generation is None:
+        cache.add(ITEM_LIST_GENERATION_KEY, 1, timeout=None)
+        generation = tiered_cache.get(ITEM_LIST_GENERATION_KEY) or 1
+    return generation
+
+
+async def aget_item_list_generation():
+    generation = await tiered_cache.aget(ITEM_LIST_GENERATION_KEY)
+    if generation is None:
+        await tiered_cache.async_backend.add(ITEM_LIST_GENERATION_KEY, 1, timeout=None)
+        generation = await tiered_cache.aget(ITEM_LIST_GENERATION_KEY) or 1
+    return generation
+
+
+def normalize_list_query(query_params, params):
+    """
+        Normalize the query string of an Item list request: only the non-blank values of `params` are kept,
+        sorted, so equivalent requests share one cache entry.
+    """
+    return urlencode(sorted(
+        (key, value.strip()) for key, values in query_params.lists() if key in params
+        for value in values if value.strip()
+    ))
+
+
+def item_list_cache_key(request, params):
+    """
+        Build the cache key of one Item list page from the list generation and the normalized query string.
+    """
+    return f'item_list:{get_item_list_generation()}:{normalize_list_query(request.query_params, params)}'
+
+
+async def aitem_list_cache_key(request, params):
+    """
+        Async counterpart of `item_list_cache_key`, for a Django (not DRF) request.
+    """
+    return f'item_list:{await aget_item_list_generation()}:{normalize_list_query(request.GET, params)}'
+
+
+def record_item_read(item_id):
+    hot_item_keys.record('item', str(item_id))
+
+
+def record_item_list_read(request, params):
+    """
+        Count a read of an Item list page, by its URL: the links of a page are absolute, so it is warmed with the
+        host and path it was read from.
+    """
+    query = normalize_list_query(request.GET, params)
+    url = request.build_absolute_uri(request.path)
+    hot_item_keys.record('list', f'{url}?{query}' if query else url)
+
+
+def invalidate_item_list():
+    """
+        Invalidate every cached Item list page with a single INCR of the generation counter.
+
+        Like every invalidation below, it first pins the Item reads to the primary (see `pin_item_reads`), so the
+        entries rebuilt after the write can not be read from a replica that missed it.
+    """
+    pin_item_reads()
+    return _next_item_list_generation()
+
+
+def _next_item_list_generation():
+    try:
+        return tiered_cache.incr(ITEM_LIST_GENERATION_KEY)
+    except ValueError:
+        # The counter was never set (or got evicted), start a fresh generation
+        cache.add(ITEM_LIST_GENERATION_KEY, 1, timeout=None)
+        return tiered_cache.incr(ITEM_LIST_GENERATION_KEY)
+
+
+async def ainvalidate_item_list():
+    await apin_item_reads()
+    return await tiered_cache.aincr(ITEM_LIST_GENERATION_KEY)
+
+
+def invalidate_item(item_id):
+    """
+        Invalidate the cached Item and every cached Item list page.
+    """
+    invalidate_items([item_id])
+
+
+def invalidate_item_entries(item_ids):
+    """
+        Invalidate a batch of cached Items in one round trip, leaving the cached Item list pages alone.
+    """
+    pin_item_reads()
+    tiered_cache.delete_many(item_cache_key(item_id) for item_id in item_ids)
+
+
+async def ainvalidate_item_entries(item_ids):
+    await apin_item_reads()
+    await tiered_cache.adelete_many(item_cache_key(item_id) for item_id in item_ids)
+
+
+def invalidate_items(item_ids):
+    """
+        Invalidate a batch of cached Items and every cached Item list page in one round trip each.
+    """
+    pin_item_reads()
+    tiered_cache.delete_many(item_cache_key(item_id) for item_id in item_ids)
+    _next_item_list_generation()
+
+
+async def ainvalidate_items(item_ids):
+    await apin_item_reads()
+    await tiered_cache.adelete_many(item_cache_key(item_id) for item_id in item_ids)
+    await tiered_cache.aincr(ITEM_LIST_GENERATION_KEY)
+
+
+def get_or_build(cache_key, build, timeout=ITEM_CACHE_TIMEOUT):
+    """
+        Return the cached value of `cache_key`, building it with `build()` on a miss.
+
+        Only the worker holding the rebuild lock runs `build()`; the others wait for its result for
+        up to `REBUILD_WAIT_TIMEOUT` seconds before building it themselves.
+
+        Returns:
+            tuple: The value and whether it was served from the cache.
+    """
+    value = tiered_cache.get(cache_key)
+    if value is not None:
+        return value, True
+
+    lock_key = f'{cache_key}:lock'
+    if cache.add(lock_key, 1, timeout=REBUILD_LOCK_TIMEOUT):
+        try:
+            value = build()
+            tiered_cache.set(cache_key, value, timeout=jitter_timeout(timeout))
+        finally:
+            cache.delete(lock_key)
+        return value, False
+
+    # Another worker is rebuilding this entry, wait for it instead of hitting the database too
+    deadline = time.monotonic() + REBUILD_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        value = tiered_cache.get(cache_key)
+        if value is not None:
+            return value, True
+    return build(), False
+
+
+async def aget_or_build(cache_key, build, timeout=ITEM_CACHE_TIMEOUT):
+    """
+        Async counterpart of `get_or_build`, for an async `build()`. Shares the cache entries and rebuild locks
+        of the sync views.
+    """
+    value = await tiered_cache.aget(cache_key)
+    if value is not None:
+        return value, True
+
+    lock_key = f'{cache_key}:lock'
+    if await tiered_cache.async_backend.add(lock_key, 1, timeout=REBUILD_LOCK_TIMEOUT):
+        try:
+            value = await build()
+            await tiered_cache.aset(cache_key, value, timeout=jitter_timeout(timeout))
+        finally:
+            await tiered_cache.async_backend.delete(lock_key)
+        return value, False
+
+    deadline = time.monotonic() + REBUILD_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(REBUILD_POLL_INTERVAL)
+        value = await tiered_cache.aget(cache_key)
+        if value is not None:
+            return value, True
+    return await build(), False
+
+
+def refresh_entry(cache_key, build, timeout=ITEM_CACHE_TIMEOUT):
+    """
+        Rebuild a cached value with `build()` before it expires, unless it is invalidated meanwhile.
+
+        Returns:
+            bool: Whether the value was refreshed.
+    """
+    return tiered_cache.refresh(cache_key, build, timeout=jitter_timeout(timeout))
+
+
+def rewarm_entry(cache_key, build, timeout=ITEM_CACHE_TIMEOUT):
+    """
+        Cache a value dropped by an invalidation with `build()`, unless it is cached or invalidated again meanwhile:
+        the Item list generation, bumped by every write of the Items, is watched while it is built.
+
+        Returns:
+            bool: Whether the value was cached.
+    """
+    return tiered_cache.refresh(cache_key, build, timeout=jitter_timeout(timeout), missing=True,
+                                watch=[ITEM_LIST_GENERATION_KEY])
+
+
+def get_item_cache_stats():
+    """
+        Return the hit/miss/eviction counters of both cache tiers of this process.
+    """
+    return tiered_cache.stats()
+
+
+def clear_local_item_cache():
+    tiered_cache.local.clear()
@@ -0,0 +1,180 @@
+import base64
+import binascii
+import json
+import re
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import BigIntegerField, BooleanField, Func
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from item_management.jobs import enqueue_job
+from item_management.models import Item, ItemChange
+
+# Redis pub/sub channel the ids of the Items written are published on once committed, see `item_management.events`
+ITEM_EVENTS_CHANNEL = 'item_events'
+
+# Job following up on every write of Items, see `item_management.tasks`
+ITEMS_WRITTEN_JOB = 'items_written'
+
+# A `pg_snapshot` as text: xmin:xmax:xip_list
+SNAPSHOT_PATTERN = re.compile(r'^(\d+):(\d+):(?:\d+(?:,\d+)*)?$')
+
+# Changes are pruned once older than the retention plus this margin, so no transaction still running when a valid
+# token was issued can have written them
+PRUNE_MARGIN_SECONDS = 24 * 3600
+
+# Number of changes deleted at a time by a prune
+PRUNE_BATCH_SIZE = 10000
+
+
+class InvalidChangeToken(Exception):
+    """
+    Raised when a change token can not be decoded.
+    """
+
+
+class ExpiredChangeToken(Exception):
+    """
+    Raised when a change token is older than the retention of the change log: the client must sync from scratch.
+    """
+
+
+class CurrentTransactionId(Func):
+    """
+    Id of the current transaction, assigned on its first write and ordered like the transactions started.
+    """
+    template = 'pg_current_xact_id()::text::bigint'
+    output_field = BigIntegerField()
+
+
+def record_item_changes(item_ids):
+    """
+        Append the Items created, updated or deleted by a write to the change log, in the transaction of the write,
+        and queue the job publishing them to the subscribed clients once it commits.
+
+        Args:
+            item_ids (iterable): Ids of the Items written.
+    """
+    item_ids = sorted(set(item_ids))
+    now = timezone.now()
+    ItemChange.objects.bulk_create([
+        ItemChange(item_id=item_id, txid=CurrentTransactionId(), created_at=now) for item_id in item_ids
+    ])
+    if item_ids:
+        enqueue_job(ITEMS_WRITTEN_JOB, item_ids=item_ids)
+
+
+def publish_item_changes(item_ids):
+    """
+        Publish the ids of committed Item writes on `ITEM_EVENTS_CHANNEL`, for `item_management.events`.
+    """
+    get_redis_connection('default').publish(ITEM_EVENTS_CHANNEL, json.dumps(list(item_ids)))
+
+
+def encode_change_token(since, until=None, after=0, issued_at=None):
+    token = {'since': since, 'until': until, 'after': after, 'issued_at': issued_at or int(time.time())}
+    return base64.urlsafe_b64encode(json.dumps(token, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_change_token(value):
+    """
+        Decode a change token.
+
+        Returns:
+            dict: The snapshot the client is up to date with (`since`, None before the first sync), when it was
+            taken (`issued_at`), and within a sync the snapshot the sync goes up to (`until`) and the last Item id
+            sent (`after`).
+
+        Raises:
+            InvalidChangeToken: If the token is not valid.
+            ExpiredChangeToken: If the token is older than `ITEM_CHANGE_RETENTION_DAYS`.
+    """
+    try:
+        token = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        since, until, after, issued_at = token['since'], token['until'], token['after'], token['issued_at']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidChangeToken(f'Invalid change token {value}')
+    snapshots_valid = all(snapshot is None or isinstance(snapshot, str) and SNAPSHOT_PATTERN.match(snapshot)
+                          for snapshot in (since, until))
+    if not snapshots_valid or not isinstance(after, int) or not isinstance(issued_at, int):
+        raise InvalidChangeToken(f'Invalid change token {value}')
+    if since is not None and issued_at < time.time() - settings.ITEM_CHANGE_RETENTION_DAYS * 24 * 3600:
+        raise ExpiredChangeToken(f'Change token issued at {issued_at} expired')
+    return token
+
+
+def get_changed_item_ids(token=None, page_size=100):
+    """
+        Return one page of the ids of the Items created, updated or deleted since a change token.
+
+        A sync covers the writes committed between the snapshot of the token (`since`) and the snapshot taken when
+        the sync starts (`until`). Every write is in exactly one sync, whatever order the transactions committed in.
+        The Items are paged by id, each of them once. Without a token, the sync covers every Item.
+
+        The snapshots and the changes are always read from the primary: a replica lagging behind the one that
+        took `until` would miss writes committed before it, which the next sync, starting at `until`, would
+        never send. Read the Items of the page from the primary too.
+
+        Args:
+            token (str): The token returned by the previous page or sync, if any.
+            page_size (int): Number of Items per page.
+
+        Returns:
+            tuple: The Item ids, the next token and whether it is the token of the next page of this sync, rather
+            than the token of the next sync.
+
+        Raises:
+            InvalidChangeToken: If the token is not valid.
+            ExpiredChangeToken: If the token is older than `ITEM_CHANGE_RETENTION_DAYS`.
+    """
+    token = decode_change_token(token) if token else {'since': None, 'until': None, 'after': 0, 'issued_at': None}
+    since, until, after = token['since'], token['until'], token['after']
+    db = DEFAULT_DB_ALIAS
+    if until is None:
+        # Taken before the changes are read: a write committed in between is sent again by the next sync
+        with connections[db].cursor() as cursor:
+            cursor.execute('SELECT pg_current_snapshot()::text')
+            until = cursor.fetchone()[0]
+
+    if since is None:
+        item_ids = Item.objects.using(db).filter(id__gt=after).order_by('id').values_list('id', flat=True)
+    else:
+        since_xmin = int(SNAPSHOT_PATTERN.match(since).group(1))
+        until_xmax = int(SNAPSHOT_PATTERN.match(until).group(2))
+        # The transaction id range is an index range scan, the snapshots tell which of them committed in between
+        item_ids = ItemChange.objects.using(db).filter(
+            txid__gte=since_xmin, txid__lt=until_xmax, item_id__gt=after,
+        ).alias(
+            committed_between=RawSQL(
+                'pg_visible_in_snapshot(txid::text::xid8, %s::pg_snapshot) '
+                'AND NOT pg_visible_in_snapshot(txid::text::xid8, %s::pg_snapshot)',
+                (until, since), output_field=BooleanField(),
+            ),
+        ).filter(committed_between=True).order_by('item_id').values_list('item_id', flat=True).distinct()
+
+    item_ids = list(item_ids[:page_size + 1])
+    if len(item_ids) > page_size:
+        item_ids = item_ids[:page_size]
+        return item_ids, encode_change_token(since, until, item_ids[-1], token['issued_at']), True
+    return item_ids, encode_change_token(until), False
+
+
+def prune_item_changes():
+    """
+        Delete the changes older than `ITEM_CHANGE_RETENTION_DAYS`, which no valid token needs anymore.
+
+        Returns:
+            int: The number of changes deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.ITEM_CHANGE_RETENTION_DAYS, seconds=PRUNE_MARGIN_SECONDS)
+    deleted = 0
+    while True:
+        batch = list(ItemChange.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:PRUNE_BATCH_SIZE])
+        if not batch:
+            return deleted
+        deleted += ItemChange.objects.filter(id__in=batch).delete()[0]
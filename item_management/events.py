@@ -0,0 +1,205 @@
+import asyncio
+import contextvars
+import json
+import logging
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from accounts.async_views import close_request_connections, get_request_slots
+from item_management.cache import tiered_cache
+from item_management.changes import ITEM_EVENTS_CHANNEL
+from item_management.models import Item
+from item_management.views import item_row_serializer
+
+logger = logging.getLogger('item_management')
+
+# Seconds a new subscription waits for the hub to be subscribed to Redis
+SUBSCRIBE_TIMEOUT = 5
+
+# How the filters of a subscription match an Item row, like the filters of the Item list
+FILTER_LOOKUPS = {
+    'name__istartswith': lambda row, value: row.name.casefold().startswith(value.casefold()),
+    'name__icontains': lambda row, value: value.casefold() in row.name.casefold(),
+    'price__gte': lambda row, value: row.price >= value,
+    'price__lte': lambda row, value: row.price <= value,
+    'quantity__lte': lambda row, value: row.quantity <= value,
+}
+
+# The event hub of every event loop, see `get_item_event_hub`
+_hubs = weakref.WeakKeyDictionary()
+
+
+class ItemSubscription:
+    """
+    The Item changes one client is subscribed to: some Items (`ids`) and/or the Items matching `filters`.
+
+    Changes are kept in a dict by Item id until the client is sent them, so a burst of writes to one Item is sent
+    as its latest state only, however slow the client.
+    """
+
+    def __init__(self, ids=None, filters=None):
+        self.ids = set(ids) if ids else None
+        self.filters = filters or {}
+        self.pending = {}
+        self.changed = asyncio.Event()
+
+    def matches(self, row):
+        return all(FILTER_LOOKUPS[lookup](row, value) for lookup, value in self.filters.items())
+
+    def push(self, item_ids, items):
+        """
+            Queue the changes of Items for the client.
+
+            Args:
+                item_ids (iterable): Ids of the Items written.
+                items (dict): Mapping of the id of every written Item that still exists to its row and its
+                    serialized data.
+        """
+        for item_id in item_ids:
+            if self.ids is not None and item_id not in self.ids:
+                continue
+            row, data = items.get(item_id, (None, None))
+            if row is not None and self.matches(row):
+                self.pending[item_id] = ('item', data)
+            else:
+                # Deleted, or no longer matching the filters
+                self.pending[item_id] = ('delete', {'id': item_id})
+        if self.pending:
+            self.changed.set()
+
+    async def stream(self, hub):
+        """
+            Yield the changes as Server-Sent Events until the client disconnects: an `item` event with the Item
+            for every created or updated Item, a `delete` event with its id for every Item deleted or no longer
+            matching the filters, and a comment every `ITEM_EVENTS_HEARTBEAT_SECONDS` to keep the connection
+            open through proxies.
+        """
+        try:
+            # Sent at once, so the client knows it is subscribed
+            yield ': subscribed\n\n'
+            while True:
+                try:
+                    await asyncio.wait_for(self.changed.wait(), settings.ITEM_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                self.changed.clear()
+                pending, self.pending = self.pending, {}
+                yield ''.join(f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+                              for event, data in pending.values())
+        finally:
+            hub.unsubscribe(self)
+
+
+class ItemEventHub:
+    """
+    Fans the Item changes published on `ITEM_EVENTS_CHANNEL` out to the subscriptions of one event loop.
+
+    One Redis subscription serves every client of the process. The ids received are coalesced for
+    `ITEM_EVENTS_COALESCE_SECONDS`, then the changed Items are read once, in one query, and pushed to every
+    subscription, so an idle client costs a coroutine and a few objects: no thread, database connection or Redis
+    connection of its own. The hub listens while it has subscriptions.
+    """
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.ready = asyncio.Event()
+        self._pending = set()
+        self._listener = None
+        self._flush = None
+
+    async def subscribe(self, subscription):
+        """
+            Add a subscription, once the hub listens to Redis.
+
+            Raises:
+                TimeoutError: If the hub could not subscribe to Redis within `SUBSCRIBE_TIMEOUT` seconds.
+        """
+        self.subscriptions.add(subscription)
+        if self._listener is None:
+            # Not in the context of the request, whose database routing it would keep using
+            self._listener = asyncio.create_task(self._listen(), context=contextvars.Context())
+        try:
+            await asyncio.wait_for(self.ready.wait(), SUBSCRIBE_TIMEOUT)
+        except BaseException:
+            self.unsubscribe(subscription)
+            raise
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions and self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+            if self._flush is not None:
+                self._flush.cancel()
+                self._flush = None
+            self._pending.clear()
+            self.ready.clear()
+
+    async def _listen(self):
+        retry_delay = 1
+        while True:
+            pubsub = None
+            try:
+                client = await tiered_cache.async_backend.get_client()
+                pubsub = client.pubsub()
+                await pubsub.subscribe(ITEM_EVENTS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] == 'subscribe':
+                        self.ready.set()
+                        retry_delay = 1
+                    elif message['type'] == 'message':
+                        self.add_changes(json.loads(message['data']))
+            except Exception as e:
+                # Clients catch up on the changes missed meanwhile with the change log
+                logger.warning(f'Item events channel lost: {str(e)}')
+            finally:
+                self.ready.clear()
+                if pubsub is not None:
+                    await asyncio.shield(pubsub.aclose())
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30)
+
+    def add_changes(self, item_ids):
+        self._pending.update(item_ids)
+        if self._flush is None:
+            self._flush = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(settings.ITEM_EVENTS_COALESCE_SECONDS)
+        item_ids, self._pending = self._pending, set()
+        self._flush = None
+        await self.dispatch(item_ids)
+
+    async def dispatch(self, item_ids):
+        """
+            Read the current state of the changed Items, in one query, and push it to every subscription.
+        """
+        subscriptions = list(self.subscriptions)
+        if all(subscription.ids is not None for subscription in subscriptions):
+            # Only read the Items someone is subscribed to
+            item_ids = item_ids & set().union(*(subscription.ids for subscription in subscriptions))
+        if not item_ids:
+            return
+        try:
+            async with get_request_slots():
+                try:
+                    rows = [row async for row in item_row_serializer.get_rows(Item.objects.filter(id__in=item_ids))]
+                finally:
+                    await sync_to_async(close_request_connections)()
+        except Exception as e:
+            logger.error(f'Error reading changed items: {str(e)}')
+            return
+        items = {row.id: (row, data) for row, data in zip(rows, item_row_serializer.serialize(rows))}
+        for subscription in subscriptions:
+            subscription.push(item_ids, items)
+
+
+def get_item_event_hub():
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = ItemEventHub()
+    return hub
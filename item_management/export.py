@@ -0,0 +1,72 @@
+import csv
+from itertools import islice
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from item_management.serializers import ItemRowSerializer
+
+EXPORT_FIELDS = ['id', 'name', 'description', 'quantity', 'price', 'created_at', 'updated_at']
+
+
+class Echo:
+    """
+    File-like object whose `write` hands the written line straight back, used to stream csv rows.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_item_rows(queryset, chunk_size):
+    """
+        Yield chunks of serialized Items, read through a server-side cursor `chunk_size` rows at a time.
+    """
+    serializer = ItemRowSerializer()
+    rows = serializer.get_rows(queryset).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield serializer.serialize(chunk)
+
+
+def iter_ndjson(queryset, chunk_size):
+    """
+        Stream Items as newline delimited JSON, one object per line.
+    """
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for chunk in iter_item_rows(queryset, chunk_size):
+        yield ''.join(f'{encoder.encode(row)}\n' for row in chunk).encode()
+
+
+def iter_csv(queryset, chunk_size):
+    """
+        Stream Items as CSV with a header row.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS).encode()
+    for chunk in iter_item_rows(queryset, chunk_size):
+        yield ''.join(writer.writerow([row[field] for field in EXPORT_FIELDS]) for row in chunk).encode()
+
+
+def accepts_gzip(accept_encoding):
+    """
+        Return whether an `Accept-Encoding` header accepts gzip: listed with a non-zero quality, or, when not
+        listed, covered by `*` with a non-zero quality. `gzip;q=0` refuses it.
+    """
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    return qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0))) > 0
@@ -0,0 +1,44 @@
+from django.contrib.postgres.search import SearchQuery
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from item_management.models import ITEM_SEARCH_CONFIG, ITEM_SEARCH_VECTOR
+from item_management.serializers import ItemFilterSerializer
+
+
+class ItemFilterBackend(BaseFilterBackend):
+    """
+    Filters the Item list by the query parameters declared on `ItemFilterSerializer`.
+
+    `search` runs a PostgreSQL full-text query over name and description, matching the expression of
+    the GIN index on Item so the lookup never has to scan the table.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        serializer = ItemFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = {key: value for key, value in serializer.validated_data.items() if value not in (None, '')}
+
+        search = filters.pop('search', None)
+        updated_since = filters.pop('updated_since', None)
+        if updated_since is not None:
+            filters['updated_at__gte'] = updated_since
+        queryset = queryset.filter(**filters)
+
+        if search:
+            queryset = queryset.annotate(search_vector=ITEM_SEARCH_VECTOR).filter(
+                search_vector=SearchQuery(search, config=ITEM_SEARCH_CONFIG, search_type='websearch')
+            )
+        return queryset
+
+
+class ItemOrderingFilter(OrderingFilter):
+    """
+    Orders the Item list by one of the indexed columns, always breaking ties on `id` so cursor pages are stable.
+    """
+    ordering_fields = ['id', 'created_at', 'updated_at']
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and ordering[-1].lstrip('-') != 'id':
+            ordering = [*ordering, 'id']
+        return ordering
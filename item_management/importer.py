@@ -0,0 +1,189 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from item_management.cache import invalidate_items
+from item_management.changes import record_item_changes
+from item_management.models import Item, StockMovement
+from item_management.serializers import ItemSerializer
+from item_management.stats import record_stock_changes
+from item_management.stock import record_movements
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+ON_CONFLICT_CHOICES = ('skip', 'update')
+
+# Number of row errors kept for the import report
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportStats:
+    """
+    Counters of a running (or finished) Item import.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': self.errors,
+        }
+
+    def __str__(self):
+        return (f'{self.rows} rows (created {self.created}, updated {self.updated}, skipped {self.skipped}, '
+                f'failed {self.failed}) in {self.elapsed:.1f}s - {self.rows_per_second:.0f} rows/sec')
+
+
+def iter_csv_rows(stream):
+    """
+        Yield the rows of a CSV text stream with a header row, leaving out empty values.
+    """
+    for row in csv.DictReader(stream):
+        yield {field: value for field, value in row.items() if field and value not in ('', None)}
+
+
+def iter_ndjson_rows(stream):
+    """
+        Yield the objects of a newline delimited JSON text stream.
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Handed to the serializer as is, so the row is reported as invalid
+                yield line
+
+
+def iter_rows(stream, file_format):
+    if file_format == 'csv':
+        return iter_csv_rows(stream)
+    return iter_ndjson_rows(stream)
+
+
+def import_items(rows, chunk_size=1000, on_conflict='skip', progress=None):
+    """
+        Validate and load Items from an iterable of row dicts, one chunk at a time.
+
+        Every chunk is validated with `ItemSerializer` and written in its own transaction with a single
+        `bulk_create` (and a single `bulk_update` when updating), so a huge file never sits in memory and a
+        failure only loses the current chunk. Rows whose name already exists are skipped or update the
+        existing Item, depending on `on_conflict`. Quantity changes are recorded in the stock ledger with each
+        chunk. The cached copies of the updated Items, and the list pages, are dropped once each chunk commits.
+
+        Args:
+            rows (iterable): Item payloads, e.g. from `iter_rows()`.
+            chunk_size (int): Number of rows validated and written at a time.
+            on_conflict (str): `skip` or `update` Items whose name already exists.
+            progress (callable): Called with the `ImportStats` after every chunk.
+
+        Returns:
+            ImportStats: The counters of the import.
+    """
+    stats = ImportStats()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(chunk, stats, on_conflict)
+        if progress is not None:
+            progress(stats)
+    return stats
+
+
+def _import_chunk(chunk, stats, on_conflict):
+    first_row_number = stats.rows + 1
+    stats.rows += len(chunk)
+
+    serializer = ItemSerializer(data=chunk, many=True)
+    if serializer.is_valid():
+        valid_rows = serializer.validated_data
+    else:
+        valid_rows = []
+        for index, errors in enumerate(serializer.errors):
+            if errors:
+                stats.failed += 1
+                if len(stats.errors) < MAX_REPORTED_ERRORS:
+                    stats.errors.append({'row': first_row_number + index, 'errors': errors})
+            else:
+                valid_rows.append(ItemSerializer().to_internal_value(chunk[index]))
+
+    # The last row wins when a name appears more than once in the chunk
+    rows_by_name = {row['name'].lower(): row for row in valid_rows}
+    stats.skipped += len(valid_rows) - len(rows_by_name)
+
+    with transaction.atomic():
+        existing_items = Item.objects.annotate(name_lower=Lower('name')).filter(name_lower__in=list(rows_by_name))
+        if on_conflict == 'update':
+            # Locked, so the quantity changes recorded in the ledger are exact
+            existing_items = existing_items.select_for_update()
+        existing = {item.name.lower(): item for item in existing_items}
+        to_update = []
+        deltas = {}
+        before = {}
+        if on_conflict == 'update':
+            now = timezone.now()
+            for name, item in existing.items():
+                quantity = item.quantity
+                before[item.id] = (item.quantity, item.price)
+                item.updated_at = now
+                for field, value in rows_by_name[name].items():
+                    setattr(item, field, value)
+                if item.quantity != quantity:
+                    deltas[item.id] = item.quantity - quantity
+                to_update.append(item)
+            Item.objects.bulk_update(to_update, fields=['name', 'description', 'quantity', 'price', 'updated_at'])
+            record_movements(deltas, StockMovement.Reason.UPDATE)
+        else:
+            stats.skipped += len(existing)
+
+        # Names inserted concurrently since the lookup above are skipped by the unique index
+        new_names = [name for name in rows_by_name if name not in existing]
+        Item.objects.bulk_create([Item(**rows_by_name[name]) for name in new_names], ignore_conflicts=True)
+        # `ignore_conflicts` returns no ids. The Items created here are the ones of these names without any
+        # movement yet: a concurrent insert of the same name has committed its movement before ours could go on.
+        created = list(Item.objects.annotate(name_lower=Lower('name')).filter(name_lower__in=new_names).exclude(
+            Exists(StockMovement.objects.filter(item=OuterRef('pk')))
+        ).values_list('id', 'quantity', 'price'))
+        record_movements({item_id: quantity for item_id, quantity, _ in created}, StockMovement.Reason.CREATE)
+        record_stock_changes(before=before, after={
+            **{item.id: (item.quantity, item.price) for item in to_update},
+            **{item_id: (quantity, price) for item_id, quantity, price in created},
+        })
+        record_item_changes([*(item.id for item in to_update), *(item_id for item_id, _, _ in created)])
+        if to_update or created:
+            updated_ids = [item.id for item in to_update]
+            transaction.on_commit(lambda: invalidate_items(updated_ids))
+    stats.updated += len(to_update)
+    stats.created += len(created)
+    # Inserted concurrently, so skipped by the unique index
+    stats.skipped += len(new_names) - len(created)
@@ -0,0 +1,227 @@
+import logging
+import multiprocessing
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from item_management.models import Job
+from item_management.workers import run_worker_process
+
+logger = logging.getLogger('item_management')
+
+# Redis pub/sub channel waking the idle workers up once new jobs are committed
+JOBS_WAKE_CHANNEL = 'jobs:wake'
+
+# Longest delay before the retry of a failed job, in seconds
+MAX_RETRY_DELAY = 3600
+
+# Number of failed jobs deleted at a time by a prune
+PRUNE_BATCH_SIZE = 10000
+
+# Job handlers, by job name, see `job`
+handlers = {}
+
+
+def job(name):
+    """
+        Register a function as the handler of the jobs named `name`. It is called with the payload of every job as
+        keyword arguments. Jobs are run at least once, so handlers must be idempotent.
+    """
+    def register(handler):
+        handlers[name] = handler
+        return handler
+    return register
+
+
+def enqueue_job(name, **payload):
+    """
+        Queue a job in the current transaction: it is run by the workers once the transaction commits, and never if
+        it rolls back. With `JOBS_EAGER`, it is run in this process once the transaction commits instead.
+
+        Args:
+            name (str): Name the handler of the job is registered with.
+            **payload: Arguments of the handler, JSON serializable.
+
+        Returns:
+            Job: The queued job, or None with `JOBS_EAGER`.
+    """
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: run_job(name, payload))
+        return None
+    queued_job = Job.objects.create(name=name, payload=payload)
+    transaction.on_commit(wake_workers)
+    return queued_job
+
+
+def wake_workers():
+    # The workers poll every `JOB_POLL_INTERVAL` seconds anyway, a lost wake up only delays the job
+    try:
+        get_redis_connection('default').publish(JOBS_WAKE_CHANNEL, '1')
+    except Exception as e:
+        logger.warning(f'Error waking up the job workers: {str(e)}')
+
+
+def run_job(name, payload):
+    try:
+        handlers[name](**payload)
+    except Exception as e:
+        logger.error(f'Error running job {name}: {str(e)}')
+
+
+def get_retry_delay(attempts):
+    return min(settings.JOB_RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def run_due_jobs(limit):
+    """
+        Claim and run up to `limit` due jobs, one at a time.
+
+        Returns:
+            int: The number of jobs run.
+    """
+    ran = 0
+    while ran < limit and run_next_job():
+        ran += 1
+    return ran
+
+
+def run_next_job():
+    """
+        Claim the next due job and run it, in a transaction of its own.
+
+        The job is claimed with `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent workers never run the same job
+        and never wait for each other, and a job whose worker died is unlocked and claimed again. Every job commits
+        on its own, so the rows it locks are held for that job alone and jobs of different workers can not lock rows
+        in crossed orders. A failed job is rolled back and retried later, with an exponential backoff, until it is
+        out of `JOB_MAX_ATTEMPTS`.
+
+        Returns:
+            bool: Whether a job was due.
+    """
+    with transaction.atomic():
+        queued_job = Job.objects.select_for_update(skip_locked=True).filter(
+            failed_at__isnull=True, run_at__lte=timezone.now(),
+        ).order_by('run_at', 'id').first()
+        if queued_job is None:
+            return False
+        try:
+            handler = handlers.get(queued_job.name)
+            if handler is None:
+                raise LookupError(f'No handler registered for job {queued_job.name}')
+            with transaction.atomic():
+                handler(**queued_job.payload)
+        except Exception as e:
+            queued_job.attempts += 1
+            queued_job.last_error = f'{type(e).__name__}: {str(e)}'
+            if queued_job.attempts >= settings.JOB_MAX_ATTEMPTS:
+                queued_job.failed_at = timezone.now()
+                logger.error(f'Job {queued_job} failed after {queued_job.attempts} attempts: {str(e)}')
+            else:
+                queued_job.run_at = timezone.now() + timedelta(seconds=get_retry_delay(queued_job.attempts))
+                logger.warning(f'Job {queued_job} failed, retrying at {queued_job.run_at.isoformat()}: {str(e)}')
+            queued_job.save(update_fields=['attempts', 'last_error', 'failed_at', 'run_at'])
+        else:
+            queued_job.delete()
+    return True
+
+
+def prune_failed_jobs():
+    """
+        Delete the jobs that failed for good more than `JOB_RETENTION_DAYS` ago. Done jobs are deleted when they
+        are run.
+
+        Returns:
+            int: The number of jobs deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    deleted = 0
+    while True:
+        batch = list(Job.objects.filter(failed_at__lt=cutoff).values_list('id', flat=True)[:PRUNE_BATCH_SIZE])
+        if not batch:
+            return deleted
+        deleted += Job.objects.filter(id__in=batch).delete()[0]
+
+
+class JobWorker:
+    """
+    Runs the due jobs, a batch at a time, until stopped. When there is no job left, it waits for the wake up
+    published once new jobs are committed, or `poll_interval` seconds at most.
+    """
+
+    def __init__(self, batch_size, poll_interval, stop=None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stop = stop or threading.Event()
+        self._pubsub = None
+
+    def run(self):
+        while not self.stop.is_set():
+            close_old_connections()
+            try:
+                ran = run_due_jobs(self.batch_size)
+            except Exception as e:
+                logger.error(f'Error claiming jobs: {str(e)}')
+                ran = 0
+            if ran < self.batch_size:
+                self.wait()
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+    def wait(self):
+        try:
+            if self._pubsub is None:
+                self._pubsub = get_redis_connection('default').pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(JOBS_WAKE_CHANNEL)
+            deadline = time.monotonic() + self.poll_interval
+            # Wakes up on the first message, and stops every second to check whether it was stopped
+            while not self.stop.is_set() and time.monotonic() < deadline:
+                if self._pubsub.get_message(timeout=min(1.0, deadline - time.monotonic())) is not None:
+                    # Several commits may have woken us up, one batch runs their jobs
+                    while self._pubsub.get_message() is not None:
+                        pass
+                    return
+        except Exception as e:
+            logger.warning(f'Job wake up channel lost, polling: {str(e)}')
+            self._pubsub = None
+            self.stop.wait(self.poll_interval)
+
+
+def run_workers(processes, batch_size, poll_interval, stop):
+    """
+        Run a pool of `processes` worker processes until `stop` is set, replacing the workers that die. With one
+        process, the worker runs in this process.
+
+        Args:
+            processes (int): Number of worker processes.
+            batch_size (int): Number of jobs a worker runs between two checks for stopping.
+            poll_interval (float): Seconds an idle worker waits for new jobs before looking again.
+            stop (threading.Event): Set to stop the workers once their current batch is done.
+    """
+    if processes <= 1:
+        JobWorker(batch_size, poll_interval, stop=stop).run()
+        return
+
+    # Workers start from a fresh process (forkserver, or spawn where it is unavailable), like the user import pool
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(start_method)
+    workers = []
+    try:
+        while not stop.is_set():
+            for worker in [worker for worker in workers if not worker.is_alive()]:
+                logger.error(f'Job worker {worker.pid} exited with code {worker.exitcode}, replacing it.')
+                workers.remove(worker)
+            while len(workers) < processes:
+                worker = context.Process(target=run_worker_process, args=(batch_size, poll_interval), daemon=True)
+                worker.start()
+                workers.append(worker)
+            stop.wait(1)
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
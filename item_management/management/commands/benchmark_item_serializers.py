@@ -0,0 +1,60 @@
+import datetime
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from item_management.models import Item
+from item_management.renderers import ORJSONRenderer, orjson
+from item_management.serializers import ItemRowSerializer, ItemSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare ItemSerializer + JSONRenderer with ItemRowSerializer + ORJSONRenderer on in-memory rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000], help='List sizes to benchmark.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per list size, the best one is reported.')
+
+    def handle(self, *args, **options):
+        row_serializer = ItemRowSerializer()
+        field_names = row_serializer.field_names
+        row_class = namedtuple('Row', field_names)
+        self.stdout.write(f'orjson {"available" if orjson else "not installed, using the DRF JSON renderer"}')
+
+        for size in options['rows']:
+            # Raw rows as the database driver returns them
+            now = datetime.datetime.now(datetime.timezone.utc)
+            raw_rows = [
+                (i, f'Item {i}', f'Description of item {i}', i % 500, Decimal(f'{i % 1000}.99'), now, now)
+                for i in range(size)
+            ]
+
+            def model_serializer():
+                items = [Item.from_db('default', field_names, row) for row in raw_rows]
+                return JSONRenderer().render({'data': ItemSerializer(items, many=True).data})
+
+            def row_serializer_path():
+                rows = [row_class(*row) for row in raw_rows]
+                return ORJSONRenderer().render({'data': row_serializer.serialize(rows)})
+
+            if JSONRenderer().render({'data': row_serializer.serialize(raw_rows)}) != model_serializer():
+                self.stderr.write('ItemRowSerializer output differs from ItemSerializer!')
+
+            slow = self.best_of(model_serializer, options['repeat'])
+            fast = self.best_of(row_serializer_path, options['repeat'])
+            self.stdout.write(
+                f'{size} rows: ItemSerializer {slow * 1000:.0f} ms, ItemRowSerializer {fast * 1000:.0f} ms '
+                f'({slow / fast:.1f}x faster)'
+            )
+
+    @staticmethod
+    def best_of(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started_at)
+        return min(timings)
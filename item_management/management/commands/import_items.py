@@ -0,0 +1,49 @@
+import io
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from item_management.importer import IMPORT_FORMATS, ON_CONFLICT_CHOICES, import_items, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Import Items from a CSV or NDJSON file, in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - to read from stdin.')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='File format, guessed from the file extension when left out.')
+        parser.add_argument('--chunk-size', type=int, default=settings.ITEM_IMPORT_CHUNK_SIZE,
+                            help='Rows validated and written at a time.')
+        parser.add_argument('--on-conflict', choices=ON_CONFLICT_CHOICES, default='skip',
+                            help='What to do with rows whose item name already exists.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format']
+        if file_format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            file_format = 'ndjson' if extension in ('ndjson', 'jsonl') else extension
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError('Could not guess the file format, pass --format.')
+
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        else:
+            try:
+                stream = open(path, encoding='utf-8', newline='')
+            except OSError as e:
+                raise CommandError(f'Could not open {path}: {e}')
+
+        def progress(stats):
+            self.stdout.write(f'Imported {stats}')
+
+        with stream:
+            stats = import_items(iter_rows(stream, file_format), chunk_size=options['chunk_size'],
+                                 on_conflict=options['on_conflict'], progress=progress)
+
+        for error in stats.errors:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(f'Import finished: {stats}'))
@@ -0,0 +1,137 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class LoadTestStats:
+    """
+    Latencies and outcomes of the requests of a load test run.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    def percentile(self, fraction):
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] if latencies else 0.0
+
+
+class Command(BaseCommand):
+    help = ('Load test an Item endpoint with many concurrent keep-alive clients, e.g. to compare the WSGI '
+            'and ASGI deployments.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='URL to request, e.g. http://127.0.0.1:8000/api/items/async/1/')
+        parser.add_argument('--token', help='JWT access token sent as a Bearer token.')
+        parser.add_argument('--concurrency', type=int, default=200, help='Number of concurrent clients.')
+        parser.add_argument('--duration', type=float, default=10, help='Length of the run in seconds.')
+        parser.add_argument('--think-time', type=float, default=0,
+                            help='Seconds every client idles between two requests, to simulate mostly-idle clients.')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request is failed.')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Only http:// URLs are supported.')
+
+        headers = [f'GET {url.path or "/"}{"?" + url.query if url.query else ""} HTTP/1.1', f'Host: {url.netloc}',
+                   'Accept: application/json', 'Connection: keep-alive']
+        if options['token']:
+            headers.append(f'Authorization: Bearer {options["token"]}')
+        request = ('\r\n'.join(headers) + '\r\n\r\n').encode()
+
+        stats = LoadTestStats()
+        started_at = time.monotonic()
+        asyncio.run(self.run(url.hostname, url.port or 80, request, stats, options))
+        elapsed = time.monotonic() - started_at
+
+        self.stdout.write(
+            f'{len(stats.latencies)} requests in {elapsed:.1f}s with {options["concurrency"]} clients: '
+            f'{len(stats.latencies) / elapsed:.0f} requests/sec'
+        )
+        self.stdout.write(
+            f'latency p50 {stats.percentile(0.5) * 1000:.1f} ms, p90 {stats.percentile(0.9) * 1000:.1f} ms, '
+            f'p99 {stats.percentile(0.99) * 1000:.1f} ms, max {stats.percentile(1) * 1000:.1f} ms'
+        )
+        self.stdout.write(f'status codes: {dict(stats.statuses)}')
+        if stats.errors:
+            self.stdout.write(f'errors: {dict(stats.errors)}')
+
+    async def run(self, host, port, request, stats, options):
+        deadline = time.monotonic() + options['duration']
+        await asyncio.gather(*(
+            self.run_client(host, port, request, stats, deadline, options) for _ in range(options['concurrency'])
+        ))
+
+    async def run_client(self, host, port, request, stats, deadline, options):
+        reader = writer = None
+        # Spread the clients over the think time, so they do not all fire at once
+        await asyncio.sleep(random.uniform(0, options['think_time']))
+        while time.monotonic() < deadline:
+            started_at = time.perf_counter()
+            reused = writer is not None
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), options['timeout'])
+                writer.write(request)
+                await writer.drain()
+                status_code, keep_alive = await asyncio.wait_for(self.read_response(reader), options['timeout'])
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as e:
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                # The server may close a keep-alive connection that sat idle, just reconnect then
+                if not (reused and isinstance(e, (ConnectionError, asyncio.IncompleteReadError))):
+                    stats.errors[type(e).__name__] += 1
+                continue
+
+            stats.latencies.append(time.perf_counter() - started_at)
+            stats.statuses[status_code] += 1
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+            if options['think_time']:
+                await asyncio.sleep(options['think_time'])
+
+        if writer is not None:
+            writer.close()
+
+    @staticmethod
+    async def read_response(reader):
+        """
+            Read one HTTP/1.1 response, returning its status code and whether the connection can be reused.
+        """
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b'', None)
+        version, status_code = status_line.split()[:2]
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+
+        keep_alive = version == b'HTTP/1.1' and headers.get('connection') != 'close'
+        if 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                # Chunk data and its CRLF (just the CRLF after the last, empty chunk)
+                await reader.readexactly(size + 2)
+                if not size:
+                    break
+        else:
+            # The body ends with the connection
+            await reader.read()
+            keep_alive = False
+        return int(status_code), keep_alive
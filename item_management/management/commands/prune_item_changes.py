@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from item_management.changes import prune_item_changes
+
+
+class Command(BaseCommand):
+    help = ('Delete the item changes older than ITEM_CHANGE_RETENTION_DAYS, whose change tokens have expired. '
+            'Meant to run periodically, e.g. daily from cron.')
+
+    def handle(self, *args, **options):
+        deleted = prune_item_changes()
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} item changes older than {settings.ITEM_CHANGE_RETENTION_DAYS} days deleted.'
+        ))
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from item_management.jobs import prune_failed_jobs
+
+
+class Command(BaseCommand):
+    help = ('Delete the jobs that failed for good more than JOB_RETENTION_DAYS ago. '
+            'Meant to run periodically, e.g. daily from cron.')
+
+    def handle(self, *args, **options):
+        deleted = prune_failed_jobs()
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} jobs failed more than {settings.JOB_RETENTION_DAYS} days ago deleted.'
+        ))
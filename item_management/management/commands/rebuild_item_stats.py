@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from item_management.stats import rebuild_item_stats
+
+
+class Command(BaseCommand):
+    help = ('Recompute the inventory stock summary from the Items. Run it once to start the summary, after changing '
+            'ITEM_LOW_STOCK_THRESHOLD and after writing Items outside the API.')
+
+    def handle(self, *args, **options):
+        bands = rebuild_item_stats()
+        summary = ', '.join(f'{band} {items}' for band, items in sorted(bands.items()))
+        self.stdout.write(self.style.SUCCESS(f'Item stats rebuilt: {summary or "no items"}.'))
@@ -0,0 +1,29 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from item_management.jobs import run_workers
+
+
+class Command(BaseCommand):
+    help = ('Run the queued jobs (stock summary, item events and hot cache entries after writes) in a pool of '
+            'worker processes, until interrupted. Required unless JOBS_EAGER is set: keep it running next to the '
+            'web servers, e.g. under systemd or supervisord.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+                            help='Number of worker processes, 1 to run the jobs in this process.')
+        parser.add_argument('--batch-size', type=int, default=settings.JOB_BATCH_SIZE,
+                            help='Number of jobs a worker runs between two checks for stopping.')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='Seconds an idle worker waits for new jobs before looking again.')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        self.stdout.write(f'Running jobs in {options["processes"]} worker process(es), interrupt to stop.')
+        run_workers(options['processes'], options['batch_size'], options['poll_interval'], stop)
+        self.stdout.write(self.style.SUCCESS('Job workers stopped.'))
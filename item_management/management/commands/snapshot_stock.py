@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from item_management.stock import take_stock_snapshots
+
+
+class Command(BaseCommand):
+    help = ('Snapshot the quantities of the Items whose stock moved since their last snapshot, so quantities as '
+            'of a past time never scan the whole ledger. Meant to run periodically, e.g. hourly from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--margin', type=float, default=settings.STOCK_SNAPSHOT_MARGIN_SECONDS,
+                            help='Seconds before now the snapshots are taken at, longer than any transaction.')
+
+    def handle(self, *args, **options):
+        taken_at = timezone.now() - timedelta(seconds=options['margin'])
+        taken = take_stock_snapshots(taken_at)
+        self.stdout.write(self.style.SUCCESS(f'{taken} stock snapshots taken as of {taken_at.isoformat()}.'))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from item_management.warming import warm_item_cache
+
+
+class Command(BaseCommand):
+    help = ('Cache the most read items and item list pages, and rebuild the cached ones about to expire. Meant to '
+            'run after every deploy and periodically, more often than --refresh-within, e.g. every minute from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=settings.ITEM_CACHE_WARM_ITEMS,
+                            help='Number of the most read items to warm.')
+        parser.add_argument('--lists', type=int, default=settings.ITEM_CACHE_WARM_LISTS,
+                            help='Number of the most read item list pages to warm.')
+        parser.add_argument('--refresh-within', type=int, default=settings.ITEM_CACHE_REFRESH_AHEAD,
+                            help='Rebuild the entries expiring within this many seconds.')
+        parser.add_argument('--list-url', action='append', default=[], dest='list_urls',
+                            help='Absolute URL of an item list page to warm, e.g. https://example.com/api/items/. '
+                                 'Can be repeated.')
+
+    def handle(self, *args, **options):
+        result = warm_item_cache(options['items'], options['lists'], options['refresh_within'],
+                                 list_urls=options['list_urls'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["warmed"]} item cache entries warmed, {result["refreshed"]} refreshed, '
+            f'{result["fresh"]} still fresh, {result["failed"]} failed.'
+        ))
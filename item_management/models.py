@@ -1,4 +1,13 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+# Full-text search document of an Item, shared by the GIN index and the search filter so the index is used
+ITEM_SEARCH_CONFIG = 'english'
+ITEM_SEARCH_VECTOR = SearchVector('name', 'description', config=ITEM_SEARCH_CONFIG)
 
 
 # Create your models here.
@@ -11,5 +20,153 @@ class Item(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # Case-insensitive unique index, so duplicate names are rejected by a single index lookup on insert
+            models.UniqueConstraint(Lower('name'), name='item_name_ci_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at'], name='item_updated_at_idx'),
+            models.Index(fields=['created_at'], name='item_created_at_idx'),
+            GinIndex(ITEM_SEARCH_VECTOR, name='item_search_idx'),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class StockMovement(models.Model):
+    """
+    One change of the quantity of an Item, in an append-only ledger. `Item.quantity` is the running total of the
+    ledger, written in the same transaction as the movements, see `item_management.stock`.
+    """
+
+    class Reason(models.TextChoices):
+        CREATE = 'create', 'Item created'
+        ADJUST = 'adjust', 'Stock adjustment'
+        UPDATE = 'update', 'Quantity set'
+
+    # No foreign key constraint: the ledger keeps the history of deleted Items. Indexed with `created_at` below.
+    item = models.ForeignKey(Item, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                             related_name='stock_movements')
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=16, choices=Reason.choices)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                             related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The movements of an Item over a time range, for quantities as of a past time
+            models.Index(fields=['item', 'created_at'], name='stock_movement_item_time_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.item_id} {self.delta:+d} ({self.reason})'
+
+
+class StockSnapshot(models.Model):
+    """
+    Quantity of an Item at a point in time, taken periodically by the `snapshot_stock` command, so the quantity as
+    of a past time only sums the movements since the last snapshot before it.
+    """
+    item = models.ForeignKey(Item, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                             related_name='stock_snapshots')
+    quantity = models.IntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # Also the index finding the last snapshot of an Item before a time
+            models.UniqueConstraint(fields=['item', 'taken_at'], name='stock_snapshot_item_time_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.item_id}: {self.quantity} at {self.taken_at}'
+
+
+class ItemStockSummary(models.Model):
+    """
+    Running totals of the Items of one stock band (out of stock, low stock, in stock), kept up to date by the job
+    queued with every write of the API, see `item_management.stats`. Each band is split over a few shards picked at
+    random by the workers, so concurrent jobs do not queue on a single row.
+    """
+    band = models.CharField(max_length=16)
+    shard = models.PositiveSmallIntegerField()
+    items = models.BigIntegerField(default=0)
+    quantity = models.BigIntegerField(default=0)
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['band', 'shard'], name='item_stock_summary_band_shard_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.band}/{self.shard}: {self.items} items, {self.quantity} units, {self.value}'
+
+
+class LowStockItem(models.Model):
+    """
+    The Items at or below the low stock threshold, maintained with `ItemStockSummary`, so they are listed without
+    scanning (or indexing) the quantities of every Item.
+    """
+    item = models.OneToOneField(Item, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False,
+                                related_name='+')
+    quantity = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['quantity', 'item'], name='low_stock_item_quantity_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.item_id}: {self.quantity}'
+
+
+class ItemChange(models.Model):
+    """
+    One write of an Item, appended in the transaction of the write with the id of that transaction. Deletes stay
+    in the log as tombstones, so `/api/items/changes/` tells exactly which Items changed between two database
+    snapshots, see `item_management.changes`.
+    """
+    item = models.ForeignKey(Item, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                             related_name='+')
+    # The `pg_current_xact_id()` of the write, as a bigint
+    txid = models.BigIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The changes between two snapshots are a range of transaction ids
+            models.Index(fields=['txid', 'item'], name='item_change_txid_idx'),
+            models.Index(fields=['created_at'], name='item_change_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.item_id} in {self.txid}'
+
+
+class Job(models.Model):
+    """
+    A job for the `run_workers` processes, queued in the transaction of the write it follows up on, see
+    `item_management.jobs`. Done jobs are deleted; jobs out of attempts are kept, with their error, for inspection
+    until `prune_jobs` deletes them.
+    """
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict)
+    # Not run before then, later for a retry
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    failed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The workers claim the due jobs in order, the failed ones are never claimed again
+            models.Index(fields=['run_at', 'id'], condition=models.Q(failed_at__isnull=True), name='job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,17 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class ItemCursorPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination for the Item list.
+
+    Pages are addressed by an opaque cursor that encodes the last seen `id`, so every page is
+    fetched with an indexed `WHERE id > ... ORDER BY id LIMIT n` query and deep pages cost the
+    same as the first one.
+    The page size can be chosen by the client with `?page_size=` up to `ITEM_LIST_MAX_PAGE_SIZE`.
+    """
+    ordering = 'id'
+    page_size = settings.ITEM_LIST_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.ITEM_LIST_MAX_PAGE_SIZE
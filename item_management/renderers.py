@@ -0,0 +1,27 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson when it is installed, falling back to the standard DRF renderer otherwise.
+    Types orjson does not know (Decimal, lazy strings, ...) are encoded by the DRF JSON encoder, and so are dates,
+    times and datetimes, so the output does not depend on the renderer. Like the standard library, non-str dict keys
+    are encoded as strings.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        # Escape \u2028 and \u2029 like the DRF renderer, so the output stays a strict javascript subset
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
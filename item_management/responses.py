@@ -0,0 +1,37 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+class RenderedJSONResponse(Response):
+    """
+    Response whose JSON body was rendered ahead of time, e.g. read from the cache.
+
+    JSON requests get the body as is, without decoding or rendering it again. Other renderers (like the
+    browsable API) and `.data` get it decoded back into Python data on first access.
+    """
+
+    def __init__(self, json_body, **kwargs):
+        self.json_body = json_body
+        self._data = None
+        super().__init__(**kwargs)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.json_body)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, 'accepted_renderer', None)
+        context = getattr(self, 'renderer_context', None) or {}
+        if isinstance(renderer, JSONRenderer) and renderer.get_indent(self.accepted_media_type, context) is None:
+            self['Content-Type'] = self.content_type or renderer.media_type
+            return self.json_body
+        return super().rendered_content
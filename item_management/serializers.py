@@ -1,9 +1,452 @@
-from rest_framework import serializers
+import datetime
 
-from item_management.models import Item
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from item_management.changes import record_item_changes
+from item_management.models import Item, StockMovement
+from item_management.stats import record_stock_changes
+from item_management.stock import record_movements
 
 
 class ItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Item
         fields = '__all__'
+
+
+class ItemRowSerializer:
+    """
+        Fast, read-only counterpart of `ItemSerializer` for `values_list()` rows.
+
+        The fields of `ItemSerializer` are inspected once, when the serializer is created, into a plan of
+        column names and the encoder each column needs; plain columns are passed through untouched. Rows are
+        then mapped to dicts without any per-row field introspection, with the exact same output as
+        `ItemSerializer`.
+    """
+
+    def __init__(self, serializer_class=ItemSerializer):
+        fields = {name: field for name, field in serializer_class().fields.items() if not field.write_only}
+        self.field_names = [field.source for field in fields.values()]
+        self.output_names = list(fields)
+        self.encoded_fields = [
+            (name, field) for name, field in fields.items()
+            if not isinstance(field, (serializers.IntegerField, serializers.CharField, serializers.BooleanField))
+        ]
+
+    def get_rows(self, queryset):
+        """
+            Return the `values_list()` rows of the queryset. They are named tuples, so they can be cursor paginated.
+        """
+        return queryset.values_list(*self.field_names, named=True)
+
+    def get_encoders(self):
+        encoders = []
+        for name, field in self.encoded_fields:
+            if isinstance(field, serializers.DecimalField) and not field.localize and not field.normalize_output and \
+                    getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+                encoders.append((name, self._decimal_encoder(field)))
+            elif isinstance(field, serializers.DateTimeField) and \
+                    str(getattr(field, 'format', api_settings.DATETIME_FORMAT)).lower() == ISO_8601:
+                encoders.append((name, self._datetime_encoder(field)))
+            else:
+                encoders.append((name, field.to_representation))
+        return encoders
+
+    @staticmethod
+    def _decimal_encoder(field):
+        decimal_places = field.decimal_places
+
+        def encode(value):
+            # Values from the database already have the column's scale, anything else takes the slow path
+            output = f'{value:f}'
+            dot = output.find('.')
+            if dot != -1 and len(output) - dot - 1 == decimal_places:
+                return output
+            return field.to_representation(value)
+        return encode
+
+    @staticmethod
+    def _datetime_encoder(field):
+        # The timezone is looked up once per serialization instead of once per value
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if field_timezone is None:
+            return field.to_representation
+        utc_output = field_timezone is datetime.timezone.utc or \
+            getattr(field_timezone, 'key', getattr(field_timezone, 'zone', None)) in ('UTC', 'Etc/UTC')
+
+        def encode(value):
+            if utc_output and value.tzinfo is datetime.timezone.utc:
+                # Already in the output timezone, as the database driver returns it
+                return value.isoformat()[:-6] + 'Z'
+            if not timezone.is_aware(value):
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return encode
+
+    def serialize(self, rows):
+        """
+            Map rows to a list of dicts, identical to `ItemSerializer(instances, many=True).data`.
+        """
+        output_names = self.output_names
+        encoders = self.get_encoders()
+        data = []
+        for row in rows:
+            item = dict(zip(output_names, row))
+            for name, encode in encoders:
+                value = item[name]
+                if value is not None:
+                    item[name] = encode(value)
+            data.append(item)
+        return data
+
+
+class ItemFilterSerializer(serializers.Serializer):
+    """
+        This Serializer validates the query parameters used to filter the Item list.
+
+        Attributes:
+            name__istartswith: Name prefix, case-insensitive
+            name__icontains: Part of the name, case-insensitive
+            price__gte / price__lte: Price range
+            quantity__lte: Low stock threshold
+            updated_since: Only Items updated at or after this time
+            search: Full-text search over name and description
+    """
+    name__istartswith = serializers.CharField(required=False, allow_blank=True, max_length=255)
+    name__icontains = serializers.CharField(required=False, allow_blank=True, max_length=255)
+    price__gte = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+    price__lte = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+    quantity__lte = serializers.IntegerField(required=False)
+    updated_since = serializers.DateTimeField(required=False)
+    search = serializers.CharField(required=False, allow_blank=True, max_length=255)
+
+
+class ItemEventsQuerySerializer(ItemFilterSerializer):
+    """
+        This Serializer validates the query parameters of the Item events subscription.
+
+        Attributes:
+            ids: Ids of the Items subscribed to, all the Items when omitted
+            name__istartswith / name__icontains / price__gte / price__lte / quantity__lte: Like the Item list
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False,
+                                max_length=settings.ITEM_LIST_MAX_PAGE_SIZE)
+    updated_since = None
+    search = None
+
+
+class ItemBulkListSerializer(serializers.ListSerializer):
+    """
+        List serializer that applies a batch of Item upserts and deletes in one transaction.
+
+        Rows are matched to existing Items by `id`, or by `name` when no `id` is given, and then written
+        with one `bulk_create`, one `bulk_update` and one `DELETE ... WHERE id IN (...)`. An Item can be
+        addressed by several rows, but not both by `id` and by `name`: the later row fails. Quantity changes
+        are recorded in the stock ledger, and applied to the stock summary, in the same transaction.
+    """
+    create_required_fields = ('name', 'description', 'price')
+
+    def save(self, atomic=True, user_id=None):
+        """
+            Apply the validated operations.
+
+            Args:
+                atomic (bool): Reject the whole batch when any row fails. Otherwise the failing rows, including
+                    the rows rejected by the database (e.g. for a duplicate name), are reported and the valid
+                    ones are still written.
+                user_id (int): Id of the user applying the batch, for the stock ledger.
+
+            Returns:
+                list: One result dict per row, in the order the rows were sent.
+
+            Raises:
+                serializers.ValidationError: If `atomic` is set and any row can not be applied.
+        """
+        rows = self.validated_data
+        upserts = [row for row in rows if row['op'] == 'upsert']
+
+        with transaction.atomic():
+            items_by_id = Item.objects.select_for_update().in_bulk(
+                [row['id'] for row in upserts if 'id' in row]
+            )
+            # Names are unique case-insensitively, match them the same way (and through the same index). An Item
+            # matched both ways is one object, so it is written, and its changes recorded, once.
+            items_by_name = {
+                item.name.lower(): items_by_id.get(item.pk, item) for item in Item.objects.select_for_update().annotate(
+                    name_lower=Lower('name')
+                ).filter(name_lower__in=[row['name'].lower() for row in upserts if 'id' not in row])
+            }
+
+            results, to_create, to_update, to_delete, update_fields = [], {}, {}, [], set()
+            # Quantities and prices of the updated Items before the batch, they are locked above
+            initial_values = {}
+            # Whether each existing Item is addressed by `id` or by `name`
+            matched_by = {}
+            for index, row in enumerate(rows):
+                op = row.pop('op')
+                if op == 'delete':
+                    to_delete.append(row['id'])
+                    results.append({'index': index, 'id': row['id'], 'status': 'deleted'})
+                    continue
+
+                item = items_by_id.get(row['id']) if 'id' in row else items_by_name.get(row['name'].lower())
+                if item is None and 'id' in row:
+                    results.append({'index': index, 'id': row['id'], 'status': 'failed',
+                                    'errors': {'id': ['Item not found.']}})
+                    continue
+                if item is None:
+                    missing = [field for field in self.create_required_fields if field not in row]
+                    if missing:
+                        results.append({'index': index, 'status': 'failed',
+                                        'errors': {field: ['This field is required.'] for field in missing}})
+                        continue
+                    # A name sent twice in one batch creates a single Item, later rows update it
+                    item = Item(**row)
+                    items_by_name[item.name.lower()] = item
+                    to_create[id(item)] = item
+                    results.append({'index': index, 'item': item, 'status': 'created'})
+                    continue
+                if item.pk is not None:
+                    key = 'id' if 'id' in row else 'name'
+                    if matched_by.setdefault(item.pk, key) != key:
+                        # Addressed both ways, most likely by mistake: fail the later row rather than guess
+                        results.append({'index': index, 'id': item.pk, 'status': 'failed',
+                                        'errors': {key: ['Item already addressed by another row of the batch.']}})
+                        continue
+
+                if id(item) not in to_create:
+                    initial_values.setdefault(item.id, (item.quantity, item.price))
+                for field, value in row.items():
+                    setattr(item, field, value)
+                update_fields.update(row)
+                if id(item) not in to_create:
+                    to_update[id(item)] = item
+                results.append({'index': index, 'item': item, 'status': 'updated'})
+
+            failed = [result for result in results if result['status'] == 'failed']
+            if failed and atomic:
+                raise serializers.ValidationError(failed)
+
+            update_fields.discard('id')
+            update_fields.add('updated_at')
+            now = timezone.now()
+            for item in to_update.values():
+                item.updated_at = now
+            rejected = set()
+            if atomic:
+                self.write_items(to_create, to_update, update_fields)
+            else:
+                rejected = self.write_valid_items(to_create, to_update, update_fields)
+                for key in rejected:
+                    item = to_create.pop(key, None) or to_update.pop(key)
+                    initial_values.pop(item.pk, None)
+            deleted = Item.objects.select_for_update().filter(id__in=to_delete).order_by('id')
+            deleted_values = {item_id: (quantity, price)
+                              for item_id, quantity, price in deleted.values_list('id', 'quantity', 'price')}
+            deleted_ids = set(deleted_values)
+            Item.objects.filter(id__in=deleted_ids).delete()
+
+            record_movements({item.id: item.quantity for item in to_create.values()}, StockMovement.Reason.CREATE,
+                             user_id=user_id)
+            record_movements({item.id: item.quantity - initial_values[item.id][0] for item in to_update.values()
+                              if item.quantity != initial_values[item.id][0]},
+                             StockMovement.Reason.UPDATE, user_id=user_id)
+            # An Item updated and then deleted by the batch leaves the summary with its values before the batch
+            record_stock_changes(
+                before={**deleted_values, **initial_values},
+                after={item.id: (item.quantity, item.price) for item in [*to_create.values(), *to_update.values()]
+                       if item.id not in deleted_ids},
+            )
+            record_item_changes([*(item.id for item in to_create.values()), *(item.id for item in to_update.values()),
+                                 *deleted_ids])
+
+        for result in results:
+            item = result.pop('item', None)
+            if item is not None:
+                if id(item) in rejected:
+                    result['status'] = 'failed'
+                    result['errors'] = {'name': ['Item already exists.']}
+                if item.pk is not None:
+                    result['id'] = item.pk
+            elif result['status'] == 'deleted' and result['id'] not in deleted_ids:
+                result['status'] = 'not_found'
+        return results
+
+    @staticmethod
+    def write_items(to_create, to_update, update_fields):
+        # Updates first: a rename may free a name created by the batch, and a failed create leaves no Item with
+        # the id of a rolled back row
+        if to_update:
+            Item.objects.bulk_update(to_update.values(), fields=sorted(update_fields))
+        Item.objects.bulk_create(to_create.values())
+
+    def write_valid_items(self, to_create, to_update, update_fields):
+        """
+            Write the Items like `write_items`, leaving out those rejected by the database, e.g. for a name taken
+            by a concurrent request or by another Item of the batch. The batch is written at once in a savepoint,
+            and only if it fails are the Items written one at a time, each in a savepoint of its own.
+
+            Returns:
+                set: The keys, in `to_create` or `to_update`, of the Items rejected.
+        """
+        try:
+            with transaction.atomic():
+                self.write_items(to_create, to_update, update_fields)
+            return set()
+        except IntegrityError:
+            pass
+        rejected = set()
+        for key, item in [*to_create.items(), *to_update.items()]:
+            try:
+                with transaction.atomic():
+                    if key in to_create:
+                        self.write_items({key: item}, {}, update_fields)
+                    else:
+                        self.write_items({}, {key: item}, update_fields)
+            except IntegrityError:
+                rejected.add(key)
+        return rejected
+
+
+class ItemBulkOperationSerializer(ItemSerializer):
+    """
+        This Serializer validates one row of a bulk Item request.
+
+        Attributes:
+            op: `upsert` (default) to create or update the Item, `delete` to delete it
+            id: Id of the Item to update or delete, upserts without it are matched by `name`
+    """
+    op = serializers.ChoiceField(choices=['upsert', 'delete'], default='upsert')
+    id = serializers.IntegerField(required=False)
+
+    class Meta(ItemSerializer.Meta):
+        list_serializer_class = ItemBulkListSerializer
+
+    def validate(self, attrs):
+        attrs.setdefault('op', 'upsert')
+        if attrs['op'] == 'delete' and 'id' not in attrs:
+            raise serializers.ValidationError({'id': ['This field is required to delete an item.']})
+        if attrs['op'] == 'upsert' and 'id' not in attrs and 'name' not in attrs:
+            raise serializers.ValidationError("Either id or name is required to upsert an item.")
+        return attrs
+
+
+class ItemStockQuerySerializer(serializers.Serializer):
+    """
+        This Serializer validates the query parameters of the stock history of an Item.
+
+        Attributes:
+            as_of: Time of the quantity
+    """
+    as_of = serializers.DateTimeField()
+
+
+class ItemAdjustSerializer(serializers.Serializer):
+    """
+        This Serializer validates a stock adjustment of one Item.
+
+        Attributes:
+            delta: Signed amount to add to the Item quantity
+            allow_negative: Allow the quantity to drop below zero
+    """
+    delta = serializers.IntegerField()
+    allow_negative = serializers.BooleanField(default=False)
+
+    def validate_delta(self, value):
+        if value == 0:
+            raise serializers.ValidationError("Delta must not be zero.")
+        return value
+
+
+class ItemAdjustmentSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    delta = serializers.IntegerField()
+
+
+class ItemBatchAdjustSerializer(serializers.Serializer):
+    """
+        This Serializer validates a batch of stock adjustments.
+
+        Attributes:
+            adjustments: List of Item ids and the signed delta to apply to each of them
+            allow_negative: Allow quantities to drop below zero
+    """
+    adjustments = ItemAdjustmentSerializer(many=True, allow_empty=False)
+    allow_negative = serializers.BooleanField(default=False)
+
+    def validate_adjustments(self, value):
+        # Several deltas for the same Item are applied as one
+        deltas = {}
+        for adjustment in value:
+            deltas[adjustment['id']] = deltas.get(adjustment['id'], 0) + adjustment['delta']
+        return deltas
+
+
+class ItemStatsQuerySerializer(serializers.Serializer):
+    """
+        This Serializer validates the query parameters of the inventory stats.
+
+        Attributes:
+            low_stock_limit: Number of low stock Items listed
+    """
+    low_stock_limit = serializers.IntegerField(required=False, min_value=0)
+
+    def validate_low_stock_limit(self, value):
+        if value > settings.ITEM_LIST_MAX_PAGE_SIZE:
+            raise serializers.ValidationError(f"Ensure this value is less than or equal to "
+                                              f"{settings.ITEM_LIST_MAX_PAGE_SIZE}.")
+        return value
+
+
+class ItemChangesQuerySerializer(serializers.Serializer):
+    """
+        This Serializer validates the query parameters of the Item changes.
+
+        Attributes:
+            since: Change token returned by the previous page or sync, omitted for the first sync
+            page_size: Number of Items per page
+    """
+    since = serializers.CharField(required=False)
+    page_size = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_page_size(self, value):
+        if value > settings.ITEM_LIST_MAX_PAGE_SIZE:
+            raise serializers.ValidationError(f"Ensure this value is less than or equal to "
+                                              f"{settings.ITEM_LIST_MAX_PAGE_SIZE}.")
+        return value
+
+
+class ItemStockTotalsSerializer(serializers.Serializer):
+    items = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    value = serializers.DecimalField(max_digits=20, decimal_places=2)
+
+
+class LowStockItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class ItemStatsSerializer(ItemStockTotalsSerializer):
+    """
+        This Serializer renders the inventory stats.
+
+        Attributes:
+            items, quantity, value: Number of Items, units in stock and stock valuation (`sum(quantity * price)`)
+            bands: The same totals for every stock band
+            low_stock_threshold: Highest quantity of a low stock Item
+            low_stock_items: The Items lowest in stock, out of stock Items first
+    """
+    bands = serializers.DictField(child=ItemStockTotalsSerializer())
+    low_stock_threshold = serializers.IntegerField()
+    low_stock_items = LowStockItemSerializer(many=True)
@@ -0,0 +1,186 @@
+import random
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from item_management.jobs import enqueue_job
+from item_management.models import Item, ItemStockSummary, Job, LowStockItem
+
+OUT_OF_STOCK = 'out_of_stock'
+LOW_STOCK = 'low_stock'
+IN_STOCK = 'in_stock'
+STOCK_BANDS = (OUT_OF_STOCK, LOW_STOCK, IN_STOCK)
+
+# Job adding the stock band counter differences of every write to the summary, see `item_management.tasks`
+STOCK_CHANGED_JOB = 'stock_changed'
+
+# Number of low stock Items written at a time by a rebuild
+REBUILD_BATCH_SIZE = 5000
+
+
+def get_stock_band(quantity):
+    """
+        Return the stock band of a quantity: out of stock at or below zero, low stock up to
+        `ITEM_LOW_STOCK_THRESHOLD`, in stock above it.
+    """
+    if quantity <= 0:
+        return OUT_OF_STOCK
+    if quantity <= settings.ITEM_LOW_STOCK_THRESHOLD:
+        return LOW_STOCK
+    return IN_STOCK
+
+
+def record_stock_changes(before=None, after=None):
+    """
+        Apply the Item changes of a write to the stock summary.
+
+        The low stock list is updated in the transaction of the write, with one upsert and one delete at most: its
+        rows are those of the Items written. The differences of the stock band counters, rows shared by every
+        writer, are queued with the write and added by the `STOCK_CHANGED_JOB` once it commits, see
+        `apply_stock_totals`.
+
+        Args:
+            before (dict): Mapping of the id of every updated or deleted Item to its `(quantity, price)` before the
+                write. It must be read under a row lock, in the same transaction.
+            after (dict): Mapping of the id of every created or updated Item to its `(quantity, price)` after the
+                write.
+    """
+    before, after = before or {}, after or {}
+    totals = {}
+    low_stock, not_low_stock = {}, []
+    for item_id in before.keys() | after.keys():
+        old, new = before.get(item_id), after.get(item_id)
+        if old == new:
+            continue
+        for values, sign in ((old, -1), (new, 1)):
+            if values is not None:
+                quantity, price = values
+                band_totals = totals.setdefault(get_stock_band(quantity), [0, 0, Decimal(0)])
+                band_totals[0] += sign
+                band_totals[1] += sign * quantity
+                band_totals[2] += sign * quantity * price
+        if new is not None and get_stock_band(new[0]) != IN_STOCK:
+            low_stock[item_id] = new[0]
+        elif old is not None and get_stock_band(old[0]) != IN_STOCK:
+            not_low_stock.append(item_id)
+
+    totals = {band: [items, quantity, str(value)] for band, (items, quantity, value) in sorted(totals.items())
+              if items or quantity or value}
+    if totals:
+        enqueue_job(STOCK_CHANGED_JOB, totals=totals)
+    if low_stock:
+        LowStockItem.objects.bulk_create(
+            [LowStockItem(item_id=item_id, quantity=quantity) for item_id, quantity in sorted(low_stock.items())],
+            update_conflicts=True, unique_fields=['item'], update_fields=['quantity'],
+        )
+    if not_low_stock:
+        LowStockItem.objects.filter(item_id__in=not_low_stock).delete()
+
+
+def apply_stock_totals(totals):
+    """
+        Add the differences of the stock band counters of a committed write to the summary, with one `UPDATE` per
+        stock band on a shard picked at random. Additions commute, so the writes can be applied in any order.
+
+        Args:
+            totals (dict): Mapping of stock bands to the differences of their `[items, quantity, value]`, the value
+                as a string.
+    """
+    shard = random.randrange(settings.ITEM_STATS_SHARDS)
+    # Always in the same order, and every job commits on its own (see `run_next_job`), so concurrent workers can not
+    # deadlock on the summary rows
+    for band in sorted(totals):
+        items, quantity, value = totals[band]
+        summary = ItemStockSummary.objects.filter(band=band, shard=shard)
+        increments = {'items': F('items') + items, 'quantity': F('quantity') + quantity,
+                      'value': F('value') + Decimal(value)}
+        if not summary.update(**increments):
+            ItemStockSummary.objects.bulk_create([ItemStockSummary(band=band, shard=shard)], ignore_conflicts=True)
+            summary.update(**increments)
+
+
+def get_item_stats(low_stock_limit):
+    """
+        Return the stock valuation and stock band counters from the summary, and the Items lowest in stock.
+
+        Two queries, whatever the number of Items: one aggregate over the summary shards and one range scan of the
+        low stock list.
+
+        Args:
+            low_stock_limit (int): Number of low stock Items listed.
+
+        Returns:
+            dict: The totals, the totals of every stock band and the low stock Items.
+    """
+    bands = {band: {'items': 0, 'quantity': 0, 'value': Decimal(0)} for band in STOCK_BANDS}
+    summary = ItemStockSummary.objects.order_by().values('band').annotate(
+        total_items=Sum('items'), total_quantity=Sum('quantity'), total_value=Sum('value'),
+    )
+    for row in summary:
+        if row['band'] in bands:
+            bands[row['band']] = {'items': row['total_items'], 'quantity': row['total_quantity'],
+                                  'value': row['total_value']}
+    low_stock_items = LowStockItem.objects.order_by('quantity', 'item_id').values(
+        'quantity', id=F('item_id'), name=F('item__name'), price=F('item__price'),
+    )[:low_stock_limit]
+    return {
+        **{key: sum(totals[key] for totals in bands.values()) for key in ('items', 'quantity', 'value')},
+        'bands': bands,
+        'low_stock_threshold': settings.ITEM_LOW_STOCK_THRESHOLD,
+        'low_stock_items': list(low_stock_items),
+    }
+
+
+def rebuild_item_stats():
+    """
+        Recompute the stock summary and the low stock list from the Items, with a single aggregate query.
+
+        Needed once to start the summary, after changing `ITEM_LOW_STOCK_THRESHOLD`, after writing Items outside
+        the API and after a `STOCK_CHANGED_JOB` failed for good. Writers wait for the rebuild: their changes are
+        either counted by the aggregate, and their queued counter differences dropped, or applied to the summary
+        after it.
+
+        Returns:
+            dict: Mapping of every stock band to its number of Items.
+    """
+    band = Case(
+        When(quantity__lte=0, then=Value(OUT_OF_STOCK)),
+        When(quantity__lte=settings.ITEM_LOW_STOCK_THRESHOLD, then=Value(LOW_STOCK)),
+        default=Value(IN_STOCK),
+        output_field=CharField(),
+    )
+    value = Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=20, decimal_places=2))
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Waits for the writes in progress, and holds the next ones back until the rebuild commits
+            cursor.execute(f'LOCK TABLE {connection.ops.quote_name(Item._meta.db_table)} IN SHARE MODE')
+            # Counted by the aggregate already. A job being run is waited for, before its summary rows are locked.
+            Job.objects.filter(name=STOCK_CHANGED_JOB).delete()
+            cursor.execute('LOCK TABLE {}, {} IN SHARE ROW EXCLUSIVE MODE'.format(
+                connection.ops.quote_name(ItemStockSummary._meta.db_table),
+                connection.ops.quote_name(LowStockItem._meta.db_table),
+            ))
+        totals = Item.objects.order_by().annotate(band=band).values('band').annotate(
+            items=Count('id'), total_quantity=Coalesce(Sum('quantity'), 0), total_value=Coalesce(value, Decimal(0)),
+        )
+        ItemStockSummary.objects.all().delete()
+        ItemStockSummary.objects.bulk_create([
+            ItemStockSummary(band=row['band'], shard=0, items=row['items'], quantity=row['total_quantity'],
+                             value=row['total_value'])
+            for row in totals
+        ])
+
+        LowStockItem.objects.all().delete()
+        rows = Item.objects.filter(quantity__lte=settings.ITEM_LOW_STOCK_THRESHOLD).order_by() \
+            .values_list('id', 'quantity').iterator(chunk_size=REBUILD_BATCH_SIZE)
+        while True:
+            batch = [LowStockItem(item_id=item_id, quantity=quantity)
+                     for item_id, quantity in islice(rows, REBUILD_BATCH_SIZE)]
+            if not batch:
+                break
+            LowStockItem.objects.bulk_create(batch)
+    return dict(ItemStockSummary.objects.values_list('band', 'items'))
@@ -0,0 +1,150 @@
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from item_management.changes import record_item_changes
+from item_management.models import Item, StockMovement, StockSnapshot
+from item_management.stats import record_stock_changes
+
+# Number of stock snapshots read and written at a time
+SNAPSHOT_BATCH_SIZE = 5000
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when an adjustment would take the quantity of an Item below zero.
+    """
+
+    def __init__(self, item_id):
+        self.item_id = item_id
+        super().__init__(f'Insufficient stock for item {item_id}')
+
+
+def record_movements(deltas, reason, user_id=None):
+    """
+        Append movements to the stock ledger, in the transaction that changes the quantities.
+
+        Args:
+            deltas (dict): Mapping of Item id to the change of its quantity.
+            reason (str): A `StockMovement.Reason`.
+            user_id (int): Id of the user making the change, if any.
+    """
+    now = timezone.now()
+    StockMovement.objects.bulk_create([
+        StockMovement(item_id=item_id, delta=delta, reason=reason, user_id=user_id, created_at=now)
+        for item_id, delta in deltas.items()
+    ])
+
+
+def adjust_quantities(adjustments, allow_negative=False, user_id=None):
+    """
+        Apply signed quantity deltas to Items in the database, in one transaction.
+
+        Each delta is applied with a single `UPDATE ... SET quantity = quantity + delta`, so concurrent
+        adjustments of the same Item never lose updates. Items are updated in id order to avoid deadlocks
+        between overlapping batches. The deltas are recorded in the stock ledger, and applied to the stock summary,
+        in the same transaction.
+
+        Args:
+            adjustments (dict): Mapping of Item id to the delta to apply.
+            allow_negative (bool): Allow quantities to drop below zero.
+            user_id (int): Id of the user making the adjustment, for the ledger.
+
+        Returns:
+            dict: Mapping of Item id to its new quantity.
+
+        Raises:
+            Item.DoesNotExist: If one of the Items does not exist.
+            InsufficientStock: If a delta would take a quantity below zero and `allow_negative` is not set.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        for item_id in sorted(adjustments):
+            delta = adjustments[item_id]
+            items = Item.objects.filter(pk=item_id)
+            if delta < 0 and not allow_negative:
+                items = items.filter(quantity__gte=-delta)
+            if not items.update(quantity=F('quantity') + delta, updated_at=now):
+                if Item.objects.filter(pk=item_id).exists():
+                    raise InsufficientStock(item_id)
+                raise Item.DoesNotExist(f'Item {item_id} does not exist')
+        record_movements({item_id: delta for item_id, delta in adjustments.items() if delta},
+                         StockMovement.Reason.ADJUST, user_id=user_id)
+
+        # The updated rows stay locked until commit, so these are exactly the quantities we wrote
+        after = {item_id: (quantity, price) for item_id, quantity, price
+                 in Item.objects.filter(pk__in=adjustments).values_list('id', 'quantity', 'price')}
+        record_stock_changes(
+            before={item_id: (quantity - adjustments[item_id], price) for item_id, (quantity, price) in after.items()},
+            after=after,
+        )
+        record_item_changes(after)
+        return {item_id: quantity for item_id, (quantity, _) in after.items()}
+
+
+def get_quantity_as_of(item_id, at):
+    """
+        Return the quantity of an Item at a past time, from the last stock snapshot before that time and the
+        movements since. Both lookups are index range scans, the ledger is never scanned from the start.
+
+        Args:
+            item_id (int): Id of the Item.
+            at (datetime): The time.
+
+        Returns:
+            int: The quantity, or None if the stock history of the Item does not go back to that time.
+    """
+    snapshot = StockSnapshot.objects.filter(item_id=item_id, taken_at__lte=at).order_by('-taken_at') \
+        .values_list('quantity', 'taken_at').first()
+    movements = StockMovement.objects.filter(item_id=item_id, created_at__lte=at)
+    if snapshot is not None:
+        quantity, taken_at = snapshot
+        movements = movements.filter(created_at__gt=taken_at)
+    elif StockMovement.objects.filter(item_id=item_id, reason=StockMovement.Reason.CREATE).exists():
+        # No snapshot yet, but the ledger goes back to the creation of the Item
+        quantity = 0
+    else:
+        # Created before the ledger, its history starts with its first snapshot
+        return None
+    return quantity + (movements.aggregate(total=Sum('delta'))['total'] or 0)
+
+
+def take_stock_snapshots(taken_at):
+    """
+        Snapshot the quantities, as of `taken_at`, of the Items with movements since their last snapshot and of
+        the Items without any snapshot.
+
+        The quantity as of `taken_at` is the current quantity minus the movements since, read in one query, so
+        it is consistent with the ledger. `taken_at` should be far enough in the past that no transaction still
+        running wrote a movement before it.
+
+        Returns:
+            int: The number of snapshots taken.
+    """
+    movements_since = StockMovement.objects.filter(item=OuterRef('pk'), created_at__gt=taken_at) \
+        .order_by().values('item').annotate(total=Sum('delta')).values('total')
+    last_snapshot_at = StockSnapshot.objects.filter(item=OuterRef('pk'), taken_at__lte=taken_at) \
+        .order_by('-taken_at').values('taken_at')[:1]
+    changed = StockMovement.objects.filter(item=OuterRef('pk'), created_at__gt=OuterRef('last_snapshot_at'),
+                                           created_at__lte=taken_at)
+    items = Item.objects.filter(created_at__lte=taken_at).annotate(
+        last_snapshot_at=Subquery(last_snapshot_at),
+    ).filter(
+        Q(last_snapshot_at__isnull=True) | Exists(changed)
+    ).annotate(
+        quantity_at=F('quantity') - Coalesce(Subquery(movements_since), Value(0))
+    ).values_list('id', 'quantity_at')
+
+    taken = 0
+    rows = items.iterator(chunk_size=SNAPSHOT_BATCH_SIZE)
+    while True:
+        batch = [StockSnapshot(item_id=item_id, quantity=quantity, taken_at=taken_at)
+                 for item_id, quantity in islice(rows, SNAPSHOT_BATCH_SIZE)]
+        if not batch:
+            break
+        StockSnapshot.objects.bulk_create(batch, ignore_conflicts=True)
+        taken += len(batch)
+    return taken
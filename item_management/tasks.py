@@ -0,0 +1,23 @@
+from item_management.changes import ITEMS_WRITTEN_JOB, publish_item_changes
+from item_management.jobs import job
+from item_management.stats import STOCK_CHANGED_JOB, apply_stock_totals
+from item_management.warming import rewarm_hot_items
+
+
+@job(ITEMS_WRITTEN_JOB)
+def items_written(item_ids):
+    """
+        Follow up on a committed write of Items: publish it to the clients subscribed to the Item events, then cache
+        the hot ones again. Their cached copies are dropped by the write itself, so reads never wait for the workers.
+    """
+    publish_item_changes(item_ids)
+    rewarm_hot_items(item_ids)
+
+
+@job(STOCK_CHANGED_JOB)
+def stock_changed(totals):
+    """
+        Add the stock band counter differences of a committed write to the stock summary. A worker runs it in the
+        transaction deleting the job, so the differences are added exactly once.
+    """
+    apply_stock_totals(totals)
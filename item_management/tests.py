@@ -1,8 +1,40 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import datetime
+import time
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.http import QueryDict
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 from rest_framework import status
-from rest_framework.test import APITestCase
-from item_management.models import Item
+from rest_framework.renderers import JSONRenderer
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APITransactionTestCase
+from item_management import cache as item_cache, changes, jobs, tiered_cache
+from item_management.models import Item, Job, StockMovement, StockSnapshot
+from item_management.export import accepts_gzip
+from item_management.importer import import_items
+from item_management.pagination import ItemCursorPagination
+from item_management.renderers import ORJSONRenderer
+from item_management.serializers import ItemRowSerializer, ItemSerializer
+from item_management.stats import STOCK_CHANGED_JOB, rebuild_item_stats
+from item_management.stock import adjust_quantities, get_quantity_as_of, take_stock_snapshots
+from item_management.tiered_cache import AsyncRedisCache, HotKeyCounter, LocalCache, TieredCache
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -10,6 +42,10 @@ User = get_user_model()
 
 class ItemManagementTests(APITestCase):
     def setUp(self):
+        # Start every test with an empty cache
+        cache.clear()
+        item_cache.clear_local_item_cache()
+
         # Create a user and get JWT tokens
         self.user = User.objects.create_user(
             email='testuser@yopmail.com',
@@ -78,6 +114,22 @@ class ItemManagementTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('error', response.data)
 
+    def test_create_item_failure_existing_item_different_case(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        Item.objects.create(name='Existing Item', description='An existing item.', quantity=10, price=19.99)
+        data = {
+            'name': 'EXISTING item',
+            'description': 'Trying to create an existing item.',
+            'quantity': 10,
+            'price': 19.99
+        }
+        response = self.client.post(self.item_list_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Item already exists.')
+        self.assertEqual(Item.objects.count(), 1)
+
     def test_list_items_success(self):
         # Authenticate before making the request
         self.authenticate()
@@ -100,6 +152,32 @@ class ItemManagementTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['data']['name'], item.name)
 
+    def test_retrieve_item_cached_as_rendered_json(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Cached Item', description='Cache me.', quantity=2, price=15.99)
+        response = self.client.get(self.item_detail_url(item.id), format='json')
+        self.assertIsInstance(cache.get(item_cache.item_cache_key(item.id)).payload, bytes)
+
+        cached_response = self.client.get(self.item_detail_url(item.id), format='json')
+        # The cached body went out as is, it was never decoded
+        self.assertIsNone(cached_response._data)
+        self.assertEqual(cached_response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(cached_response.content), {
+            'message': 'Item retrieved successfully from Cache',
+            'data': json.loads(response.content)['data'],
+        })
+
+    def test_retrieve_item_browsable_api(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Browsable Item', description='Browse me.', quantity=2, price=15.99)
+        response = self.client.get(self.item_detail_url(item.id), HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'Browsable Item')
+
     def test_retrieve_item_not_found(self):
         # Authenticate before making the request
         self.authenticate()
@@ -122,6 +200,27 @@ class ItemManagementTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['data']['name'], 'Updated Item')
 
+    def test_update_item_failure_existing_name(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        Item.objects.create(name='Existing Item', description='An existing item.', quantity=10, price=19.99)
+        item = Item.objects.create(name='Item to Update', description='Update me.', quantity=2, price=25.99)
+        response = self.client.patch(self.item_detail_url(item.id), {'name': 'existing item'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        item.refresh_from_db()
+        self.assertEqual(item.name, 'Item to Update')
+
+    def test_update_item_integrity_error_without_name(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Item to Update', description='Update me.', quantity=2, price=25.99)
+        with mock.patch('item_management.views.ItemsRetrieveUpdateDestroyAPIView.perform_update',
+                        side_effect=IntegrityError):
+            response = self.client.patch(self.item_detail_url(item.id), {'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_delete_item_success(self):
         # Authenticate before making the request
         self.authenticate()
@@ -137,3 +236,1108 @@ class ItemManagementTests(APITestCase):
 
         response = self.client.delete(self.item_detail_url(542), format='json')  # Non-existing ID
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_items_cursor_pagination(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        for i in range(5):
+            Item.objects.create(name=f'Item {i}', description='Paged item.', quantity=i, price=1.00)
+
+        response = self.client.get(self.item_list_url, {'page_size': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data['data']], ['Item 0', 'Item 1'])
+        self.assertIsNone(response.data['previous'])
+
+        # Follow the opaque cursor to the next page
+        response = self.client.get(response.data['next'], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data['data']], ['Item 2', 'Item 3'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_list_items_page_size_is_capped(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        for i in range(3):
+            Item.objects.create(name=f'Item {i}', description='Paged item.', quantity=i, price=1.00)
+
+        with mock.patch.object(ItemCursorPagination, 'max_page_size', 2):
+            response = self.client.get(self.item_list_url, {'page_size': 1000}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_list_items_invalid_cursor(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        response = self.client.get(self.item_list_url, {'cursor': 'not-a-cursor'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_items_filters(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        Item.objects.create(name='Red Widget', description='A small red widget.', quantity=2, price=5.00)
+        Item.objects.create(name='Blue Widget', description='A large blue widget.', quantity=50, price=15.00)
+        Item.objects.create(name='Gadget', description='Batteries not included.', quantity=1, price=25.00)
+
+        def names(params):
+            response = self.client.get(self.item_list_url, params, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [item['name'] for item in response.data['data']]
+
+        self.assertEqual(names({'name__icontains': 'widget'}), ['Red Widget', 'Blue Widget'])
+        self.assertEqual(names({'name__istartswith': 'blue'}), ['Blue Widget'])
+        self.assertEqual(names({'price__gte': 10, 'price__lte': 20}), ['Blue Widget'])
+        self.assertEqual(names({'quantity__lte': 2}), ['Red Widget', 'Gadget'])
+        self.assertEqual(names({'search': 'widgets'}), ['Red Widget', 'Blue Widget'])
+        self.assertEqual(names({'search': 'batteries'}), ['Gadget'])
+        self.assertEqual(names({'ordering': '-id'}), ['Gadget', 'Blue Widget', 'Red Widget'])
+
+    def test_list_items_ordered_cursor_pagination(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        for i in range(3):
+            Item.objects.create(name=f'Item {i}', description='Paged item.', quantity=i, price=1.00)
+
+        response = self.client.get(self.item_list_url, {'ordering': '-updated_at', 'page_size': 2}, format='json')
+        self.assertEqual([item['name'] for item in response.data['data']], ['Item 2', 'Item 1'])
+        response = self.client.get(response.data['next'], format='json')
+        self.assertEqual([item['name'] for item in response.data['data']], ['Item 0'])
+
+    def test_list_items_invalid_filter(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        response = self.client.get(self.item_list_url, {'price__gte': 'cheap'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price__gte', response.data['error'])
+
+    def test_write_invalidates_cached_list_pages(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        Item.objects.create(name='Item 1', description='First item.', quantity=5, price=9.99)
+        response = self.client.get(self.item_list_url, format='json')
+        self.assertEqual(len(response.data['data']), 1)
+        response = self.client.get(self.item_list_url, format='json')
+        self.assertEqual(response.data['message'], 'Items retrieved from cache.')
+
+        data = {'name': 'Item 2', 'description': 'Second item.', 'quantity': 3, 'price': 19.99}
+        self.client.post(self.item_list_url, data, format='json')
+        response = self.client.get(self.item_list_url, format='json')
+        self.assertEqual(response.data['message'], 'Items retrieved successfully')
+        self.assertEqual(len(response.data['data']), 2)
+
+
+    def test_bulk_upsert_and_delete(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        existing = Item.objects.create(name='Existing Item', description='Existing.', quantity=1, price=5.00)
+        doomed = Item.objects.create(name='Doomed Item', description='Delete me.', quantity=1, price=5.00)
+        operations = [
+            {'name': 'Bulk Item', 'description': 'Created in bulk.', 'quantity': 4, 'price': 2.50},
+            {'name': 'Existing Item', 'quantity': 7},
+            {'op': 'delete', 'id': doomed.id},
+        ]
+        response = self.client.post(reverse('item-bulk'), operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['data']['results']],
+                         ['created', 'updated', 'deleted'])
+        self.assertEqual(Item.objects.get(name='Bulk Item').quantity, 4)
+        existing.refresh_from_db()
+        self.assertEqual(existing.quantity, 7)
+        self.assertFalse(Item.objects.filter(id=doomed.id).exists())
+
+    def test_bulk_atomic_failure_rolls_back(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        operations = [
+            {'name': 'Bulk Item', 'description': 'Created in bulk.', 'quantity': 4, 'price': 2.50},
+            {'id': 9999, 'quantity': 1},
+        ]
+        response = self.client.post(reverse('item-bulk'), operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Item.objects.filter(name='Bulk Item').exists())
+
+    def test_bulk_non_atomic_reports_failed_rows(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        operations = [
+            {'name': 'Bad Price', 'description': 'Invalid.', 'price': 'free'},
+            {'name': 'Bulk Item', 'description': 'Created in bulk.', 'quantity': 4, 'price': 2.50},
+            {'name': 'No Description', 'price': 1.00},
+        ]
+        response = self.client.post(f"{reverse('item-bulk')}?atomic=false", operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['data']['results']
+        self.assertEqual([result['index'] for result in results], [0, 1, 2])
+        self.assertEqual([result['status'] for result in results], ['failed', 'created', 'failed'])
+        self.assertIn('price', results[0]['errors'])
+        self.assertIn('description', results[2]['errors'])
+        self.assertTrue(Item.objects.filter(name='Bulk Item').exists())
+
+    def test_bulk_non_atomic_reports_duplicate_names(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        taken = Item.objects.create(name='Taken Item', description='Existing.', quantity=1, price=5.00)
+        renamed = Item.objects.create(name='Renamed Item', description='Existing.', quantity=1, price=5.00)
+        operations = [
+            {'name': 'Bulk Item', 'description': 'Created in bulk.', 'quantity': 4, 'price': 2.50},
+            {'id': renamed.id, 'name': 'taken item', 'quantity': 3},
+            {'id': taken.id, 'quantity': 2},
+        ]
+        response = self.client.post(f"{reverse('item-bulk')}?atomic=false", operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['data']['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'failed', 'updated'])
+        self.assertEqual(results[1], {'index': 1, 'id': renamed.id, 'status': 'failed',
+                                      'errors': {'name': ['Item already exists.']}})
+        self.assertEqual(response.data['data']['summary']['failed'], 1)
+        renamed.refresh_from_db()
+        self.assertEqual((renamed.name, renamed.quantity), ('Renamed Item', 1))
+        self.assertEqual(Item.objects.get(pk=taken.id).quantity, 2)
+        self.assertTrue(Item.objects.filter(name='Bulk Item').exists())
+        self.assertFalse(StockMovement.objects.filter(item=renamed).exists())
+
+        # Atomic batches are still rejected as a whole
+        response = self.client.post(reverse('item-bulk'), operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_item_addressed_by_id_and_name(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Existing Item', description='Existing.', quantity=1, price=5.00)
+        operations = [
+            {'id': item.id, 'quantity': 5},
+            {'name': 'existing item', 'quantity': 9},
+        ]
+        response = self.client.post(f"{reverse('item-bulk')}?atomic=false", operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['data']['results']
+        self.assertEqual([result['status'] for result in results], ['updated', 'failed'])
+        self.assertEqual(results[1]['id'], item.id)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 5)
+        # The update is recorded once
+        self.assertEqual(list(StockMovement.objects.filter(item=item).values_list('delta', flat=True)), [4])
+
+        response = self.client.post(reverse('item-bulk'), operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_ndjson(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        body = (
+            '{"name": "Item 1", "description": "First item.", "quantity": 5, "price": 9.99}\n'
+            '{"name": "Item 2", "description": "Second item.", "quantity": 3, "price": 19.99}\n'
+        )
+        response = self.client.post(reverse('item-bulk'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['summary']['created'], 2)
+        self.assertEqual(Item.objects.count(), 2)
+
+    def test_adjust_item_quantity(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Item to Adjust', description='Adjust me.', quantity=5, price=5.00)
+        response = self.client.post(reverse('item-adjust', args=[item.id]), {'delta': -3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'], {'id': item.id, 'quantity': 2})
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 2)
+
+    def test_adjust_item_quantity_invalidates_cached_list_pages(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Item to Adjust', description='Adjust me.', quantity=5, price=5.00)
+        etag = self.client.get(self.item_list_url)['ETag']
+        self.client.post(reverse('item-adjust', args=[item.id]), {'delta': -3}, format='json')
+        response = self.client.get(self.item_list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'][0]['quantity'], 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        self.client.post(reverse('item-batch-adjust'), {'adjustments': [{'id': item.id, 'delta': 4}]}, format='json')
+        response = self.client.get(self.item_list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'][0]['quantity'], 6)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_adjust_item_quantity_insufficient_stock(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Item to Adjust', description='Adjust me.', quantity=2, price=5.00)
+        response = self.client.post(reverse('item-adjust', args=[item.id]), {'delta': -3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 2)
+
+        # The guard can be lifted explicitly
+        response = self.client.post(reverse('item-adjust', args=[item.id]), {'delta': -3, 'allow_negative': True},
+                                    format='json')
+        self.assertEqual(response.data['data']['quantity'], -1)
+
+    def test_adjust_item_not_found(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        response = self.client.post(reverse('item-adjust', args=[9999]), {'delta': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_batch_adjust_is_all_or_nothing(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        first = Item.objects.create(name='Item 1', description='First item.', quantity=5, price=9.99)
+        second = Item.objects.create(name='Item 2', description='Second item.', quantity=1, price=19.99)
+        data = {'adjustments': [{'id': first.id, 'delta': -2}, {'id': second.id, 'delta': -2}]}
+        response = self.client.post(reverse('item-batch-adjust'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        first.refresh_from_db()
+        self.assertEqual(first.quantity, 5)
+
+        data = {'adjustments': [{'id': first.id, 'delta': -2}, {'id': second.id, 'delta': 4},
+                                {'id': first.id, 'delta': -1}]}
+        response = self.client.post(reverse('item-batch-adjust'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'], [{'id': first.id, 'quantity': 2}, {'id': second.id, 'quantity': 5}])
+
+    def test_export_items_ndjson(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        first = Item.objects.create(name='Item 1', description='First item.', quantity=5, price=9.99)
+        Item.objects.create(name='Item 2', description='Second item.', quantity=3, price=19.99)
+        response = self.client.get(reverse('item-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows[0], ItemSerializer(first).data)
+        self.assertEqual([row['name'] for row in rows], ['Item 1', 'Item 2'])
+
+    def test_export_items_csv_gzip_updated_since(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        Item.objects.create(name='Old Item', description='Old, item.', quantity=5, price=9.99)
+        since = timezone.now()
+        Item.objects.create(name='New Item', description='New, item.', quantity=3, price=19.99)
+        response = self.client.get(reverse('item-export'), {'output': 'csv', 'updated_since': since.isoformat()},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([(row['name'], row['description']) for row in rows], [('New Item', 'New, item.')])
+
+    def test_export_items_gzip_negotiation(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        response = self.client.get(reverse('item-export'), HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+        cases = {
+            'gzip, deflate': True,
+            'br;q=1.0, gzip;q=0.8': True,
+            'br, *;q=0.1': True,
+            'gzip;q=0, *': False,
+            '*;q=0': False,
+            'deflate': False,
+            'gzipped': False,
+            '': False,
+        }
+        for header, accepted in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(accepts_gzip(header), accepted)
+
+    def test_export_items_unsupported_output(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        response = self.client.get(reverse('item-export'), {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_items_upload(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        Item.objects.create(name='Existing Item', description='Existing.', quantity=1, price=5.00)
+        upload = SimpleUploadedFile('items.csv', (
+            'name,description,quantity,price\n'
+            'New Item,Imported.,4,2.50\n'
+            'existing item,Imported again.,9,3.00\n'
+            'Broken Item,No price.,1,\n'
+        ).encode())
+        response = self.client.post(f"{reverse('item-import')}?on_conflict=update", {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data['data']
+        self.assertEqual((stats['rows'], stats['created'], stats['updated'], stats['failed']), (3, 1, 1, 1))
+        self.assertEqual(stats['errors'][0]['row'], 3)
+        self.assertEqual(Item.objects.get(name__iexact='existing item').quantity, 9)
+
+    def test_import_items_command(self):
+        Item.objects.create(name='Item 1', description='Existing.', quantity=1, price=5.00)
+        rows = [{'name': f'Item {i}', 'description': 'Imported.', 'quantity': i, 'price': '1.00'} for i in range(5)]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as file:
+            file.write(''.join(f'{json.dumps(row)}\n' for row in rows))
+        self.addCleanup(os.remove, file.name)
+
+        out = io.StringIO()
+        call_command('import_items', file.name, '--chunk-size', '2', stdout=out)
+        self.assertIn('Import finished: 5 rows (created 4, updated 0, skipped 1, failed 0)', out.getvalue())
+        self.assertEqual(Item.objects.count(), 5)
+        self.assertEqual(Item.objects.get(name='Item 1').quantity, 1)
+        self.assertEqual(StockMovement.objects.filter(reason='create').count(), 4)
+
+    def test_import_items_counts_rows_inserted_concurrently_as_skipped(self):
+        bulk_create = Item.objects.bulk_create
+
+        def insert_concurrently(items, **kwargs):
+            # Another import commits the same name, with its movement, between the lookup and the insert
+            item = Item.objects.create(name='Raced Item', description='Concurrent.', quantity=1, price=1.00)
+            StockMovement.objects.create(item=item, delta=1, reason=StockMovement.Reason.CREATE)
+            return bulk_create(items, **kwargs)
+
+        rows = [{'name': name, 'description': 'Imported.', 'quantity': 2, 'price': '1.00'}
+                for name in ('Raced Item', 'Imported Item')]
+        with mock.patch.object(Item.objects, 'bulk_create', side_effect=insert_concurrently):
+            stats = import_items(rows)
+        self.assertEqual((stats.rows, stats.created, stats.skipped), (2, 1, 1))
+        self.assertEqual(Item.objects.get(name='Raced Item').quantity, 1)
+
+    def test_stock_movements_are_recorded(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        response = self.client.post(self.item_list_url, {'name': 'Ledger Item', 'description': 'Tracked.',
+                                                          'quantity': 5, 'price': 9.99}, format='json')
+        item_id = response.data['data']['id']
+        self.client.post(reverse('item-adjust', args=[item_id]), {'delta': -2}, format='json')
+        self.client.patch(self.item_detail_url(item_id), {'quantity': 10}, format='json')
+        # An update leaving the quantity alone records nothing
+        self.client.patch(self.item_detail_url(item_id), {'description': 'Still tracked.'}, format='json')
+
+        movements = StockMovement.objects.filter(item_id=item_id).order_by('id')
+        self.assertEqual([(movement.reason, movement.delta, movement.user_id) for movement in movements], [
+            ('create', 5, self.user.id), ('adjust', -2, self.user.id), ('update', 7, self.user.id),
+        ])
+        self.assertEqual(sum(movement.delta for movement in movements), Item.objects.get(pk=item_id).quantity)
+
+    def test_admin_writes_go_through_the_ledger(self):
+        admin_user = User.objects.create_superuser(email='admin@yopmail.com', name='Admin', password='adminpass123')
+        self.client.force_login(admin_user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:item_management_item_add'), {
+                'name': 'Admin Item', 'description': 'Added.', 'quantity': 5, 'price': '2.00',
+            })
+        item = Item.objects.get(name='Admin Item')
+        # Cached by a read, the edit below must invalidate it
+        self.authenticate()
+        self.client.get(self.item_detail_url(item.id))
+
+        # The quantity of an existing Item is read-only, a posted one is ignored
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:item_management_item_change', args=[item.id]), {
+                'name': 'Admin Item', 'description': 'Edited.', 'quantity': 50, 'price': '3.00',
+            })
+        item.refresh_from_db()
+        self.assertEqual((item.description, item.quantity), ('Edited.', 5))
+        self.assertEqual(self.client.get(self.item_detail_url(item.id)).data['data']['description'], 'Edited.')
+        self.assertEqual(list(StockMovement.objects.filter(item=item).values_list('reason', 'delta', 'user_id')),
+                         [('create', 5, admin_user.id)])
+
+        jobs.run_due_jobs(limit=1000)
+        self.assertEqual(self.client.get(reverse('item-stats')).data['data']['value'], '15.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:item_management_item_changelist'), {
+                'action': 'delete_selected', '_selected_action': [item.id], 'post': 'yes',
+            })
+        self.assertFalse(Item.objects.filter(pk=item.id).exists())
+        self.assertEqual(self.client.get(self.item_detail_url(item.id)).status_code, status.HTTP_404_NOT_FOUND)
+        jobs.run_due_jobs(limit=1000)
+        self.assertEqual(self.client.get(reverse('item-stats')).data['data']['items'], 0)
+
+    def test_update_without_quantity_keeps_concurrent_adjustment(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Item', description='Adjusted meanwhile.', quantity=5, price=5.00)
+        # Cached by the first read, the adjustment below lands after it
+        self.client.get(self.item_detail_url(item.id))
+        adjust_quantities({item.id: 3})
+        self.client.patch(self.item_detail_url(item.id), {'description': 'Edited.'}, format='json')
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 8)
+
+    def test_stock_as_of(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Item', description='Tracked.', quantity=0, price=5.00)
+        url = reverse('item-stock-as-of', args=[item.id])
+        # Created before the ledger and never snapshotted, its history is unknown
+        response = self.client.get(url, {'as_of': timezone.now().isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        adjust_quantities({item.id: 4})
+        snapshot_at = timezone.now()
+        self.assertEqual(take_stock_snapshots(snapshot_at), 1)
+        # Nothing moved since, so there is nothing to snapshot again
+        self.assertEqual(take_stock_snapshots(timezone.now()), 0)
+        adjust_quantities({item.id: -1})
+        after_first = timezone.now()
+        adjust_quantities({item.id: 5})
+
+        self.assertEqual(StockSnapshot.objects.get(item=item).quantity, 4)
+        response = self.client.get(url, {'as_of': snapshot_at.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['quantity'], 4)
+        self.assertEqual(self.client.get(url, {'as_of': after_first.isoformat()}).data['data']['quantity'], 3)
+        self.assertEqual(self.client.get(url, {'as_of': timezone.now().isoformat()}).data['data']['quantity'], 8)
+
+        # A later snapshot is taken as of its time, not from the current quantity
+        self.assertEqual(take_stock_snapshots(after_first), 1)
+        self.assertEqual(StockSnapshot.objects.get(item=item, taken_at=after_first).quantity, 3)
+        self.assertEqual(get_quantity_as_of(item.id, timezone.now()), 8)
+
+        response = self.client.get(url, {'as_of': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('as_of', response.data['error'])
+
+    def test_item_stats_follow_writes(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        for name, quantity, price in (('Empty', 0, '2.00'), ('Scarce', 4, '10.00'), ('Plenty', 50, '1.50')):
+            self.client.post(self.item_list_url, {'name': name, 'description': 'Counted.', 'quantity': quantity,
+                                                  'price': price}, format='json')
+        ids = dict(Item.objects.values_list('name', 'id'))
+        self.client.post(reverse('item-adjust', args=[ids['Plenty']]), {'delta': -45}, format='json')
+        self.client.patch(self.item_detail_url(ids['Empty']), {'quantity': 20, 'price': '3.00'}, format='json')
+        self.client.post(reverse('item-bulk'), [
+            {'name': 'Bulk', 'description': 'Counted.', 'quantity': 7, 'price': '1.00'},
+            {'id': ids['Scarce'], 'quantity': 30},
+            {'op': 'delete', 'id': ids['Scarce']},
+        ], format='json')
+        self.client.delete(self.item_detail_url(ids['Plenty']))
+        # The stock band counters are updated by the jobs of the writes
+        jobs.run_due_jobs(limit=1000)
+
+        response = self.client.get(reverse('item-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data['data']
+        # Empty: 20 x 3.00, Bulk: 7 x 1.00
+        self.assertEqual((stats['items'], stats['quantity'], stats['value']), (2, 27, '67.00'))
+        self.assertEqual(stats['bands']['in_stock'], {'items': 1, 'quantity': 20, 'value': '60.00'})
+        self.assertEqual(stats['bands']['out_of_stock'], {'items': 0, 'quantity': 0, 'value': '0.00'})
+        self.assertEqual([(row['name'], row['quantity']) for row in stats['low_stock_items']], [('Bulk', 7)])
+
+        # The summary kept up to date by the writes matches the one computed from the Items
+        self.assertEqual(rebuild_item_stats(), {'in_stock': 1, 'low_stock': 1})
+        self.assertEqual(self.client.get(reverse('item-stats')).data['data'], stats)
+
+        # A rebuild counts the writes whose job is still queued, and drops the job
+        self.client.post(reverse('item-adjust', args=[Item.objects.get(name='Bulk').id]), {'delta': 1}, format='json')
+        self.assertEqual(rebuild_item_stats(), {'in_stock': 1, 'low_stock': 1})
+        self.assertFalse(Job.objects.filter(name=STOCK_CHANGED_JOB).exists())
+        self.assertEqual(self.client.get(reverse('item-stats')).data['data']['quantity'], 28)
+
+        response = self.client.get(reverse('item-stats'), {'low_stock_limit': -1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('low_stock_limit', response.data['error'])
+
+    def test_conditional_get_and_update(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Polled Item', description='Polled.', quantity=2, price=15.99)
+        response = self.client.get(self.item_detail_url(item.id))
+        etag = response['ETag']
+        self.assertEqual(response['Last-Modified'], http_date(item.updated_at.timestamp()))
+
+        # Answered from the cached entry alone
+        with self.assertNumQueries(0):
+            response = self.client.get(self.item_detail_url(item.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        response = self.client.get(self.item_detail_url(item.id), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(reverse('item-retrieve-async', args=[item.id]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # A conditional update only applies to the version it was read from
+        response = self.client.patch(self.item_detail_url(item.id), {'quantity': 3}, format='json',
+                                     HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_etag = response['ETag']
+        self.assertNotEqual(new_etag, etag)
+        response = self.client.patch(self.item_detail_url(item.id), {'quantity': 4}, format='json',
+                                     HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 3)
+
+        # The ETag of the update is the one of the next read, which is no longer not modified
+        response = self.client.get(self.item_detail_url(item.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], new_etag)
+
+    def test_conditional_get_item_list(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        Item.objects.create(name='Item 1', description='First item.', quantity=5, price=9.99)
+        etag = self.client.get(self.item_list_url)['ETag']
+        response = self.client.get(self.item_list_url, HTTP_IF_NONE_MATCH=f'"other", {etag}')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(reverse('item-list-async'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(self.item_list_url, {'name': 'Item 2', 'description': 'Second item.', 'quantity': 1,
+                                              'price': 1.00}, format='json')
+        response = self.client.get(self.item_list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 2)
+
+    def test_async_retrieve_shares_cache_with_sync_views(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Async Item', description='Served async.', quantity=2, price=15.99)
+        response = self.client.get(reverse('item-retrieve-async', args=[item.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['message'], 'Item retrieved successfully')
+
+        # The entry cached by the async view is served by the sync view, and the bodies match
+        sync_response = self.client.get(self.item_detail_url(item.id), format='json')
+        self.assertEqual(sync_response.data['message'], 'Item retrieved successfully from Cache')
+        self.assertEqual(json.loads(sync_response.content)['data'], response.json()['data'])
+
+        response = self.client.get(reverse('item-retrieve-async', args=[9999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_list_matches_sync_list(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        Item.objects.create(name='Item 1', description='First item.', quantity=5, price=9.99)
+        Item.objects.create(name='Item 2', description='Second item.', quantity=3, price=19.99)
+
+        response = self.client.get(reverse('item-list-async'), {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['message'], 'Items retrieved successfully')
+        sync_response = self.client.get(self.item_list_url, {'page_size': 1}, format='json')
+        self.assertEqual(sync_response.data['message'], 'Items retrieved from cache.')
+        self.assertEqual(json.loads(sync_response.content)['data'], response.json()['data'])
+        self.assertIsNotNone(response.json()['next'])
+
+        response = self.client.get(reverse('item-list-async'), {'price__gte': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_adjust_item_quantity(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        item = Item.objects.create(name='Item to Adjust', description='Adjust me.', quantity=5, price=5.00)
+        self.client.get(reverse('item-retrieve-async', args=[item.id]))
+        etag = self.client.get(reverse('item-list-async'))['ETag']
+        response = self.client.post(reverse('item-adjust-async', args=[item.id]), {'delta': -3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data'], {'id': item.id, 'quantity': 2})
+        self.assertIsNone(cache.get(item_cache.item_cache_key(item.id)))
+        response = self.client.get(reverse('item-list-async'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data'][0]['quantity'], 2)
+
+        response = self.client.post(reverse('item-adjust-async', args=[item.id]), {'delta': -3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.client.post(reverse('item-adjust-async', args=[item.id]), {'delta': 0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_views_require_item_adder(self):
+        response = self.client.get(reverse('item-list-async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        response = self.client.get(reverse('item-list-async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.is_item_adder = False
+        self.user.save()
+        self.authenticate()
+        self.assertEqual(self.client.get(reverse('item-list-async')).status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('item-retrieve-async', args=[1]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(ITEM_EVENTS_COALESCE_SECONDS=0.05, JOBS_EAGER=True)
+    async def test_item_events_stream(self):
+        item = await Item.objects.acreate(name='Streamed Item', description='Streamed.', quantity=2, price=15.99)
+        await Item.objects.acreate(name='Cheap Item', description='Filtered out.', quantity=2, price=5.00)
+
+        def update(*changes):
+            self.authenticate()
+            # The changes are published once committed
+            with self.captureOnCommitCallbacks(execute=True):
+                for change in changes:
+                    self.client.patch(self.item_detail_url(item.id), change, format='json')
+
+        response = await self.async_client.get(reverse('item-events'), {'price__gte': '10'},
+                                               headers={'Authorization': f'Bearer {self.tokens["access"]}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        try:
+            self.assertEqual(await anext(stream), b': subscribed\n\n')
+
+            # A burst of writes is sent as the latest state of the Item
+            await sync_to_async(update)({'quantity': 3}, {'quantity': 4})
+            event = (await asyncio.wait_for(anext(stream), 5)).decode()
+            self.assertEqual(event.count('event: '), 1)
+            self.assertTrue(event.startswith('event: item\ndata: '))
+            data = json.loads(event.split('data: ', 1)[1])
+            self.assertEqual((data['id'], data['quantity']), (item.id, 4))
+
+            # An Item no longer matching the filters is removed
+            await sync_to_async(update)({'price': 1.00})
+            event = (await asyncio.wait_for(anext(stream), 5)).decode()
+            self.assertEqual(event, f'event: delete\ndata: {{"id":{item.id}}}\n\n')
+        finally:
+            await stream.aclose()
+
+        response = await self.async_client.get(reverse('item-events'), {'ids': 'abc'},
+                                               headers={'Authorization': f'Bearer {self.tokens["access"]}'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.async_client.get(reverse('item-events'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_item_events_require_asgi(self):
+        # Authenticate before making the request
+        self.authenticate()
+
+        response = self.client.get(reverse('item-events'))
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+
+class JobTests(APITestCase):
+    def setUp(self):
+        self.calls = []
+
+        def fail():
+            raise ValueError('Job failed')
+
+        handlers = mock.patch.dict(jobs.handlers, {'record': lambda value: self.calls.append(value), 'fail': fail})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_jobs_are_run_and_retried(self):
+        jobs.enqueue_job('record', value=1)
+        jobs.enqueue_job('fail')
+        with transaction.atomic():
+            jobs.enqueue_job('record', value=2)
+            transaction.set_rollback(True)
+
+        self.assertEqual(jobs.run_due_jobs(limit=10), 2)
+        self.assertEqual(self.calls, [1])
+        failed = Job.objects.get()
+        self.assertEqual((failed.name, failed.attempts, failed.last_error), ('fail', 1, 'ValueError: Job failed'))
+        self.assertGreater(failed.run_at, timezone.now())
+
+        # Retried once due, then given up on
+        self.assertEqual(jobs.run_due_jobs(limit=10), 0)
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(jobs.run_due_jobs(limit=10), 1)
+        failed.refresh_from_db()
+        self.assertEqual(failed.attempts, 2)
+        self.assertIsNotNone(failed.failed_at)
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(jobs.run_due_jobs(limit=10), 0)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_jobs_run_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue_job('record', value=1)
+            self.assertEqual(self.calls, [])
+        self.assertEqual(self.calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_item_writes_queue_their_follow_up(self):
+        item = Item.objects.create(name='Queued Item', description='Written.', quantity=1, price=1.00)
+        adjust_quantities({item.id: 2})
+        self.assertEqual(list(Job.objects.order_by('id').values_list('name', 'payload')), [
+            (STOCK_CHANGED_JOB, {'totals': {'low_stock': [0, 2, '2.00']}}),
+            (changes.ITEMS_WRITTEN_JOB, {'item_ids': [item.id]}),
+        ])
+
+    @override_settings(JOB_RETENTION_DAYS=7)
+    def test_prune_failed_jobs(self):
+        now = timezone.now()
+        Job.objects.bulk_create([
+            Job(name='fail', failed_at=now - datetime.timedelta(days=8)),
+            Job(name='fail', failed_at=now - datetime.timedelta(days=1)),
+            Job(name='record', payload={'value': 1}, created_at=now - datetime.timedelta(days=30)),
+        ])
+        out = io.StringIO()
+        call_command('prune_jobs', stdout=out)
+        self.assertIn('1 jobs failed more than 7 days ago deleted.', out.getvalue())
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_items_written_caches_hot_items_again(self):
+        hot, cold = (Item.objects.create(name=f'Item {i}', description='Written.', quantity=1, price=1.00)
+                     for i in range(2))
+        # Drop the reads counted by the other tests
+        item_cache.hot_item_keys.flush()
+        cache.clear()
+        item_cache.clear_local_item_cache()
+        item_cache.record_item_read(hot.id)
+        item_cache.hot_item_keys.flush()
+
+        jobs.handlers[changes.ITEMS_WRITTEN_JOB](item_ids=[hot.id, cold.id, 9999])
+        self.assertIsNotNone(cache.get(item_cache.item_cache_key(hot.id)))
+        self.assertIsNone(cache.get(item_cache.item_cache_key(cold.id)))
+
+
+class ItemCacheWarmingTests(APITestCase):
+    """
+    Test case for warming and refreshing the hot item cache entries.
+    """
+
+    def setUp(self):
+        # Drop the reads counted by the other tests
+        item_cache.hot_item_keys.flush()
+        cache.clear()
+        item_cache.clear_local_item_cache()
+        user = User.objects.create_user(email='warmer@yopmail.com', name='Warmer', password='testpass123',
+                                        password2='testpass123')
+        user.is_item_adder = True
+        user.save()
+        self.client.force_authenticate(user)
+        self.items = [Item.objects.create(name=f'Hot Item {i}', description='Read.', quantity=i, price=1.00)
+                      for i in range(3)]
+
+    def warm(self, **options):
+        out = io.StringIO()
+        call_command('warm_item_cache', stdout=out, **options)
+        return out.getvalue()
+
+    def test_warm_item_cache_caches_hot_entries(self):
+        for item in (self.items[0], self.items[0], self.items[1]):
+            self.client.get(reverse('item-retrieve-update-delete', args=[item.id]))
+        self.client.get(reverse('item-list-create'), {'page_size': 2, 'utm': 'x'})
+        item_cache.hot_item_keys.flush()
+        # e.g. a Redis restart, the read counts aside
+        item_cache.invalidate_items(item.id for item in self.items)
+
+        self.assertIn('2 item cache entries warmed, 0 refreshed, 0 still fresh, 0 failed', self.warm(items=1, lists=1))
+        self.assertIsNotNone(cache.get(item_cache.item_cache_key(self.items[0].id)))
+        self.assertIsNone(cache.get(item_cache.item_cache_key(self.items[1].id)))
+        response = self.client.get(reverse('item-list-create'), {'page_size': 2})
+        self.assertEqual(response.json()['message'], 'Items retrieved from cache.')
+        self.assertTrue(response.json()['next'].startswith('http://testserver/api/items/?'))
+
+        # Rebuilt once about to expire only
+        cache.expire(item_cache.item_cache_key(self.items[0].id), 10)
+        self.assertIn('0 item cache entries warmed, 1 refreshed, 1 still fresh',
+                      self.warm(items=1, lists=1, refresh_within=60))
+        self.assertGreater(cache.ttl(item_cache.item_cache_key(self.items[0].id)), 60)
+
+    def test_warm_item_cache_list_urls(self):
+        self.warm(list_url=['https://testserver/api/items/async/?page_size=1'])
+        response = self.client.get(reverse('item-list-create'), {'page_size': 1})
+        self.assertEqual(response.json()['message'], 'Items retrieved from cache.')
+        self.assertTrue(response.json()['next'].startswith('https://testserver/api/items/async/?'))
+
+    def test_warm_item_cache_skips_deleted_items(self):
+        self.client.get(reverse('item-retrieve-update-delete', args=[self.items[2].id]))
+        item_cache.hot_item_keys.flush()
+        Item.objects.filter(pk=self.items[2].id).delete()
+        item_cache.invalidate_items([self.items[2].id])
+        self.assertIn('0 item cache entries warmed, 0 refreshed, 0 still fresh, 1 failed', self.warm(lists=0))
+
+
+class ItemChangesTests(APITransactionTestCase):
+    """
+    The change log tells the committed transactions apart, so these tests commit their writes.
+    """
+
+    def setUp(self):
+        # Start every test with an empty cache
+        cache.clear()
+        item_cache.clear_local_item_cache()
+
+        user = User.objects.create_user(email='testuser@yopmail.com', name='Test User', password='testpass123')
+        user.is_item_adder = True
+        user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        self.item_list_url = reverse('item-list-create')
+        self.item_detail_url = lambda pk: reverse('item-retrieve-update-delete', args=[pk])
+
+    def test_item_changes_sync(self):
+        for name in ('Item 1', 'Item 2', 'Item 3'):
+            self.client.post(self.item_list_url, {'name': name, 'description': 'Synced.', 'quantity': 1,
+                                                  'price': 1.00}, format='json')
+        ids = dict(Item.objects.values_list('name', 'id'))
+
+        # The first sync returns every Item, page by page
+        response = self.client.get(reverse('item-changes'), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data['data']['upserts']], ['Item 1', 'Item 2'])
+        self.assertTrue(response.data['has_more'])
+        response = self.client.get(reverse('item-changes'), {'page_size': 2, 'since': response.data['next']})
+        self.assertEqual([item['name'] for item in response.data['data']['upserts']], ['Item 3'])
+        self.assertFalse(response.data['has_more'])
+        token = response.data['next']
+
+        response = self.client.get(reverse('item-changes'), {'since': token})
+        self.assertEqual(response.data['data'], {'upserts': [], 'deletes': []})
+        self.assertFalse(response.data['has_more'])
+
+        self.client.post(reverse('item-adjust', args=[ids['Item 2']]), {'delta': 4}, format='json')
+        self.client.delete(self.item_detail_url(ids['Item 3']))
+        self.client.post(self.item_list_url, {'name': 'Item 4', 'description': 'Synced.', 'quantity': 1,
+                                              'price': 1.00}, format='json')
+        response = self.client.get(reverse('item-changes'), {'since': token})
+        upserts = response.data['data']['upserts']
+        self.assertEqual([(item['name'], item['quantity']) for item in upserts], [('Item 2', 5), ('Item 4', 1)])
+        self.assertEqual(response.data['data']['deletes'], [ids['Item 3']])
+
+        # The token of the sync covers everything up to it
+        response = self.client.get(reverse('item-changes'), {'since': response.data['next']})
+        self.assertEqual(response.data['data'], {'upserts': [], 'deletes': []})
+
+        response = self.client.get(reverse('item-changes'), {'since': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('item-changes'), {'page_size': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('page_size', response.data['error'])
+        with mock.patch.object(changes.time, 'time', return_value=time.time() + 31 * 24 * 3600):
+            response = self.client.get(reverse('item-changes'), {'since': token})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_item_changes_read_from_primary(self):
+        self.client.post(self.item_list_url, {'name': 'Item 1', 'description': 'Synced.', 'quantity': 1,
+                                              'price': 1.00}, format='json')
+        # Even while the reads of the request are routed to a replica
+        with mock.patch('inventory_management.routers.ReplicaRouter.db_for_read', return_value='replica_0'):
+            response = self.client.get(reverse('item-changes'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data['data']['upserts']], ['Item 1'])
+
+
+class ItemRowSerializerTests(APITestCase):
+    """
+    Test case for the fast read serializer and JSON renderer.
+    """
+
+    def test_output_is_identical_to_item_serializer(self):
+        Item.objects.create(name='Item 1', description='First item.', quantity=5, price=9.99)
+        Item.objects.create(name='Ünïcode \u2028 Item', description='', quantity=-3, price=1000)
+        Item.objects.create(name='Item 3', description='Third item.', quantity=0, price=0.5)
+        items = Item.objects.order_by('id')
+
+        row_serializer = ItemRowSerializer()
+        expected = JSONRenderer().render(ItemSerializer(items, many=True).data)
+        self.assertEqual(JSONRenderer().render(row_serializer.serialize(row_serializer.get_rows(items))), expected)
+
+    def test_output_in_another_timezone(self):
+        Item.objects.create(name='Item 1', description='First item.', quantity=5, price=9.99)
+        items = Item.objects.all()
+        with timezone.override('Asia/Kolkata'):
+            row_serializer = ItemRowSerializer()
+            self.assertEqual(row_serializer.serialize(row_serializer.get_rows(items)),
+                             ItemSerializer(items, many=True).data)
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = {'message': 'Items', 'data': [{'price': Decimal('9.99'), 'name': 'Ünïcode \u2028'}],
+                'as_of': timezone.now(), 'at': timezone.now().replace(microsecond=0), 'day': timezone.now().date()}
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+        self.assertNotIn('\u2028'.encode(), ORJSONRenderer().render(data))
+
+    def test_orjson_renderer_encodes_times_like_json_renderer(self):
+        data = {'at': datetime.time(12, 34, 56, 123456), 'on_the_hour': datetime.time(9),
+                'as_of': datetime.datetime(2026, 1, 2, 3, 4, 5, 678901)}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_orjson_renderer_encodes_non_str_keys(self):
+        # True and 1 are the same dict key, the bools get a dict of their own
+        data = {'numbers': {1: 'one', 2.5: 'half', None: 'none'}, 'bools': {True: 'yes', False: 'no'}}
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+
+class ItemCacheTests(SimpleTestCase):
+    """
+    Test case for the generation based item cache helpers.
+    """
+
+    def setUp(self):
+        cache.clear()
+        item_cache.clear_local_item_cache()
+
+    def test_item_list_cache_key_is_normalized(self):
+        params = ('name__icontains', 'page_size')
+        request = mock.Mock(query_params=QueryDict('page_size=10&utm=x&name__icontains=+bolt+'))
+        same_request = mock.Mock(query_params=QueryDict('name__icontains=bolt&page_size=10&search='))
+        self.assertEqual(item_cache.item_list_cache_key(request, params),
+                         item_cache.item_list_cache_key(same_request, params))
+
+    def test_invalidate_item_list_bumps_generation(self):
+        generation = item_cache.get_item_list_generation()
+        self.assertEqual(item_cache.invalidate_item_list(), generation + 1)
+        self.assertEqual(item_cache.get_item_list_generation(), generation + 1)
+
+    async def test_async_invalidate_item_list_bumps_generation(self):
+        generation = await item_cache.aget_item_list_generation()
+        self.assertEqual(await item_cache.ainvalidate_item_list(), generation + 1)
+        self.assertEqual(item_cache.get_item_list_generation(), generation + 1)
+
+        # A lost counter is started again, like the sync invalidation does
+        cache.delete(item_cache.ITEM_LIST_GENERATION_KEY)
+        self.assertEqual(await item_cache.ainvalidate_item_list(), 2)
+
+    def test_get_or_build_builds_once(self):
+        build = mock.Mock(return_value={'name': 'Item'})
+        self.assertEqual(item_cache.get_or_build('item_test', build), ({'name': 'Item'}, False))
+        self.assertEqual(item_cache.get_or_build('item_test', build), ({'name': 'Item'}, True))
+        build.assert_called_once()
+
+    @override_settings(ITEM_CACHE_TIMEOUT_JITTER=0.1)
+    def test_timeouts_are_jittered(self):
+        timeouts = {item_cache.jitter_timeout(3600) for _ in range(100)}
+        self.assertTrue(all(3240 <= timeout <= 3600 for timeout in timeouts))
+        self.assertGreater(len(timeouts), 1)
+
+    def test_refresh_entry_keeps_invalidations(self):
+        cache.set('item_test', 'cached', timeout=10)
+        self.assertTrue(item_cache.refresh_entry('item_test', lambda: 'refreshed'))
+        self.assertEqual(cache.get('item_test'), 'refreshed')
+        self.assertGreater(cache.ttl('item_test'), 10)
+
+        # Invalidated while it is rebuilt: the invalidation wins
+        self.assertFalse(item_cache.refresh_entry('item_test', lambda: cache.delete('item_test') and 'stale'))
+        self.assertIsNone(cache.get('item_test'))
+        # Never cached (or expired): left to the next reader
+        self.assertFalse(item_cache.refresh_entry('item_test', lambda: 'refreshed'))
+        self.assertIsNone(cache.get('item_test'))
+
+    def test_rewarm_entry_keeps_invalidations(self):
+        self.assertTrue(item_cache.rewarm_entry('item_test', lambda: 'rewarmed'))
+        self.assertEqual(cache.get('item_test'), 'rewarmed')
+        # Cached already: left alone
+        self.assertFalse(item_cache.rewarm_entry('item_test', lambda: 'stale'))
+        self.assertEqual(cache.get('item_test'), 'rewarmed')
+
+        # Written and invalidated again while it is rebuilt: the invalidation wins
+        cache.delete('item_test')
+        self.assertFalse(item_cache.rewarm_entry('item_test', lambda: item_cache.invalidate_items([]) or 'stale'))
+        self.assertIsNone(cache.get('item_test'))
+
+    def test_get_or_build_waits_for_lock_holder(self):
+        # Another worker holds the rebuild lock and publishes the value while we wait
+        cache.add('item_test:lock', 1)
+        build = mock.Mock(return_value='rebuilt')
+        with mock.patch.object(item_cache.time, 'sleep', side_effect=lambda _: cache.set('item_test', 'published')):
+            self.assertEqual(item_cache.get_or_build('item_test', build), ('published', True))
+        build.assert_not_called()
+
+
+class TieredCacheTests(SimpleTestCase):
+    """
+    Test case for the two-tier (local + Redis) item cache.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail('Condition not met in time')
+            time.sleep(0.01)
+
+    def test_async_client_uses_cache_options(self):
+        config = settings.CACHES['default']
+        options = {**config['OPTIONS'], 'PASSWORD': 'secret', 'SOCKET_TIMEOUT': 5,
+                   'CONNECTION_POOL_KWARGS': {'max_connections': 10}}
+
+        async def get_pool():
+            return (await AsyncRedisCache(cache).get_client()).connection_pool
+
+        with override_settings(CACHES={'default': {**config, 'OPTIONS': options}}):
+            pool = asyncio.run(get_pool())
+        self.assertEqual((pool.connection_kwargs['password'], pool.connection_kwargs['socket_timeout']), ('secret', 5))
+        self.assertEqual(pool.max_connections, 10)
+
+    def test_hot_key_counter_ranks_reads(self):
+        counter = HotKeyCounter(window=60, max_keys=2, flush_interval=3600)
+        for member in ('1', '1', '1', '2', '2', '3'):
+            counter.record('test', member)
+        counter.flush()
+        counter.record('test', '3')
+        counter.flush()
+        # The least read member was dropped beyond max_keys, the counts add up across flushes
+        self.assertEqual(counter.top('test', 10), ['1', '2'])
+        self.assertEqual(counter.top('test', 1), ['1'])
+        self.assertEqual(counter.top('other', 1), [])
+
+    def test_local_cache_evicts_least_recently_used(self):
+        local = LocalCache(max_entries=2, max_bytes=1024, timeout=60)
+        local.set('a', b'1')
+        local.set('b', b'2')
+        local.get('a')
+        local.set('c', b'3')
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(local.get('a'), b'1')
+        self.assertEqual(local.stats()['evictions'], 1)
+
+    def test_local_cache_is_bounded_by_bytes(self):
+        local = LocalCache(max_entries=100, max_bytes=10, timeout=60)
+        local.set('a', b'123456')
+        local.set('b', b'123456')
+        self.assertIsNone(local.get('a'))
+        self.assertEqual(local.stats()['bytes'], 6)
+        local.set('c', b'12345678901')  # Larger than the whole cache, never stored
+        self.assertIsNone(local.get('c'))
+
+    def test_local_cache_entries_expire(self):
+        local = LocalCache(max_entries=100, max_bytes=1024, timeout=60)
+        local.set('a', b'1')
+        with mock.patch.object(tiered_cache.time, 'monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(local.get('a'))
+        self.assertEqual(local.stats()['expirations'], 1)
+
+    def test_invalidation_is_broadcast_to_other_processes(self):
+        # Two tiered caches on the same Redis stand for two worker processes
+        reader = TieredCache(cache, LocalCache(max_entries=100, max_bytes=1024, timeout=60))
+        writer = TieredCache(cache, LocalCache(max_entries=100, max_bytes=1024, timeout=60))
+        self.wait_for(lambda: reader._use_local() and writer._use_local())
+
+        writer.set('item_test', b'v1', timeout=60)
+        self.assertEqual(reader.get('item_test'), b'v1')
+        self.assertEqual(reader.get('item_test'), b'v1')
+        self.assertEqual(reader.stats()['local']['hits'], 1)
+        self.assertEqual(reader.stats()['redis']['hits'], 1)
+
+        writer.delete_many(['item_test'])
+        self.wait_for(lambda: reader.local.get('item_test') is None)
+        self.assertIsNone(reader.get('item_test'))
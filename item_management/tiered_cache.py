@@ -0,0 +1,482 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis import asyncio as aioredis
+from redis.exceptions import WatchError
+
+logger = logging.getLogger('item_management')
+
+
+class LocalCache:
+    """
+    In-process LRU cache with a TTL, bounded by number of entries and by total size in bytes.
+    """
+
+    def __init__(self, max_entries, max_bytes, timeout):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = self.get_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.timeout)
+            self._size += size
+            # Evict the least recently used entries until both bounds hold again
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    @classmethod
+    def get_size(cls, value):
+        if isinstance(value, (bytes, str)):
+            return len(value)
+        if isinstance(value, tuple):
+            # e.g. a payload with its validators
+            return sys.getsizeof(value) + sum(cls.get_size(item) for item in value)
+        return sys.getsizeof(value)
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class AsyncRedisCache:
+    """
+    Async (`redis.asyncio`) access to the entries of a django-redis cache.
+
+    Keys and values are made and encoded by the django-redis client, so entries are shared with the sync cache.
+    Connections are made with the `LOCATION` and `OPTIONS` of the cache `alias` in `CACHES`, like django-redis
+    makes them. Async Redis connections belong to an event loop, so a client is kept per loop.
+    """
+
+    def __init__(self, backend, alias='default'):
+        self.backend = backend
+        self.alias = alias
+        self._clients = weakref.WeakKeyDictionary()
+
+    def get_connection_params(self):
+        """
+            Return the URL of the Redis server and the connection pool keyword arguments: the `PASSWORD`,
+            `SOCKET_TIMEOUT` and `SOCKET_CONNECT_TIMEOUT` options, overridden by `CONNECTION_POOL_KWARGS`.
+        """
+        config = settings.CACHES[self.alias]
+        servers = config['LOCATION']
+        if isinstance(servers, str):
+            servers = servers.split(',')
+        options = config.get('OPTIONS', {})
+        kwargs = {}
+        for option, kwarg in (('PASSWORD', 'password'), ('SOCKET_TIMEOUT', 'socket_timeout'),
+                              ('SOCKET_CONNECT_TIMEOUT', 'socket_connect_timeout')):
+            if options.get(option):
+                kwargs[kwarg] = options[option]
+        kwargs.update(options.get('CONNECTION_POOL_KWARGS', {}))
+        # django-redis writes to the first server of the location
+        return servers[0], kwargs
+
+    async def get_client(self):
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is None:
+            url, kwargs = self.get_connection_params()
+            options = settings.CACHES[self.alias].get('OPTIONS', {})
+            client = aioredis.Redis(connection_pool=aioredis.ConnectionPool.from_url(url, **kwargs),
+                                    **options.get('REDIS_CLIENT_KWARGS', {}))
+            # asyncio.run() and async_to_sync() finalize the async generators of a loop before closing it, this
+            # one closes the connections of the client, which would leak with short-lived loops otherwise
+            closer = self._close_with_loop(client)
+            await closer.__anext__()
+            entry = self._clients[loop] = (client, closer)
+        return entry[0]
+
+    @staticmethod
+    async def _close_with_loop(client):
+        try:
+            yield
+        finally:
+            await client.aclose(close_connection_pool=True)
+
+    async def get(self, key):
+        client = await self.get_client()
+        value = await client.get(self.backend.make_key(key))
+        return None if value is None else self.backend.client.decode(value)
+
+    async def get_many(self, keys):
+        client = await self.get_client()
+        values = await client.mget([self.backend.make_key(key) for key in keys])
+        return {key: self.backend.client.decode(value) for key, value in zip(keys, values) if value is not None}
+
+    async def set(self, key, value, timeout):
+        client = await self.get_client()
+        await client.set(self.backend.make_key(key), self.backend.client.encode(value), ex=timeout)
+
+    async def add(self, key, value, timeout):
+        client = await self.get_client()
+        return bool(await client.set(self.backend.make_key(key), self.backend.client.encode(value),
+                                     ex=timeout, nx=True))
+
+    async def delete(self, key):
+        client = await self.get_client()
+        await client.delete(self.backend.make_key(key))
+
+    async def delete_many(self, keys):
+        client = await self.get_client()
+        await client.delete(*(self.backend.make_key(key) for key in keys))
+
+    async def incr(self, key):
+        """
+            Increment a counter in one round trip. A missing counter is started at 1 first, like the sync callers
+            start it when `incr` raises.
+        """
+        client = await self.get_client()
+        redis_key = self.backend.make_key(key)
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.set(redis_key, 1, nx=True)
+            pipe.incr(redis_key)
+            _, value = await pipe.execute()
+        return value
+
+    async def publish(self, channel, message):
+        client = await self.get_client()
+        await client.publish(channel, message)
+
+
+class TieredCache:
+    """
+    Two-tier cache: a `LocalCache` per process in front of the shared django-redis cache.
+
+    Deletes and increments are broadcast over Redis pub/sub, and every process drops the broadcast keys from its
+    local tier. The local tier is only used while the process is subscribed to the invalidation channel, and is
+    cleared whenever the subscription is (re)established, so a process never serves entries it may have missed
+    the invalidation of. The short local timeout bounds staleness in any remaining edge case.
+    """
+    channel = 'item_cache:invalidate'
+
+    def __init__(self, backend, local, alias='default', enabled=True):
+        self.backend = backend
+        self.async_backend = AsyncRedisCache(backend, alias=alias)
+        self.local = local
+        self.alias = alias
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        # Bumped on every invalidation, so a value read from Redis during an invalidation is not kept locally
+        self._epoch = 0
+        self._subscribed = threading.Event()
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def get(self, key):
+        use_local = self._use_local()
+        if use_local:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+
+        epoch = self._epoch
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if use_local and epoch == self._epoch:
+            self.local.set(key, value)
+        return value
+
+    async def aget(self, key):
+        use_local = self._use_local()
+        if use_local:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+
+        epoch = self._epoch
+        value = await self.async_backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if use_local and epoch == self._epoch:
+            self.local.set(key, value)
+        return value
+
+    def set(self, key, value, timeout):
+        self.backend.set(key, value, timeout=timeout)
+        if self._use_local():
+            self.local.set(key, value)
+
+    async def aset(self, key, value, timeout):
+        await self.async_backend.set(key, value, timeout=timeout)
+        if self._use_local():
+            self.local.set(key, value)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        if keys:
+            self.backend.delete_many(keys)
+            self.invalidate(keys)
+
+    def refresh(self, key, build, timeout, missing=False, watch=()):
+        """
+            Rebuild an entry ahead of its expiry, while it is still served. The entry is watched while it is built:
+            if it expires, or is deleted or rewritten by an invalidation meanwhile, the rebuilt value is dropped
+            rather than written over the invalidation.
+
+            With `missing`, the entry is built only if it is missing (e.g. dropped by an invalidation) instead.
+            Deleting a missing entry does not touch it, so the keys in `watch`, which every invalidation of the
+            entry writes, are watched as well.
+
+            Returns:
+                bool: Whether the entry was written.
+        """
+        redis_key = self.backend.make_key(key)
+        with get_redis_connection(self.alias).pipeline() as pipe:
+            try:
+                pipe.watch(redis_key, *(self.backend.make_key(watched) for watched in watch))
+                if bool(pipe.exists(redis_key)) == missing:
+                    return False
+                value = build()
+                pipe.multi()
+                pipe.set(redis_key, self.backend.client.encode(value), ex=timeout)
+                pipe.execute()
+            except WatchError:
+                return False
+        if self._use_local():
+            self.local.set(key, value)
+        return True
+
+    def ttl_many(self, keys):
+        """
+            Return the seconds left before each entry expires, in one round trip: None for a missing entry, and
+            -1 for an entry that never expires.
+        """
+        pipe = get_redis_connection(self.alias).pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(self.backend.make_key(key))
+        return [None if ttl == -2 else ttl for ttl in pipe.execute()]
+
+    async def adelete_many(self, keys):
+        keys = list(keys)
+        if keys:
+            await self.async_backend.delete_many(keys)
+            await self.ainvalidate(keys)
+
+    def incr(self, key):
+        value = self.backend.incr(key)
+        self.invalidate([key])
+        return value
+
+    async def aincr(self, key):
+        value = await self.async_backend.incr(key)
+        await self.ainvalidate([key])
+        return value
+
+    def invalidate(self, keys):
+        """
+            Drop keys from the local tier of this process and broadcast them to every other process.
+        """
+        self._invalidate_local(keys)
+        if self.enabled:
+            get_redis_connection(self.alias).publish(self.channel, json.dumps(keys))
+
+    async def ainvalidate(self, keys):
+        self._invalidate_local(keys)
+        if self.enabled:
+            await self.async_backend.publish(self.channel, json.dumps(keys))
+
+    def _invalidate_local(self, keys):
+        self._epoch += 1
+        for key in keys:
+            self.local.delete(key)
+
+    def _use_local(self):
+        if not self.enabled:
+            return False
+        self._ensure_listener()
+        return self._subscribed.is_set()
+
+    def _ensure_listener(self):
+        # The listener thread does not survive a fork, start one in every (worker) process
+        if self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            self._subscribed.clear()
+            self.local.clear()
+            threading.Thread(target=self._listen, name='item-cache-invalidation', daemon=True).start()
+
+    def _listen(self):
+        retry_delay = 1
+        while True:
+            try:
+                pubsub = get_redis_connection(self.alias).pubsub()
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    if message['type'] == 'subscribe':
+                        # Invalidations may have been missed while we were not subscribed
+                        self.local.clear()
+                        self._subscribed.set()
+                        retry_delay = 1
+                    elif message['type'] == 'message':
+                        self._invalidate_local(json.loads(message['data']))
+            except Exception as e:
+                logger.warning(f'Item cache invalidation channel lost, local cache disabled: {str(e)}')
+            self._subscribed.clear()
+            self.local.clear()
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30)
+
+    def stats(self):
+        return {
+            'pid': os.getpid(),
+            'local': {'enabled': self._subscribed.is_set(), **self.local.stats()},
+            'redis': {'hits': self.hits, 'misses': self.misses},
+        }
+
+
+class HotKeyCounter:
+    """
+    Counts the reads of cache entries, to find the hot ones.
+
+    Reads are counted in process and added, every `flush_interval` seconds, to a Redis sorted set per kind of
+    entry and time window of `window` seconds, in one round trip, so counting costs a read nothing but a dict
+    update. A set keeps its `max_keys` most read entries only, and the hot entries are those most read over the
+    current and the previous window.
+    """
+    prefix = 'item_cache:hot'
+
+    def __init__(self, alias='default', window=3600, max_keys=10000, flush_interval=10, enabled=True):
+        self.alias = alias
+        self.window = window
+        self.max_keys = max_keys
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def record(self, kind, member):
+        if not self.enabled:
+            return
+        self._ensure_flusher()
+        with self._lock:
+            self._counts[kind, member] += 1
+
+    def get_key(self, kind, window):
+        return f'{self.prefix}:{kind}:{window}'
+
+    def flush(self):
+        """
+            Add the reads counted since the last flush to the current window in Redis.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return
+        window = int(time.time() // self.window)
+        pipe = get_redis_connection(self.alias).pipeline(transaction=False)
+        for kind in {kind for kind, _ in counts}:
+            key = self.get_key(kind, window)
+            for (member_kind, member), count in counts.items():
+                if member_kind == kind:
+                    pipe.zincrby(key, count, member)
+            # Drop the least read entries beyond the bound
+            pipe.zremrangebyrank(key, 0, -self.max_keys - 1)
+            pipe.expire(key, self.window * 2)
+        pipe.execute()
+
+    def top(self, kind, limit):
+        """
+            Return the `limit` entries of a kind most read over the current and the previous window, most read
+            first.
+        """
+        if limit <= 0:
+            return []
+        window = int(time.time() // self.window)
+        pipe = get_redis_connection(self.alias).pipeline(transaction=False)
+        for key in (self.get_key(kind, window), self.get_key(kind, window - 1)):
+            pipe.zrange(key, 0, -1, withscores=True)
+        counts = Counter()
+        for entries in pipe.execute():
+            for member, count in entries:
+                counts[member.decode()] += count
+        return [member for member, _ in counts.most_common(limit)]
+
+    def _ensure_flusher(self):
+        # Like the invalidation listener, the flusher thread does not survive a fork
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            # Counted by the parent process, which flushes them itself
+            self._counts.clear()
+            threading.Thread(target=self._flush_periodically, name='item-cache-hot-keys', daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                # The counts are lost, hot entries are only found from the reads of the other windows and processes
+                logger.warning(f'Error flushing the hot item cache keys: {str(e)}')
@@ -1,10 +1,29 @@
 from django.urls import path
 
-from item_management.views import ItemListCreateView, ItemsRetrieveUpdateDestroyAPIView
+from item_management.async_views import AsyncItemAdjustView, AsyncItemEventsView, AsyncItemListView, \
+    AsyncItemRetrieveView
+from item_management.views import ItemAdjustAPIView, ItemBatchAdjustAPIView, ItemBulkAPIView, ItemCacheStatsAPIView, \
+    ItemChangesAPIView, ItemExportAPIView, ItemImportAPIView, ItemListCreateView, ItemsRetrieveUpdateDestroyAPIView, \
+    ItemStatsAPIView, ItemStockAsOfAPIView
 
 urlpatterns = [
     path('', ItemListCreateView.as_view(), name='item-list-create'),
+    path('bulk/', ItemBulkAPIView.as_view(), name='item-bulk'),
+    path('adjust/', ItemBatchAdjustAPIView.as_view(), name='item-batch-adjust'),
+    path('export/', ItemExportAPIView.as_view(), name='item-export'),
+    path('import/', ItemImportAPIView.as_view(), name='item-import'),
+    path('changes/', ItemChangesAPIView.as_view(), name='item-changes'),
+    path('stats/', ItemStatsAPIView.as_view(), name='item-stats'),
+    path('cache-stats/', ItemCacheStatsAPIView.as_view(), name='item-cache-stats'),
     path('<int:pk>/', ItemsRetrieveUpdateDestroyAPIView.as_view(), name='item-retrieve-update-delete'),
+    path('<int:pk>/adjust/', ItemAdjustAPIView.as_view(), name='item-adjust'),
+    path('<int:pk>/stock/', ItemStockAsOfAPIView.as_view(), name='item-stock-as-of'),
+
+    # Async (ASGI native) versions of the read and adjust endpoints
+    path('async/', AsyncItemListView.as_view(), name='item-list-async'),
+    path('async/<int:pk>/', AsyncItemRetrieveView.as_view(), name='item-retrieve-async'),
+    path('async/<int:pk>/adjust/', AsyncItemAdjustView.as_view(), name='item-adjust-async'),
+    path('events/', AsyncItemEventsView.as_view(), name='item-events'),
 
 
 ]
@@ -1,26 +1,85 @@
+import io
 import logging
-from django.core.cache import cache
-from django.http import Http404
+import os
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.utils.text import compress_sequence
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 
-from item_management.models import Item
+from item_management.cache import CachedPayload, get_item_cache_stats, get_or_build, invalidate_item, \
+    invalidate_item_list, invalidate_items, item_cache_key, item_list_cache_key, record_item_list_read, \
+    record_item_read
+from item_management.changes import ExpiredChangeToken, InvalidChangeToken, get_changed_item_ids, \
+    record_item_changes
+from item_management.export import accepts_gzip, iter_csv, iter_ndjson
+from item_management.filters import ItemFilterBackend, ItemOrderingFilter
+from item_management.importer import IMPORT_FORMATS, ON_CONFLICT_CHOICES, import_items, iter_rows
+from item_management.models import Item, StockMovement
+from item_management.pagination import ItemCursorPagination
+from item_management.parsers import NDJSONParser
 from item_management.permissions import IsItemAdder
-from item_management.serializers import ItemSerializer
+from item_management.renderers import ORJSONRenderer
+from item_management.responses import RenderedJSONResponse
+from item_management.serializers import ItemAdjustSerializer, ItemBatchAdjustSerializer, \
+    ItemBulkOperationSerializer, ItemChangesQuerySerializer, ItemFilterSerializer, ItemRowSerializer, ItemSerializer, \
+    ItemStatsQuerySerializer, ItemStatsSerializer, ItemStockQuerySerializer
+from item_management.stats import get_item_stats, record_stock_changes
+from item_management.stock import InsufficientStock, adjust_quantities, get_quantity_as_of, record_movements
 
 # Get the custom logger for item_management
 logger = logging.getLogger('item_management')
 
+# Serializes Items on the read paths straight from database rows
+item_row_serializer = ItemRowSerializer()
+
 
 class CustomAPIViewMixin:
-    def create_response(self, data=None, message="Operation successful", status_code=status.HTTP_200_OK):
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+
+    def create_response(self, data=None, message="Operation successful", status_code=status.HTTP_200_OK, **extra):
         response_data = {
             'message': message,
-            'data': data
+            'data': data,
+            **extra
         }
         return Response(response_data, status=status_code)
 
+    def render_payload(self, data=None, **extra):
+        """
+            Render the `data` (and extra keys) of a response to JSON bytes ahead of time, e.g. to cache them.
+        """
+        return ORJSONRenderer().render({'data': data, **extra})
+
+    def create_rendered_response(self, payload, message="Operation successful", status_code=status.HTTP_200_OK):
+        """
+            Same response as `create_response`, for a payload rendered by `render_payload`. The message is
+            spliced in front of the payload, so nothing is decoded or rendered again.
+        """
+        return RenderedJSONResponse(self.render_body(payload, message), status=status_code)
+
+    def render_body(self, payload, message):
+        return b'{"message":' + ORJSONRenderer().render(message) + b',' + payload[1:]
+
+    def create_cached_response(self, request, entry, message="Operation successful"):
+        """
+            Same response as `create_rendered_response`, for a `CachedPayload`, with its `ETag` and `Last-Modified`
+            headers. A conditional GET whose validators still match is answered 304 Not Modified, decided from the
+            entry alone.
+        """
+        response = self.create_rendered_response(entry.payload, message=message)
+        response['ETag'] = entry.etag
+        response['Last-Modified'] = http_date(entry.last_modified)
+        return get_conditional_response(request, etag=entry.etag, last_modified=int(entry.last_modified),
+                                        response=response)
+
 
 # Create your views here.
 class ItemListCreateView(CustomAPIViewMixin, generics.ListCreateAPIView):
@@ -32,6 +91,12 @@ class ItemListCreateView(CustomAPIViewMixin, generics.ListCreateAPIView):
 
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
+    pagination_class = ItemCursorPagination
+    filter_backends = [ItemFilterBackend, ItemOrderingFilter]
+    ordering = ['id']
+
+    # Query parameters that shape the list response, anything else is left out of the cache key
+    list_query_params = (*ItemFilterSerializer().fields, 'ordering', 'cursor', 'page_size')
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -46,50 +111,68 @@ class ItemListCreateView(CustomAPIViewMixin, generics.ListCreateAPIView):
 
     def list(self, request, *args, **kwargs):
         """
-                Handle GET requests to list all Items.
+                Handle GET requests to list Items, one cursor page at a time.
+                The list can be filtered, searched and ordered with the parameters of `ItemFilterSerializer`
+                and `?ordering=`.
         """
 
         try:
-            cache_key = 'item_list'  # Define a unique cache key for the item list
-
-            # Attempt to get the item list from the cache
-            cached_items = cache.get(cache_key)
-            if cached_items:
-                return self.create_response(data=cached_items, message="Items retrieved from cache.")
+            # Each page is cached, already rendered, under its own key of the current list generation
+            entry, from_cache = get_or_build(item_list_cache_key(request, self.list_query_params),
+                                             self.build_list_page)
+            record_item_list_read(request, self.list_query_params)
+            if from_cache:
+                return self.create_cached_response(request, entry, message="Items retrieved from cache.")
 
-            # If not in cache, retrieve from database
-            queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
-
-            # Store the serialized data in Redis for future requests
-            cache.set(cache_key, serializer.data, timeout=3600)  # Cache for 1 hour
             logger.info('Item list retrieved successfully.')
-            return self.create_response(data=serializer.data, message="Items retrieved successfully")
+            return self.create_cached_response(request, entry, message="Items retrieved successfully")
+        except NotFound:
+            logger.warning(f'Invalid item list cursor: {request.query_params.get("cursor")}')
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_404_NOT_FOUND)
+        except ValidationError as e:
+            logger.warning(f'Invalid item list filters: {e.detail}')
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f'Error retrieving item list: {str(e)}')
             return Response({'error': 'Failed to retrieve items'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def build_list_page(self):
+        """
+            Render the requested page of Items, filtered and ordered. The page is last modified now: any write
+            that could change it starts a new list generation.
+
+            Raises:
+                NotFound: If the cursor is invalid.
+                ValidationError: If the filters are invalid.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(item_row_serializer.get_rows(queryset))
+        return CachedPayload.create(self.render_payload(
+            data=item_row_serializer.serialize(page),
+            next=self.paginator.get_next_link(),
+            previous=self.paginator.get_previous_link(),
+        ))
+
     def create(self, request, *args, **kwargs):
         """
                 Handle POST request to create Item
             """
 
         try:
-            data = request.data
-
-            # Check if the item already exists
-            if Item.objects.filter(name=data['name']).exists():
-                logger.warning(f"Item creation failed: {data['name']} already exists.")
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            try:
+                # The unique index on the item name rejects duplicates, no need to look them up first
+                with transaction.atomic():
+                    self.perform_create(serializer)
+            except IntegrityError:
+                logger.warning(f"Item creation failed: {serializer.validated_data.get('name')} already exists.")
                 return Response(
                     {"error": "Item already exists."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            serializer = self.get_serializer(data=data)
-            serializer.is_valid(raise_exception=True)
-            self.perform_create(serializer)
-            # Invalidate the cache for the item list
-            cache_key = 'item_list'
-            cache.delete(cache_key)
+            # Invalidate the cached item list pages
+            invalidate_item_list()
             logger.info(f'Item {serializer.data["name"]} created successfully.')
             return self.create_response(data=serializer.data, message="Item created successfully",
                                         status_code=status.HTTP_201_CREATED)
@@ -97,6 +180,13 @@ class ItemListCreateView(CustomAPIViewMixin, generics.ListCreateAPIView):
             logger.error(f'Error creating item: {str(e)}')
             return Response({'error': 'Failed to create item'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def perform_create(self, serializer):
+        item = serializer.save()
+        # The ledger of the Item starts with its initial quantity
+        record_movements({item.id: item.quantity}, StockMovement.Reason.CREATE, user_id=self.request.user.id)
+        record_stock_changes(after={item.id: (item.quantity, item.price)})
+        record_item_changes([item.id])
+
 
 class ItemsRetrieveUpdateDestroyAPIView(CustomAPIViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """
@@ -120,20 +210,14 @@ class ItemsRetrieveUpdateDestroyAPIView(CustomAPIViewMixin, generics.RetrieveUpd
         """
         item_id = kwargs.get('pk')
         try:
-            cache_key = f'item_{item_id}'  # Define a unique cache key
-
-            # Attempt to get the item from the cache
-            cached_item = cache.get(cache_key)
-            if cached_item:
-                return self.create_response(data=cached_item, message="Item retrieved successfully from Cache")
+            entry, from_cache = get_or_build(item_cache_key(item_id), lambda: self.build_item(item_id))
+            record_item_read(item_id)
+            if from_cache:
+                return self.create_cached_response(request, entry,
+                                                   message="Item retrieved successfully from Cache")
 
-            instance = self.get_object()
-            serializer = self.get_serializer(instance)
-
-            # Store the serialized data in Redis for future requests
-            cache.set(cache_key, serializer.data, timeout=3600)
             logger.info(f'Item {item_id} retrieved successfully.')
-            return self.create_response(data=serializer.data, message="Item retrieved successfully")
+            return self.create_cached_response(request, entry, message="Item retrieved successfully")
         except Http404:
             logger.warning(f'Item {item_id} not found.')
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -141,6 +225,24 @@ class ItemsRetrieveUpdateDestroyAPIView(CustomAPIViewMixin, generics.RetrieveUpd
             logger.error(f'Error retrieving item {item_id}: {str(e)}')
             return Response({'error': 'Failed to retrieve item'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def build_item(self, item_id, queryset=None):
+        """
+            Render an Item, with its validators.
+
+            Args:
+                item_id (int): Id of the Item.
+                queryset (QuerySet): The Items to read it from, `get_queryset()` by default.
+
+            Raises:
+                Http404: If the Item does not exist.
+        """
+        queryset = self.get_queryset() if queryset is None else queryset
+        row = item_row_serializer.get_rows(queryset.filter(pk=item_id)).first()
+        if row is None:
+            raise Http404
+        return CachedPayload.create(self.render_payload(data=item_row_serializer.serialize([row])[0]),
+                                    last_modified=row.updated_at)
+
     def update(self, request, *args, **kwargs):
         """
             Update a specific Item instance.
@@ -149,22 +251,35 @@ class ItemsRetrieveUpdateDestroyAPIView(CustomAPIViewMixin, generics.RetrieveUpd
                 request (Request): The request object contains updated item.
 
             Returns:
-                Response: A DRF Response object contains the serialized updated item data and a success message.
+                Response: A DRF Response object contains the serialized updated item data and a success message,
+                with the `ETag` of the updated item. With `If-Match` (or `If-Unmodified-Since`), the item is only
+                updated if it was not modified since, otherwise the response has status code 412.
         """
         item_id = kwargs.get('pk')
         try:
-            cache_key = f'item_{item_id}'
-            cache_key_for_list = 'item_list'
             partial = kwargs.pop('partial', False)
             instance = self.get_object()
             serializer = self.get_serializer(instance, data=request.data, partial=partial)
             serializer.is_valid(raise_exception=True)
-            self.perform_update(serializer)
+            try:
+                with transaction.atomic():
+                    if not self.preconditions_pass(item_id):
+                        logger.warning(f'Item {item_id} update rejected: modified since it was read.')
+                        return Response({'error': 'Item was modified since it was read'},
+                                        status=status.HTTP_412_PRECONDITION_FAILED)
+                    self.perform_update(serializer)
+                    # Sent back, so the next conditional update needs no GET first
+                    entry = self.build_item(item_id)
+            except IntegrityError:
+                logger.warning(f"Item {item_id} update failed: {serializer.validated_data.get('name')} already exists.")
+                return Response({"error": "Item already exists."}, status=status.HTTP_400_BAD_REQUEST)
             # Invalidate the cache if Item gets Updated
-            cache.delete(cache_key)
-            cache.delete(cache_key_for_list)
+            invalidate_item(item_id)
             logger.info(f'Item {item_id} updated successfully.')
-            return self.create_response(data=serializer.data, message="Item updated successfully")
+            response = self.create_response(data=serializer.data, message="Item updated successfully")
+            response['ETag'] = entry.etag
+            response['Last-Modified'] = http_date(entry.last_modified)
+            return response
         except Http404:
             logger.warning(f'Item {item_id} not found for update.')
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -172,6 +287,37 @@ class ItemsRetrieveUpdateDestroyAPIView(CustomAPIViewMixin, generics.RetrieveUpd
             logger.error(f'Error updating item {item_id}: {str(e)}')
             return Response({'error': 'Failed to update item'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def preconditions_pass(self, item_id):
+        """
+            Check the `If-Match` and `If-Unmodified-Since` headers of an update against the current version of the
+            Item, locked until the end of the transaction. Runs in a transaction.
+
+            Raises:
+                Http404: If the Item does not exist anymore.
+        """
+        if 'HTTP_IF_MATCH' not in self.request.META and 'HTTP_IF_UNMODIFIED_SINCE' not in self.request.META:
+            return True
+        entry = self.build_item(item_id, queryset=Item.objects.select_for_update())
+        return get_conditional_response(self.request, etag=entry.etag,
+                                        last_modified=int(entry.last_modified)) is None
+
+    def perform_update(self, serializer):
+        """
+            Save the Item and record the change of its quantity in the stock ledger and the stock summary. Runs in a
+            transaction.
+        """
+        item = serializer.instance
+        # Lock the row and start from the committed quantity: the movement is the difference, and an update
+        # without a quantity must not write back the quantity read before a concurrent adjustment
+        quantity, price = Item.objects.select_for_update().values_list('quantity', 'price').get(pk=item.pk)
+        item.quantity = quantity
+        serializer.save()
+        if item.quantity != quantity:
+            record_movements({item.id: item.quantity - quantity}, StockMovement.Reason.UPDATE,
+                             user_id=self.request.user.id)
+        record_stock_changes(before={item.id: (quantity, price)}, after={item.id: (item.quantity, item.price)})
+        record_item_changes([item.id])
+
     def destroy(self, request, *args, **kwargs):
         """
            Delete a specific Item.
@@ -184,13 +330,11 @@ class ItemsRetrieveUpdateDestroyAPIView(CustomAPIViewMixin, generics.RetrieveUpd
         """
         item_id = kwargs.get('pk')
         try:
-            cache_key = f'item_{item_id}'
-            cache_key_for_list = 'item_list'
             instance = self.get_object()
-            self.perform_destroy(instance)
+            with transaction.atomic():
+                self.perform_destroy(instance)
             # Invalidate the cache if Item gets Deleted
-            cache.delete(cache_key)
-            cache.delete(cache_key_for_list)
+            invalidate_item(item_id)
             logger.info(f'Item {item_id} deleted successfully.')
             return self.create_response(message="Item deleted successfully", status_code=status.HTTP_204_NO_CONTENT)
         except Http404:
@@ -199,3 +343,408 @@ class ItemsRetrieveUpdateDestroyAPIView(CustomAPIViewMixin, generics.RetrieveUpd
         except Exception as e:
             logger.error(f'Error deleting item {item_id}: {str(e)}')
             return Response({'error': 'Failed to delete item'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def perform_destroy(self, instance):
+        """
+            Delete the Item and take it out of the stock summary. Runs in a transaction.
+        """
+        # Lock the row, the summary is updated with the committed quantity and price of the Item
+        item_id = instance.pk
+        values = Item.objects.select_for_update().values_list('quantity', 'price').filter(pk=item_id).first()
+        if values is None:
+            raise Http404
+        instance.delete()
+        record_stock_changes(before={item_id: values})
+        # Kept in the change log as a tombstone
+        record_item_changes([item_id])
+
+
+class ItemChangesAPIView(CustomAPIViewMixin, generics.GenericAPIView):
+    """
+        API view for syncing the Item catalogue incrementally.
+        This view handles GET requests with the change token of the previous sync in `?since=` and returns the
+        Items created or updated since (with their current state) and the ids of the Items deleted since, one page
+        at a time, with the token of the next page or of the next sync. Without a token, every Item is returned.
+        Authentication required to access this view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+            Retrieve a page of the Item changes.
+
+            Args:
+                request (Request): The request object contains the optional `since` token and `page_size`.
+
+            Returns:
+                Response: A Response object contains the `upserts` and `deletes` of the page, the `next` token and
+                whether more pages follow (`has_more`). Follow `next` until `has_more` is false, then keep the last
+                `next` for the next sync. An expired token is answered with status code 410: sync again from
+                scratch.
+        """
+        since = request.query_params.get('since')
+        try:
+            serializer = ItemChangesQuerySerializer(data=request.query_params)
+            serializer.is_valid(raise_exception=True)
+            since = serializer.validated_data.get('since')
+            page_size = serializer.validated_data.get('page_size', settings.ITEM_LIST_PAGE_SIZE)
+            item_ids, token, has_more = get_changed_item_ids(since, page_size)
+            # From the primary, like the changes: a lagging replica would report new Items as deleted
+            items = Item.objects.using(DEFAULT_DB_ALIAS).filter(id__in=item_ids).order_by('id')
+            upserts = item_row_serializer.serialize(item_row_serializer.get_rows(items))
+            # The Items that changed and are gone were deleted
+            upserted_ids = {item['id'] for item in upserts}
+            deletes = [item_id for item_id in item_ids if item_id not in upserted_ids]
+            logger.info(f'{request.user} synced {len(upserts)} item upserts and {len(deletes)} deletes.')
+            return self.create_response(data={'upserts': upserts, 'deletes': deletes}, next=token, has_more=has_more,
+                                        message="Item changes retrieved successfully")
+        except ValidationError as e:
+            logger.warning(f'Invalid item changes parameters: {e.detail}')
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidChangeToken:
+            logger.warning(f'Invalid item change token: {since}')
+            return Response({'error': 'Invalid change token'}, status=status.HTTP_400_BAD_REQUEST)
+        except ExpiredChangeToken:
+            logger.warning(f'Expired item change token: {since}')
+            return Response({'error': 'Change token expired, sync again without since'}, status=status.HTTP_410_GONE)
+        except Exception as e:
+            logger.error(f'Error retrieving item changes: {str(e)}')
+            return Response({'error': 'Failed to retrieve item changes'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ItemBulkAPIView(CustomAPIViewMixin, generics.GenericAPIView):
+    """
+        API view for creating, updating and deleting Items in bulk.
+        This view handles POST requests with a JSON array (or NDJSON stream) of operations and applies
+        them in one transaction with batched SQL.
+        Permission required to access this view.
+    """
+    serializer_class = ItemBulkOperationSerializer
+    permission_classes = [IsAuthenticated, IsItemAdder]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request, *args, **kwargs):
+        """
+            Apply a batch of Item operations.
+
+            Args:
+                request (Request): The request object contains the list of operations. Each operation is an
+                    Item payload with an optional `op` (`upsert` or `delete`) and `id`. Pass `?atomic=false`
+                    to write the valid rows even if some rows fail.
+
+            Returns:
+                Response: A Response object contains one result per operation and a summary of the batch.
+        """
+        atomic = request.query_params.get('atomic', 'true').lower() not in ('false', '0')
+        try:
+            rows = request.data
+            if not isinstance(rows, list):
+                return Response({'error': 'Expected a list of item operations.'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(rows) > settings.ITEM_BULK_MAX_ROWS:
+                return Response({'error': f'A batch can contain at most {settings.ITEM_BULK_MAX_ROWS} operations.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            serializer = self.get_serializer(data=rows, many=True, partial=True)
+            invalid_errors = {}
+            if not serializer.is_valid():
+                if atomic:
+                    logger.warning('Bulk item request rejected: invalid operations.')
+                    return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+                # Report the invalid rows and go on with the valid ones
+                invalid_errors = {index: errors for index, errors in enumerate(serializer.errors) if errors}
+                valid_indexes = [index for index in range(len(rows)) if index not in invalid_errors]
+                serializer = self.get_serializer(data=[rows[index] for index in valid_indexes], many=True,
+                                                 partial=True)
+                serializer.is_valid(raise_exception=True)
+
+            results = serializer.save(atomic=atomic, user_id=request.user.id)
+            if invalid_errors:
+                # Map the results of the valid rows back to the positions they were sent at
+                for result in results:
+                    result['index'] = valid_indexes[result['index']]
+                results.extend({'index': index, 'status': 'failed', 'errors': errors}
+                               for index, errors in invalid_errors.items())
+                results.sort(key=lambda result: result['index'])
+
+            # Invalidate the cache once for the whole batch
+            invalidate_items(result['id'] for result in results if result['status'] != 'failed')
+            summary = {
+                state: sum(1 for result in results if result['status'] == state)
+                for state in ('created', 'updated', 'deleted', 'not_found', 'failed')
+            }
+            logger.info(f'Bulk item request applied: {summary}.')
+            return self.create_response(data={'summary': summary, 'results': results},
+                                        message="Bulk operation completed")
+        except ValidationError as e:
+            logger.warning('Bulk item request rejected: operations could not be applied.')
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            logger.warning('Bulk item request rejected: duplicate item names.')
+            return Response({'error': 'Item already exists.'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f'Error applying bulk item request: {str(e)}')
+            return Response({'error': 'Failed to apply bulk operation'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ItemAdjustAPIView(CustomAPIViewMixin, generics.GenericAPIView):
+    """
+        API view for adjusting the stock of one Item.
+        This view handles POST requests with a signed quantity delta and applies it atomically in the database,
+        without a read-modify-write round trip.
+        Permission required to access this view.
+    """
+    serializer_class = ItemAdjustSerializer
+    permission_classes = [IsAuthenticated, IsItemAdder]
+
+    def post(self, request, *args, **kwargs):
+        """
+            Adjust the quantity of a specific Item.
+
+            Args:
+                request (Request): The request object contains the `delta` and optional `allow_negative` flag.
+
+            Returns:
+                Response: A Response object contains the new quantity of the item and a success message.
+        """
+        item_id = kwargs.get('pk')
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            quantities = adjust_quantities({item_id: serializer.validated_data['delta']},
+                                           allow_negative=serializer.validated_data['allow_negative'],
+                                           user_id=request.user.id)
+            # The quantity shows on the cached item and on the cached list pages
+            invalidate_items([item_id])
+            logger.info(f'Item {item_id} quantity adjusted by {serializer.validated_data["delta"]}.')
+            return self.create_response(data={'id': item_id, 'quantity': quantities[item_id]},
+                                        message="Item quantity adjusted successfully")
+        except Item.DoesNotExist:
+            logger.warning(f'Item {item_id} not found for adjustment.')
+            return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
+        except InsufficientStock:
+            logger.warning(f'Item {item_id} adjustment rejected: insufficient stock.')
+            return Response({'error': 'Insufficient stock'}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            logger.error(f'Error adjusting item {item_id}: {str(e)}')
+            return Response({'error': 'Failed to adjust item'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ItemStockAsOfAPIView(CustomAPIViewMixin, generics.GenericAPIView):
+    """
+        API view for the quantity of an Item at a past time.
+        This view handles GET requests with `?as_of=` and computes the quantity from the stock ledger, starting
+        from the last stock snapshot before that time.
+        Authentication required to access this view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+            Retrieve the quantity of a specific Item as of a time.
+
+            Args:
+                request (Request): The request object contains the `as_of` time.
+
+            Returns:
+                Response: A Response object contains the quantity of the item at that time and a success message.
+        """
+        item_id = kwargs.get('pk')
+        as_of = request.query_params.get('as_of')
+        try:
+            serializer = ItemStockQuerySerializer(data=request.query_params)
+            serializer.is_valid(raise_exception=True)
+            as_of = serializer.validated_data['as_of']
+            quantity = get_quantity_as_of(item_id, as_of)
+            if quantity is None:
+                logger.warning(f'No stock history of item {item_id} as of {as_of}.')
+                return Response({'error': 'No stock history for this item at that time'},
+                                status=status.HTTP_404_NOT_FOUND)
+            return self.create_response(data={'id': item_id, 'quantity': quantity, 'as_of': as_of},
+                                        message="Item quantity retrieved successfully")
+        except ValidationError as e:
+            logger.warning(f'Invalid stock query of item {item_id}: {e.detail}')
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f'Error retrieving the quantity of item {item_id} as of {as_of}: {str(e)}')
+            return Response({'error': 'Failed to retrieve item quantity'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ItemStatsAPIView(CustomAPIViewMixin, generics.GenericAPIView):
+    """
+        API view for the inventory stats.
+        This view handles GET requests and returns the stock valuation, the counters of every stock band and the
+        Items lowest in stock, read from the stock summary kept up to date by the writes, see `item_management.stats`.
+        Authentication required to access this view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+            Retrieve the inventory stats.
+
+            Args:
+                request (Request): The request object contains the optional `low_stock_limit`.
+
+            Returns:
+                Response: A Response object contains the inventory stats and a success message.
+        """
+        try:
+            serializer = ItemStatsQuerySerializer(data=request.query_params)
+            serializer.is_valid(raise_exception=True)
+            low_stock_limit = serializer.validated_data.get('low_stock_limit', settings.ITEM_STATS_LOW_STOCK_LIMIT)
+            stats = get_item_stats(low_stock_limit)
+            return self.create_response(data=ItemStatsSerializer(stats).data,
+                                        message="Item stats retrieved successfully")
+        except ValidationError as e:
+            logger.warning(f'Invalid item stats parameters: {e.detail}')
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f'Error retrieving item stats: {str(e)}')
+            return Response({'error': 'Failed to retrieve item stats'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ItemBatchAdjustAPIView(CustomAPIViewMixin, generics.GenericAPIView):
+    """
+        API view for adjusting the stock of several Items at once.
+        This view handles POST requests with a list of Item ids and signed deltas and applies them all
+        in one transaction; if any of them fails none is applied.
+        Permission required to access this view.
+    """
+    serializer_class = ItemBatchAdjustSerializer
+    permission_classes = [IsAuthenticated, IsItemAdder]
+
+    def post(self, request, *args, **kwargs):
+        """
+            Adjust the quantities of a batch of Items.
+
+            Args:
+                request (Request): The request object contains the `adjustments` and optional `allow_negative` flag.
+
+            Returns:
+                Response: A Response object contains the new quantity of every adjusted item and a success message.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            quantities = adjust_quantities(serializer.validated_data['adjustments'],
+                                           allow_negative=serializer.validated_data['allow_negative'],
+                                           user_id=request.user.id)
+            # The quantities show on the cached items and on the cached list pages
+            invalidate_items(quantities)
+            logger.info(f'Quantities of {len(quantities)} items adjusted.')
+            return self.create_response(
+                data=[{'id': item_id, 'quantity': quantity} for item_id, quantity in sorted(quantities.items())],
+                message="Item quantities adjusted successfully"
+            )
+        except Item.DoesNotExist as e:
+            logger.warning(f'Batch adjustment rejected: {str(e)}.')
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except InsufficientStock as e:
+            logger.warning(f'Batch adjustment rejected: {str(e)}.')
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            logger.error(f'Error adjusting items: {str(e)}')
+            return Response({'error': 'Failed to adjust items'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ItemExportAPIView(generics.GenericAPIView):
+    """
+        API view for exporting the whole Item catalogue.
+        This view handles GET requests and streams every Item as NDJSON (default) or CSV with `?output=csv`.
+        Rows are read through a server-side cursor, so memory use stays flat however big the table is.
+        The export accepts the same filters as the Item list, e.g. `?updated_since=` for incremental pulls,
+        and is gzip compressed when the client accepts it.
+        Permission required to access this view.
+    """
+    queryset = Item.objects.order_by('id')
+    permission_classes = [IsAuthenticated]
+    filter_backends = [ItemFilterBackend]
+    outputs = {
+        'ndjson': (iter_ndjson, 'application/x-ndjson'),
+        'csv': (iter_csv, 'text/csv'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.outputs:
+            return Response({'error': f'Unsupported output {output}, use one of {", ".join(self.outputs)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+        except ValidationError as e:
+            logger.warning(f'Invalid item export filters: {e.detail}')
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        iter_rows, content_type = self.outputs[output]
+        content = iter_rows(queryset, settings.ITEM_EXPORT_CHUNK_SIZE)
+        gzip = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if gzip:
+            content = compress_sequence(content)
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="items.{output}"'
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        logger.info(f'{request.user} started an item export as {output}.')
+        return response
+
+
+class ItemImportAPIView(CustomAPIViewMixin, generics.GenericAPIView):
+    """
+        API view for importing Items from a CSV or NDJSON file.
+        This view handles multipart POST requests with the file in the `file` field. The file is parsed, validated
+        and loaded in chunks, see `import_items`.
+        Permission required to access this view.
+    """
+    permission_classes = [IsAuthenticated, IsItemAdder]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        """
+            Import the uploaded file.
+
+            Args:
+                request (Request): The request object contains the file. `?on_conflict=update` updates the Items
+                    whose name already exists instead of skipping them.
+
+            Returns:
+                Response: A Response object contains the import counters, throughput and row errors.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = os.path.splitext(upload.name)[1].lstrip('.').lower()
+        file_format = 'ndjson' if file_format == 'jsonl' else file_format
+        if file_format not in IMPORT_FORMATS:
+            return Response({'error': f'Unsupported file type, use one of {", ".join(IMPORT_FORMATS)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        on_conflict = request.query_params.get('on_conflict', 'skip')
+        if on_conflict not in ON_CONFLICT_CHOICES:
+            return Response({'error': f'on_conflict must be one of {", ".join(ON_CONFLICT_CHOICES)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+            stats = import_items(iter_rows(stream, file_format), chunk_size=settings.ITEM_IMPORT_CHUNK_SIZE,
+                                 on_conflict=on_conflict)
+            logger.info(f'{request.user} imported {upload.name}: {stats}.')
+            return self.create_response(data=stats.as_dict(), message="Items imported successfully")
+        except Exception as e:
+            logger.error(f'Error importing items from {upload.name}: {str(e)}')
+            return Response({'error': 'Failed to import items'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ItemCacheStatsAPIView(CustomAPIViewMixin, generics.GenericAPIView):
+    """
+        API view for the item cache counters.
+        This view handles GET requests and returns the hit, miss and eviction counters of the local and Redis
+        cache tiers of the worker process that serves the request.
+        Admin permission required to access this view.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return self.create_response(data=get_item_cache_stats(), message="Item cache stats retrieved successfully")
@@ -0,0 +1,107 @@
+import logging
+from functools import partial
+
+from django.conf import settings
+from urllib.parse import urlsplit
+
+from django.http import Http404
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from item_management.cache import get_or_build, hot_item_keys, item_cache_key, item_list_cache_key, \
+    refresh_entry, rewarm_entry, tiered_cache
+from item_management.views import ItemListCreateView, ItemsRetrieveUpdateDestroyAPIView
+
+logger = logging.getLogger('item_management')
+
+
+def get_list_view(url):
+    """
+        Return an `ItemListCreateView` set up to build the Item list page at `url`, as if it was requested there,
+        so the links of the page point where it is read from.
+    """
+    url = urlsplit(url)
+    request = RequestFactory().get(f'{url.path}?{url.query}', secure=url.scheme == 'https', HTTP_HOST=url.netloc)
+    return ItemListCreateView(request=Request(request), format_kwarg=None, args=(), kwargs={})
+
+
+def get_hot_entries(items, lists, list_urls=()):
+    """
+        Return the cache keys of the `items` hottest Items and of the `lists` hottest Item list pages, plus the
+        pages at `list_urls`, with the functions building their values.
+    """
+    item_view = ItemsRetrieveUpdateDestroyAPIView()
+    entries = {}
+    for item_id in hot_item_keys.top('item', items):
+        entries[item_cache_key(item_id)] = partial(item_view.build_item, int(item_id))
+    for url in (*list_urls, *hot_item_keys.top('list', lists)):
+        list_view = get_list_view(url)
+        # The sync and the async list share their pages, the first URL (the hottest) builds it
+        entries.setdefault(item_list_cache_key(list_view.request, ItemListCreateView.list_query_params),
+                           list_view.build_list_page)
+    return entries
+
+
+def warm_item_cache(items, lists, refresh_within, list_urls=()):
+    """
+        Cache the hot Items and Item list pages that are not cached, and rebuild those that expire within
+        `refresh_within` seconds ahead of their expiry, so their readers never miss.
+
+        A refreshed entry is only written if it was not invalidated while it was rebuilt. The pages are cached
+        from the URLs they were read from, after a Redis flush there are none but `list_urls`.
+
+        Args:
+            items (int): Number of the most read Items to warm.
+            lists (int): Number of the most read Item list pages to warm.
+            refresh_within (int): Seconds before their expiry the entries are rebuilt.
+            list_urls (iterable): Absolute URLs of Item list pages to warm, however often they are read.
+
+        Returns:
+            dict: The number of entries cached (`warmed`), rebuilt ahead of expiry (`refreshed`), left alone
+            (`fresh`) and failed to build (`failed`).
+    """
+    entries = get_hot_entries(items, lists, list_urls)
+    result = {'warmed': 0, 'refreshed': 0, 'fresh': 0, 'failed': 0}
+    for (cache_key, build), ttl in zip(entries.items(), tiered_cache.ttl_many(entries)):
+        try:
+            if ttl is None:
+                # Single-flight with the readers that miss it meanwhile
+                get_or_build(cache_key, build)
+                result['warmed'] += 1
+            elif 0 <= ttl < refresh_within and refresh_entry(cache_key, build):
+                result['refreshed'] += 1
+            else:
+                result['fresh'] += 1
+        except Http404:
+            logger.info(f'Item of cache entry {cache_key} deleted since it was read, not warmed.')
+            result['failed'] += 1
+        except Exception as e:
+            logger.warning(f'Error warming cache entry {cache_key}: {str(e)}')
+            result['failed'] += 1
+    return result
+
+
+def rewarm_hot_items(item_ids):
+    """
+        Cache again the hot ones among Items just written, whose cached copies the write dropped, so their readers
+        do not all miss at once. Hot Items are the `ITEM_CACHE_WARM_ITEMS` most read ones.
+
+        An Item is only cached if no later write invalidated it while it was built, and if no reader cached it
+        first, see `rewarm_entry`.
+
+        Returns:
+            int: The number of Items cached again.
+    """
+    hot = set(hot_item_keys.top('item', settings.ITEM_CACHE_WARM_ITEMS))
+    item_view = ItemsRetrieveUpdateDestroyAPIView()
+    warmed = 0
+    for item_id in item_ids:
+        if str(item_id) not in hot:
+            continue
+        try:
+            if rewarm_entry(item_cache_key(item_id), partial(item_view.build_item, item_id)):
+                warmed += 1
+        except Http404:
+            # Deleted by the write
+            pass
+    return warmed
@@ -0,0 +1,18 @@
+import signal
+
+import django
+
+
+def run_worker_process(batch_size, poll_interval):
+    """
+        Entry point of a job worker process of `run_workers`. It starts from a fresh interpreter, so this module
+        must not import the models: Django is set up first.
+    """
+    django.setup()
+    from item_management.jobs import JobWorker
+
+    worker = JobWorker(batch_size, poll_interval)
+    # Finish the current batch on SIGTERM, the pool stops us that way
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker.run()